@@ -0,0 +1,91 @@
+"""Micro-benchmarks of arithmetic logic unit.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_alu
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+
+from modelmachine.alu import AluRegisters, ArithmeticLogicUnit
+from modelmachine.cell import Cell, div_to_zero
+from modelmachine.memory.register import RegisterMemory, RegisterName
+
+NUMBER = 20000
+REPEAT = 5
+OPERANDS = (
+    ("positive", 123456789, 1234),
+    ("negative", -123456789, 1234),
+    ("mixed", -123456789, -1234),
+)
+# Operand bits of mm-0, mm-s, mm-r and mm-3
+WIDTHS = (16, 24, 40, 56)
+
+
+def make_alu(registers: RegisterMemory, bits: int) -> ArithmeticLogicUnit:
+    return ArithmeticLogicUnit(
+        registers=registers,
+        alu_registers=AluRegisters(
+            S=RegisterName.S,
+            RES=RegisterName.R1,
+            R1=RegisterName.R1,
+            R2=RegisterName.R2,
+        ),
+        operand_bits=bits,
+        address_bits=16,
+    )
+
+
+def bench(name: str, stmt: str, **namespace: object) -> None:
+    best = min(
+        timeit.repeat(stmt, globals=namespace, number=NUMBER, repeat=REPEAT)
+    )
+    sys.stdout.write(f"{name:<40} {best / NUMBER * 1e9:>8.0f} ns\n")
+
+
+def bench_alu(
+    alu: ArithmeticLogicUnit,
+    registers: RegisterMemory,
+    name: str,
+    op: str,
+    a: Cell,
+    b: Cell,
+) -> None:
+    bench(
+        name,
+        "regs[R1] = a; regs[R2] = b; op()",
+        regs=registers,
+        R1=RegisterName.R1,
+        R2=RegisterName.R2,
+        a=a,
+        b=b,
+        op=getattr(alu, op),
+    )
+
+
+def main() -> None:
+    for bits in WIDTHS:
+        registers = RegisterMemory()
+        alu = make_alu(registers, bits)
+        a = Cell(-12345, bits=bits)
+        b = Cell(678, bits=bits)
+        for op in ("add", "sub", "umul", "smul"):
+            bench_alu(alu, registers, f"alu.{op} {bits} bits", op, a, b)
+
+    bits = 7 * 8
+    registers = RegisterMemory()
+    alu = make_alu(registers, bits)
+    for case, x, y in OPERANDS:
+        op1 = Cell(x, bits=bits)
+        op2 = Cell(y, bits=bits)
+        bench(f"div_to_zero {case}", "f(a, b)", f=div_to_zero, a=x, b=y)
+        bench(f"Cell.sdivmod {case}", "a.sdivmod(b)", a=op1, b=op2)
+        for op in ("sdivmod", "udivmod"):
+            bench_alu(alu, registers, f"alu.{op} {case}", op, op1, op2)
+
+
+if __name__ == "__main__":
+    main()
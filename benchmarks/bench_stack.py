@@ -0,0 +1,52 @@
+"""Benchmarks of stack machines on factorial samples.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stack
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import timeit
+from functools import partial
+from pathlib import Path
+
+from modelmachine.cu.control_unit_0 import ControlUnit0
+from modelmachine.cu.control_unit_s import ControlUnitS
+from modelmachine.ide.source import source
+
+REPEAT = 3
+SAMPLES = Path(__file__).parent.parent / "samples" / "asm"
+PROGRAMS = ("mm-s_factorial1.mmach", "mm-0_factorial.mmach")
+ENTER = "1000"
+
+
+def run(text: str, *, stack_cache: bool) -> None:
+    cpu = source(text, protect_memory=False)
+    cpu.input(io.StringIO(ENTER))
+    control_unit = cpu.control_unit
+    assert isinstance(control_unit, (ControlUnit0, ControlUnitS))
+    if not stack_cache:
+        control_unit.disable_stack_cache()
+    control_unit.run()
+
+
+def main() -> None:
+    for name in PROGRAMS:
+        text = (SAMPLES / name).read_text()
+        for stack_cache in (False, True):
+            best = min(
+                timeit.repeat(
+                    partial(run, text, stack_cache=stack_cache),
+                    number=1,
+                    repeat=REPEAT,
+                )
+            )
+            mode = "stack cache" if stack_cache else "plain stack"
+            sys.stdout.write(f"{name} {mode:<20} {best * 1e3:>8.0f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,10 @@ from __future__ import annotations
 import operator
 from dataclasses import dataclass
 from enum import Flag
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
-from .cell import Cell, div_to_zero
+from .cell import Cell, div_to_zero, divmod_to_zero
 from .cu.halt_error import HaltError
 from .memory.register import RegisterName
 
@@ -16,6 +17,9 @@ if TYPE_CHECKING:
 
     from .memory.register import RegisterMemory
 
+    BinaryOp = Callable[[int, int], tuple[int, int]]
+    DivmodOp = Callable[[int, int], tuple[int, int, int]]
+
 
 class Flags(Flag):
     CLEAR = 0
@@ -27,6 +31,11 @@ class Flags(Flag):
 
 
 FLAG_BITS = 5
+_ZF: Final = Flags.ZF.value
+_SF: Final = Flags.SF.value
+_OF: Final = Flags.OF.value
+_CF: Final = Flags.CF.value
+_HALT: Final = Flags.HALT.value
 
 LESS = -1
 EQUAL = 0
@@ -45,10 +54,164 @@ class AluZeroDivisionError(ZeroDivisionError, HaltError):
     pass
 
 
-class OperationType(Flag):
-    SIGNED = 1
-    UNSIGNED = 2
-    BOTH = 3
+@dataclass(frozen=True)
+class WidthOps:
+    """Arithmetic specialized for one operand width.
+
+    Operands and results are unsigned ints, operations return result
+    (and remainder for divmod) and value of flags register.
+    Division operations expect nonzero divisor.
+    """
+
+    flags: Callable[[int, int, int], int]
+    add: BinaryOp
+    sub: BinaryOp
+    umul: BinaryOp
+    smul: BinaryOp
+    sdivmod: DivmodOp
+    udivmod: DivmodOp
+    flag_cells: tuple[Cell, ...]
+
+
+@lru_cache(maxsize=None)
+def width_ops(bits: int) -> WidthOps:
+    """Build operations once per width, they are shared by all alus."""
+    mask = (1 << bits) - 1
+    sign = 1 << (bits - 1)
+    min_int = -sign
+    max_int = sign - 1
+    zf = Flags.ZF.value
+    sf = Flags.SF.value
+    of = Flags.OF.value
+    cf = Flags.CF.value
+
+    def signed(x: int) -> int:
+        return x - ((x & sign) << 1)
+
+    def flags(value: int, signed_res: int, unsigned_res: int) -> int:
+        """Flags of value, which exact results are signed_res, unsigned_res."""
+        res = 0 if value else zf
+        if value & sign:
+            res |= sf
+        if not min_int <= signed_res <= max_int:
+            res |= of
+        if not 0 <= unsigned_res <= mask:
+            res |= cf
+        return res
+
+    def add(a: int, b: int) -> tuple[int, int]:
+        res = a + b
+        value = res & mask
+        return value, flags(value, signed(a) + signed(b), res)
+
+    def sub(a: int, b: int) -> tuple[int, int]:
+        res = a - b
+        value = res & mask
+        return value, flags(value, signed(a) - signed(b), res)
+
+    def umul(a: int, b: int) -> tuple[int, int]:
+        res = a * b
+        value = res & mask
+        return value, flags(value, signed(value), res)
+
+    def smul(a: int, b: int) -> tuple[int, int]:
+        res = signed(a) * signed(b)
+        value = res & mask
+        return value, flags(value, res, value)
+
+    def sdivmod(a: int, b: int) -> tuple[int, int, int]:
+        div, mod = divmod_to_zero(signed(a), signed(b))
+        value = div & mask
+        return value, mod & mask, flags(value, div, value)
+
+    def udivmod(a: int, b: int) -> tuple[int, int, int]:
+        div, mod = divmod(a, b)
+        return div, mod, flags(div, signed(div), div)
+
+    return WidthOps(
+        flags=flags,
+        add=add,
+        sub=sub,
+        umul=umul,
+        smul=smul,
+        sdivmod=sdivmod,
+        udivmod=udivmod,
+        flag_cells=tuple(
+            Cell(value, bits=bits) for value in range(1 << FLAG_BITS)
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def plain_ops(bits: int) -> WidthOps:
+    """Operations on cells with flags by exact results, as in Cell.
+
+    They are slow and serve as reference for width_ops in difftest.
+    """
+
+    def flags(value: int, signed_res: int, unsigned_res: int) -> int:
+        cell = Cell(value, bits=bits)
+        res = Flags.CLEAR
+        if cell == 0:
+            res |= Flags.ZF
+        if cell.is_negative:
+            res |= Flags.SF
+        if cell.signed != signed_res:
+            res |= Flags.OF
+        if cell.unsigned != unsigned_res:
+            res |= Flags.CF
+        return res.value
+
+    def binary(
+        int_op: Callable[[int, int], int],
+        cell_op: Callable[[Cell, Cell], Cell],
+        *,
+        signed: bool = True,
+        unsigned: bool = True,
+    ) -> BinaryOp:
+        def op(a: int, b: int) -> tuple[int, int]:
+            x, y = Cell(a, bits=bits), Cell(b, bits=bits)
+            s = cell_op(x, y)
+            return s.unsigned, flags(
+                s.unsigned,
+                int_op(x.signed, y.signed) if signed else s.signed,
+                int_op(x.unsigned, y.unsigned) if unsigned else s.unsigned,
+            )
+
+        return op
+
+    def sdivmod(a: int, b: int) -> tuple[int, int, int]:
+        x, y = Cell(a, bits=bits).signed, Cell(b, bits=bits).signed
+        div = div_to_zero(x, y)
+        res = Cell(div, bits=bits)
+        mod = Cell(x - div * y, bits=bits)
+        return (
+            res.unsigned,
+            mod.unsigned,
+            flags(res.unsigned, div, res.unsigned),
+        )
+
+    def udivmod(a: int, b: int) -> tuple[int, int, int]:
+        div = Cell(a // b, bits=bits)
+        mod = Cell(a - div.unsigned * b, bits=bits)
+        return (
+            div.unsigned,
+            mod.unsigned,
+            flags(div.unsigned, div.signed, a // b),
+        )
+
+    return WidthOps(
+        flags=flags,
+        add=binary(operator.add, operator.add),
+        sub=binary(operator.sub, operator.sub),
+        umul=binary(operator.mul, Cell.umul, signed=False),
+        smul=binary(operator.mul, Cell.smul, unsigned=False),
+        sdivmod=sdivmod,
+        udivmod=udivmod,
+        flag_cells=tuple(
+            Cell(value, bits=bits) for value in range(1 << FLAG_BITS)
+        ),
+    )
 
 
 class ArithmeticLogicUnit:
@@ -65,6 +228,7 @@ class ArithmeticLogicUnit:
     operand_bits: Final[int]
     _address_bits: Final[int]
     alu_registers: Final[AluRegisters]
+    _ops: WidthOps
 
     def __init__(
         self,
@@ -81,6 +245,7 @@ class ArithmeticLogicUnit:
         self.operand_bits = operand_bits
         self._address_bits = address_bits
         self.alu_registers = alu_registers
+        self._ops = width_ops(operand_bits)
 
         self._registers.add_register(RegisterName.PC, bits=address_bits)
         self._registers.add_register(RegisterName.ADDR, bits=address_bits)
@@ -91,24 +256,9 @@ class ArithmeticLogicUnit:
         self._registers.add_register(alu_registers.R2, bits=operand_bits)
         self._registers.add_register(RegisterName.FLAGS, bits=operand_bits)
 
-    def _set_flags(self, *, signed: int, unsigned: int) -> None:
-        """Set flags."""
-        flags = Flags.CLEAR
-        value = self._registers[self.alu_registers.S]
-        if value == 0:
-            flags |= Flags.ZF
-        if value.is_negative:
-            flags |= Flags.SF
-
-        if value.signed != signed:
-            flags |= Flags.OF
-
-        if value.unsigned != unsigned:
-            flags |= Flags.CF
-
-        self._registers[RegisterName.FLAGS] = Cell(
-            flags.value, bits=self.operand_bits
-        )
+    def disable_width_ops(self) -> None:
+        """Compute operations on cells, see plain_ops."""
+        self._ops = plain_ops(self.operand_bits)
 
     @property
     def _operands(self) -> tuple[Cell, Cell]:
@@ -118,80 +268,59 @@ class ArithmeticLogicUnit:
             self._registers[self.alu_registers.R2],
         )
 
-    def _binary_op(
-        self,
-        int_op: Callable[[int, int], int],
-        cell_op: Callable[[Cell, Cell], Cell],
-        *,
-        op_type: OperationType = OperationType.BOTH,
-    ) -> None:
+    def _binary_op(self, op: BinaryOp) -> None:
         op1, op2 = self._operands
-        s = cell_op(op1, op2)
-        self._registers[self.alu_registers.S] = s
-        unsigned = int_op(op1.unsigned, op2.unsigned)
-        signed = int_op(op1.signed, op2.signed)
-
-        if op_type is OperationType.BOTH:
-            self._set_flags(signed=signed, unsigned=unsigned)
-        elif op_type is OperationType.SIGNED:
-            self._set_flags(signed=signed, unsigned=s.unsigned)
-        elif op_type is OperationType.UNSIGNED:
-            self._set_flags(signed=s.signed, unsigned=unsigned)
-        else:
-            raise NotImplementedError
+        value, flags = op(op1.unsigned, op2.unsigned)
+        self._registers[self.alu_registers.S] = Cell(
+            value, bits=self.operand_bits
+        )
+        self._registers[RegisterName.FLAGS] = self._ops.flag_cells[flags]
 
     def add(self) -> None:
         """S := R1 + R2."""
-        self._binary_op(operator.add, operator.add)
+        self._binary_op(self._ops.add)
 
     def sub(self) -> None:
         """S := R1 - R2."""
-        self._binary_op(operator.sub, operator.sub)
+        self._binary_op(self._ops.sub)
 
     def umul(self) -> None:
         """S := R1 * R2 (unsigned)."""
-        self._binary_op(
-            operator.mul,
-            lambda a, b: a.umul(b),
-            op_type=OperationType.UNSIGNED,
-        )
+        self._binary_op(self._ops.umul)
 
     def smul(self) -> None:
         """S := R1 * R2 (signed)."""
-        self._binary_op(
-            operator.mul,
-            lambda a, b: a.smul(b),
-            op_type=OperationType.SIGNED,
+        self._binary_op(self._ops.smul)
+
+    def _divmod(self, *, signed: bool) -> None:
+        """Quotient, remainder and flags of both divisions at once.
+
+        Quotient is rounded to zero, so it never overflows for unsigned
+        operands and overflows only for min_int / -1 for signed ones.
+        """
+        op1, op2 = self._operands
+        if op2 == 0:
+            a = op1.signed if signed else op1.unsigned
+            msg = f"Division by zero: {a} / 0"
+            raise AluZeroDivisionError(msg)
+
+        op = self._ops.sdivmod if signed else self._ops.udivmod
+        div, mod, flags = op(op1.unsigned, op2.unsigned)
+        self._registers[self.alu_registers.S] = Cell(
+            div, bits=self.operand_bits
+        )
+        self._registers[self.alu_registers.RES] = Cell(
+            mod, bits=self.operand_bits
         )
+        self._registers[RegisterName.FLAGS] = self._ops.flag_cells[flags]
 
     def sdivmod(self) -> None:
         """S := R1 div R2, R1 := R1 % R2 (signed)."""
-        op1, op2 = self._operands
-        try:
-            div, mod = op1.sdivmod(op2)
-        except ZeroDivisionError as e:
-            msg = f"Division by zero: {op1.signed} / {op2.signed}"
-            raise AluZeroDivisionError(msg) from e
-
-        self._registers[self.alu_registers.S] = div
-        self._registers[self.alu_registers.RES] = mod
-        signed = div_to_zero(op1.signed, op2.signed)
-        self._set_flags(signed=signed, unsigned=div.unsigned)
+        self._divmod(signed=True)
 
     def udivmod(self) -> None:
         """S := R1 div R2, R1 := R1 % R2 (unsigned)."""
-        op1, op2 = self._operands
-
-        try:
-            div, mod = op1.udivmod(op2)
-        except ZeroDivisionError as e:
-            msg = f"Division by zero: {op1.unsigned} / {op2.unsigned}"
-            raise AluZeroDivisionError(msg) from e
-
-        self._registers[self.alu_registers.S] = div
-        self._registers[self.alu_registers.RES] = mod
-        unsigned = div_to_zero(op1.unsigned, op2.unsigned)
-        self._set_flags(signed=div.signed, unsigned=unsigned)
+        self._divmod(signed=False)
 
     def jump(self) -> None:
         """PC := R1."""
@@ -207,8 +336,8 @@ class ArithmeticLogicUnit:
 
         >>> alu.cond_jump(signed=False, comparasion=1, equal=False)  # a > b
         """
-        flags = Flags(self._registers[RegisterName.FLAGS].unsigned)
-        zf = bool(flags & Flags.ZF)
+        flags = self._registers[RegisterName.FLAGS].unsigned
+        zf = bool(flags & _ZF)
 
         if zf:
             if equal:
@@ -221,21 +350,19 @@ class ArithmeticLogicUnit:
             return
 
         if signed:
-            less = bool(flags & Flags.SF) ^ bool(flags & Flags.OF)
+            less = bool(flags & _SF) ^ bool(flags & _OF)
             if (comp < 0) == less:
                 self.jump()
             return
 
         # signed is False
-        cf = bool(flags & Flags.CF)
+        cf = bool(flags & _CF)
         if (comp < 0) == cf:
             self.jump()
 
     def halt(self) -> None:
         """Stop the machine."""
-        self._registers[RegisterName.FLAGS] = Cell(
-            Flags.HALT.value, bits=self.operand_bits
-        )
+        self._registers[RegisterName.FLAGS] = self._ops.flag_cells[_HALT]
 
     def swap(self) -> None:
         """S, RES := RES, S."""
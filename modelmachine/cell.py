@@ -21,8 +21,21 @@ def ceil_div(a: int, b: int) -> int:
     return (a - 1) // b + 1
 
 
+def divmod_to_zero(a: int, b: int) -> tuple[int, int]:
+    """Division rounding to zero, remainder has the sign of a."""
+    div, mod = divmod(a, b)
+    if mod and (a < 0) != (b < 0):
+        div += 1
+        mod -= b
+    return div, mod
+
+
 def div_to_zero(a: int, b: int) -> int:
-    """Simplified version of div"""
+    """Division rounding to zero.
+
+    Computed by absolute values independently of divmod_to_zero,
+    so plain_ops of alu and tests use it as reference.
+    """
     res = abs(a) // abs(b)
     if a * b < 0:
         res = -res
@@ -30,7 +43,7 @@ def div_to_zero(a: int, b: int) -> int:
 
 
 def mod_to_zero(a: int, b: int) -> int:
-    """Simplified version of div"""
+    """Remainder of div_to_zero, it has the sign of a."""
     return a - b * div_to_zero(a, b)
 
 
@@ -122,8 +135,7 @@ class Cell:
     def sdivmod(self, other: Cell) -> tuple[Cell, Cell]:
         self._check_compatibility(other)
 
-        div = div_to_zero(self.signed, other.signed)
-        mod = self.signed - div * other.signed
+        div, mod = divmod_to_zero(self.signed, other.signed)
 
         return (
             type(self)(div, bits=self.bits),
@@ -133,8 +145,7 @@ class Cell:
     def udivmod(self, other: Cell) -> tuple[Cell, Cell]:
         self._check_compatibility(other)
 
-        div = self.unsigned // other.unsigned
-        mod = self.unsigned - div * other.unsigned
+        div, mod = divmod(self.unsigned, other.unsigned)
 
         return (
             type(self)(div, bits=self.bits),
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import argparse
 import inspect
+import os
 import sys
 from dataclasses import dataclass
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pyparsing as pp
@@ -12,10 +14,16 @@ from pyparsing import Group as Gr
 from pyparsing import Word as Wd
 
 from .__about__ import __version__
+from .cpu.cpu import CU_MAP
 from .ide.common_parsing import ignore
+from .ide.dap import dap as ide_dap
 from .ide.debug import debug as ide_debug
+from .ide.difftest import difftest as ide_difftest
 from .ide.dump import dump as ide_dump
-from .ide.load import load_from_file
+from .ide.image import dump_image
+from .ide.load import load_from_file, open_enter, read_program
+from .ide.mem_stats import print_mem_stats, write_mem_stats_csv
+from .ide.parallel import parallel_source
 from .ide.source import source as ide_source
 
 if TYPE_CHECKING:
@@ -85,9 +93,13 @@ class Cli:
                 short = [p.short] if p.short is not None else []
                 if arg.annotation == "str":
                     cmd.add_argument(
-                        *short, f"--{cli_key}", help=p.help, dest=key
+                        *short,
+                        f"--{cli_key}",
+                        help=p.help,
+                        dest=key,
+                        default=arg.default,
                     )
-                if arg.annotation == "bool":
+                elif arg.annotation == "bool":
                     if arg.default is False:
                         cmd.add_argument(
                             *short,
@@ -144,19 +156,66 @@ def run(
     filename: str,
     protect_memory: bool = False,
     enter: str | None = None,
+    input_port: str | None = None,
+    output_port: str | None = None,
+    mem_stats: bool = False,
+    mem_stats_csv: str | None = None,
+    fusion: bool = False,
 ) -> int:
     """Run program.
 
-    filename -- file containing machine code, '-' for stdin
+    filename -- file with machine code or binary image, '-' for stdin
     protect_memory, -m -- halt, if program tries to read dirty memory
     enter, -e -- file with input data, disables .enter, '-' for stdin
+    input_port, -i -- address, every read of it takes next input value
+    output_port, -p -- address, every write to it prints the value
+    mem_stats, -s -- print memory access statistics to stderr
+    mem_stats_csv -- write access counts of every address to csv file
+    fusion, -f -- fuse common opcode pairs, print counts to stderr
     """
     if enter == filename == "-":
         msg = "Run cannot set both enter and filename to stdin"
         raise ValueError(msg)
 
-    cpu = load_from_file(filename, protect_memory=protect_memory, enter=enter)
-    cpu.control_unit.run()
+    stats = mem_stats or mem_stats_csv is not None
+    if input_port is None and output_port is None:
+        cpu = load_from_file(
+            filename, protect_memory=protect_memory, enter=enter
+        )
+        if stats:
+            cpu.ram.enable_access_stats()
+        if fusion:
+            cpu.control_unit.enable_fusion()
+        cpu.control_unit.run()
+    else:
+        cpu = read_program(filename, protect_memory=protect_memory)
+        if stats:
+            cpu.ram.enable_access_stats()
+        if fusion:
+            cpu.control_unit.enable_fusion()
+        with open_enter(cpu, enter) as fin:
+            cpu.map_io_ports(
+                input_port=None if input_port is None else int(input_port, 0),
+                output_port=(
+                    None if output_port is None else int(output_port, 0)
+                ),
+                fin=fin,
+                fout=sys.stdout,
+            )
+            cpu.input(fin)
+            cpu.control_unit.run()
+
+    if mem_stats:
+        print_mem_stats(cpu, sys.stderr)
+    if mem_stats_csv is not None:
+        with open(mem_stats_csv, "w", encoding="utf-8", newline="") as fout:
+            write_mem_stats_csv(cpu, fout)
+    if cpu.control_unit.fusion_counts is not None:
+        sys.stderr.write("Fusions:\n")
+        for (head, tail), count in cpu.control_unit.fusion_counts.items():
+            if count:
+                sys.stderr.write(f"  {head} + {tail}: {count}\n")
+
     if cpu.control_unit.failed:
         return 1
 
@@ -189,29 +248,107 @@ def debug(
     return ide_debug(cpu=cpu, colors=colors)
 
 
+@cli
+def dap(
+    *,
+    filename: str,
+    protect_memory: bool = False,
+    enter: str | None = None,
+) -> int:
+    """Serve debug adapter protocol over stdio.
+
+    filename -- file containing machine code
+    protect_memory, -m -- halt, if program tries to read dirty memory
+    enter, -e -- file with input data, disables .enter
+    """
+    if "-" in {filename, enter}:
+        msg = "Debug adapter uses stdin for protocol messages"
+        raise NotImplementedError(msg)
+
+    cpu = load_from_file(filename, protect_memory=protect_memory, enter=enter)
+
+    return ide_dap(cpu=cpu, fin=sys.stdin.buffer, fout=sys.stdout.buffer)
+
+
 @cli
 def asm(
     *,
     source: str,
     output: str | None = None,
+    output_format: str = "code",
+    jobs: str | None = None,
 ) -> int:
     """Assemble program - replace asm directives to code.
 
     source -- file containing asm code, '-' for stdin
     output, -o -- machine code output file, default is stdout
+    output_format, -f -- code for machine code text, bin for binary image
+    jobs, -j -- number of processes to assemble asm sections in parallel
     """
+    if output_format not in {"code", "bin"}:
+        msg = f"Unknown output format '{output_format}', expected code or bin"
+        raise ValueError(msg)
+
     if source == "-":
         source_code = sys.stdin.read()
+        import_dir = Path()
     else:
         with open(source, encoding="utf-8") as fin:
             source_code = fin.read()
+        import_dir = Path(source).parent
 
-    cpu = ide_source(source_code, protect_memory=True)
+    if jobs is None:
+        cpu = ide_source(
+            source_code, protect_memory=True, import_dir=import_dir
+        )
+    else:
+        cpu = parallel_source(
+            source_code,
+            protect_memory=True,
+            jobs=int(jobs),
+            import_dir=import_dir,
+        )
 
-    if output is None:
+    if output_format == "bin":
+        if output is None:
+            dump_image(cpu, sys.stdout.buffer)
+        else:
+            with open(output, "wb") as fout:
+                dump_image(cpu, fout)
+    elif output is None:
         ide_dump(cpu, sys.stdout)
     else:
         with open(output, "w", encoding="utf-8") as fout:
             ide_dump(cpu, fout)
 
     return 0
+
+
+@cli
+def difftest(
+    *,
+    engine: str = "step",
+    cpu: str | None = None,
+    programs: str = "100",
+    seed: str = "0",
+    jobs: str | None = None,
+) -> int:
+    """Compare execution engine with reference one on random programs.
+
+    engine, -E -- candidate engine, one of difftest ENGINES, reference is plain
+    cpu, -c -- check only this cpu, default is all cpus
+    programs, -n -- number of random programs for every cpu
+    seed, -s -- seed of the first program
+    jobs, -j -- number of processes, default is number of cpus
+    """
+    mismatches = ide_difftest(
+        list(CU_MAP) if cpu is None else [cpu],
+        engine,
+        programs=int(programs),
+        seed=int(seed),
+        jobs=(os.cpu_count() or 1) if jobs is None else int(jobs),
+    )
+    for mismatch in mismatches:
+        sys.stdout.write(f"{mismatch}\n")
+
+    return 1 if mismatches else 0
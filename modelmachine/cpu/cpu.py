@@ -27,6 +27,9 @@ from modelmachine.cu.control_unit_v import ControlUnitV
 from modelmachine.io import InputOutputUnit
 from modelmachine.memory.ram import RandomAccessMemory
 from modelmachine.memory.register import RegisterMemory
+from modelmachine.prompt.is_interactive import is_interactive
+
+from .hooks import CpuHooks
 
 if TYPE_CHECKING:
     from typing import Final, TextIO
@@ -38,6 +41,7 @@ if TYPE_CHECKING:
 class IOReq:
     address: int
     message: str | None
+    count: int = 1
 
 
 class Cpu:
@@ -50,10 +54,13 @@ class Cpu:
     control_unit: Final[ControlUnit]
     _alu: Final[ArithmeticLogicUnit]
     io_unit: Final[InputOutputUnit]
+    hooks: Final[CpuHooks]
     _config: dict[str, str]
     input_req: list[IOReq]
     output_req: list[IOReq]
     enter: str
+    streaming: bool
+    labels: dict[int, str]
 
     def __init__(
         self,
@@ -65,6 +72,8 @@ class Cpu:
         self.input_req = []
         self.output_req = []
         self.enter = ""
+        self.streaming = False
+        self.labels = {}
 
         self.registers = RegisterMemory()
         self.ram = RandomAccessMemory(
@@ -87,23 +96,65 @@ class Cpu:
         self.control_unit = control_unit(
             registers=self.registers, ram=self.ram, alu=self._alu
         )
+        self.hooks = CpuHooks(
+            control_unit=self.control_unit,
+            ram=self.ram,
+            registers=self.registers,
+        )
 
     def input(self, file: TextIO) -> None:
-        for req in self.input_req:
-            self.io_unit.input(
-                address=req.address, message=req.message, file=file
+        if self.streaming or is_interactive(file):
+            for req in self.input_req:
+                self.io_unit.input(
+                    address=req.address,
+                    message=req.message,
+                    count=req.count,
+                    file=file,
+                )
+        else:
+            size = self.io_unit.io_bits // self.ram.word_bits
+            self.io_unit.input_many(
+                [
+                    req.address + i * size
+                    for req in self.input_req
+                    for i in range(req.count)
+                ],
+                file,
             )
 
-        self.io_unit.check_input_empty(file)
+        if not self.streaming:
+            self.io_unit.check_input_empty(file)
 
-        self.ram.access_count = 0
+        self.ram.reset_access_count()
+
+    def map_io_ports(
+        self,
+        *,
+        input_port: int | None = None,
+        output_port: int | None = None,
+        fin: TextIO = sys.stdin,
+        fout: TextIO = sys.stdout,
+    ) -> None:
+        """Stream data through memory mapped ports while running.
+
+        Input port reads the rest of fin after .input requests,
+        end of stream halts the machine normally.
+        """
+        if input_port is not None:
+            self.io_unit.map_input_port(address=input_port, file=fin)
+            self.streaming = True
+        if output_port is not None:
+            self.io_unit.map_output_port(address=output_port, file=fout)
 
     def print_result(self, file: TextIO = sys.stdout) -> None:
         """Print calculation result."""
         assert self.output_req is not None
         for req in self.output_req:
             self.io_unit.output(
-                address=req.address, message=req.message, file=file
+                address=req.address,
+                message=req.message,
+                count=req.count,
+                file=file,
             )
 
 
@@ -0,0 +1,113 @@
+"""Hooks observe execution of the cpu.
+
+Hooks are registered by on_* methods, which can be used as decorators.
+Nothing is instrumented while there are no hooks: step hooks swap
+instrumented step into the control unit and write hooks swap watching
+classes of ram and registers, removing the last hook restores them.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Final, TypeVar
+
+    from modelmachine.cell import Cell
+    from modelmachine.cu.control_unit import ControlUnit
+    from modelmachine.cu.opcode import CommonOpcode
+    from modelmachine.memory.ram import RandomAccessMemory
+    from modelmachine.memory.register import RegisterMemory, RegisterName
+
+    F = TypeVar("F", bound=Callable[..., None])
+
+
+class CpuHooks:
+    fetch: Final[list[Callable[[int], None]]]
+    execute: Final[list[Callable[[CommonOpcode], None]]]
+    ram_write: Final[list[Callable[[int, int, int], None]]]
+    register_write: Final[list[Callable[[RegisterName, Cell, Cell], None]]]
+    halt: Final[list[Callable[[], None]]]
+    _control_unit: Final[ControlUnit]
+    _ram: Final[RandomAccessMemory]
+    _registers: Final[RegisterMemory]
+
+    def __init__(
+        self,
+        *,
+        control_unit: ControlUnit,
+        ram: RandomAccessMemory,
+        registers: RegisterMemory,
+    ):
+        self.fetch = []
+        self.execute = []
+        self.ram_write = []
+        self.register_write = []
+        self.halt = []
+        self._control_unit = control_unit
+        self._ram = ram
+        self._registers = registers
+
+    def on_fetch(self, hook: F) -> F:
+        """Call hook(pc) before instruction fetch."""
+        return self._add(self.fetch, hook)
+
+    def on_execute(self, hook: F) -> F:
+        """Call hook(opcode) before instruction execution."""
+        return self._add(self.execute, hook)
+
+    def on_ram_write(self, hook: F) -> F:
+        """Call hook(address, old, new) on every written word."""
+        return self._add(self.ram_write, hook)
+
+    def on_register_write(self, hook: F) -> F:
+        """Call hook(register_name, old, new) on every register write."""
+        return self._add(self.register_write, hook)
+
+    def on_halt(self, hook: F) -> F:
+        """Call hook() when the step halts the machine."""
+        return self._add(self.halt, hook)
+
+    def remove(self, hook: Callable[..., None]) -> None:
+        for hooks in self._lists:
+            if hook in hooks:
+                hooks.remove(hook)
+        self._install()
+
+    def clear(self) -> None:
+        for hooks in self._lists:
+            hooks.clear()
+        self._install()
+
+    @property
+    def _lists(self) -> tuple[list[Any], ...]:
+        return (
+            self.fetch,
+            self.execute,
+            self.ram_write,
+            self.register_write,
+            self.halt,
+        )
+
+    def _add(self, hooks: list[Any], hook: F) -> F:
+        hooks.append(hook)
+        self._install()
+        return hook
+
+    def _install(self) -> None:
+        step_hooks = self.fetch or self.execute or self.halt
+        self._control_unit.set_hooks(self if step_hooks else None)
+        self._ram.watch_writes(self._on_ram_write if self.ram_write else None)
+        self._registers.watch_writes(
+            self._on_register_write if self.register_write else None
+        )
+
+    def _on_ram_write(self, address: int, old: int, new: int) -> None:
+        for hook in self.ram_write:
+            hook(address, old, new)
+
+    def _on_register_write(
+        self, name: RegisterName, old: Cell, new: Cell
+    ) -> None:
+        for hook in self.register_write:
+            hook(name, old, new)
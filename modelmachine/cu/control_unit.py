@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from itertools import count
 from typing import TYPE_CHECKING
 from warnings import warn
 
@@ -8,15 +9,17 @@ from modelmachine.cell import Cell
 from modelmachine.memory.register import RegisterName
 from modelmachine.prompt.prompt import printf
 
-from .halt_error import HaltError
+from .halt_error import EndOfInputError, HaltError
 from .opcode import OPCODE_BITS, CommonOpcode
+from .prefetch import Prefetch
 from .status import Status
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
-    from typing import ClassVar, Final, TypeAlias
+    from collections.abc import Iterable, Mapping
+    from typing import Any, Callable, ClassVar, Final, NoReturn, TypeAlias
 
     from modelmachine.alu import AluRegisters, ArithmeticLogicUnit
+    from modelmachine.cpu.hooks import CpuHooks
     from modelmachine.memory.ram import RandomAccessMemory
     from modelmachine.memory.register import RegisterMemory
 
@@ -25,6 +28,56 @@ class WrongOpcodeError(ValueError, HaltError):
     pass
 
 
+_HALT: Final = Flags.HALT.value
+
+
+# Arguments of alu.cond_jump: signed, comp, equal
+COND_JUMPS: Final = {
+    CommonOpcode.jeq: (False, EQUAL, True),
+    CommonOpcode.jneq: (False, EQUAL, False),
+    CommonOpcode.sjl: (True, LESS, False),
+    CommonOpcode.sjgeq: (True, GREATER, True),
+    CommonOpcode.sjleq: (True, LESS, True),
+    CommonOpcode.sjg: (True, GREATER, False),
+    CommonOpcode.ujl: (False, LESS, False),
+    CommonOpcode.ujgeq: (False, GREATER, True),
+    CommonOpcode.ujleq: (False, LESS, True),
+    CommonOpcode.ujg: (False, GREATER, False),
+}
+
+
+class _EnumOpcodes:
+    """Opcode by opcode byte from Opcode enum, plain path of OPCODES."""
+
+    _cu: Final[type[ControlUnit]]
+
+    def __init__(self, cu: type[ControlUnit]):
+        self._cu = cu
+
+    def __getitem__(self, value: int) -> CommonOpcode | None:
+        try:
+            opcode: CommonOpcode = self._cu.Opcode(value)
+        except ValueError:
+            return None
+        return opcode
+
+
+class _EnumInstructionWords:
+    """Plain path of INSTRUCTION_WORDS."""
+
+    _cu: Final[type[ControlUnit]]
+
+    def __init__(self, cu: type[ControlUnit]):
+        self._cu = cu
+
+    def __getitem__(self, value: int) -> int:
+        try:
+            opcode = self._cu.Opcode(value)
+        except ValueError:
+            return 0
+        return self._cu.instruction_bits(opcode) // self._cu.WORD_BITS
+
+
 class ControlUnit:
     """Abstract control unit allow to execute two methods: step and run."""
 
@@ -37,6 +90,25 @@ class ControlUnit:
     PAGE_SIZE: ClassVar = 16
     IS_STACK_IO: ClassVar = False
     Opcode: ClassVar[TypeAlias] = CommonOpcode
+    # Tail opcode after head opcode runs by handler method, see enable_fusion
+    FUSIONS: ClassVar[Mapping[tuple[CommonOpcode, CommonOpcode], str]] = {}
+    # Opcode and instruction length in words by opcode byte, None and 0
+    # for invalid opcodes; filled for every subclass
+    OPCODES: ClassVar[tuple[CommonOpcode | None, ...]]
+    INSTRUCTION_WORDS: ClassVar[tuple[int, ...]]
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.OPCODES = tuple(
+            cls.Opcode(value) if value in cls.Opcode else None
+            for value in range(1 << OPCODE_BITS)
+        )
+        cls.INSTRUCTION_WORDS = tuple(
+            0
+            if opcode is None
+            else cls.instruction_bits(opcode) // cls.WORD_BITS
+            for opcode in cls.OPCODES
+        )
 
     _registers: Final[RegisterMemory]
     _ram: Final[RandomAccessMemory]
@@ -44,6 +116,14 @@ class ControlUnit:
     _operand_words: Final[Cell]
 
     _failed: bool
+    _hooks: CpuHooks | None
+    _plain_execute: Callable[[], None]
+    fusion_counts: dict[tuple[CommonOpcode, CommonOpcode], int] | None
+    _fusion_heads: frozenset[CommonOpcode]
+    _fusion_head: CommonOpcode | None
+    _prefetch: Prefetch | None
+    _opcodes: tuple[CommonOpcode | None, ...] | _EnumOpcodes
+    _instruction_words: tuple[int, ...] | _EnumInstructionWords
 
     @property
     def failed(self) -> bool:
@@ -55,19 +135,15 @@ class ControlUnit:
 
     @property
     def _opcode(self) -> Opcode:
-        res = self._ir[-OPCODE_BITS:].unsigned
-        try:
-            return self.Opcode(res)
-        except ValueError as e:
-            self._wrong_opcode(res, e)
-
-        raise NotImplementedError
+        res = self._ir.unsigned >> (self.IR_BITS - OPCODE_BITS)
+        opcode = self._opcodes[res]
+        if opcode is None:
+            self._wrong_opcode(res)
+        return opcode
 
-    def _wrong_opcode(
-        self, opcode: int | Opcode, e: Exception | None = None
-    ) -> None:
+    def _wrong_opcode(self, opcode: int | Opcode) -> NoReturn:
         msg = f"Invalid opcode 0x{int(opcode):0>2x} for {self.NAME}"
-        raise WrongOpcodeError(msg) from e
+        raise WrongOpcodeError(msg)
 
     def _expect_zero(
         self, start: int | None = None, end: int | None = None
@@ -109,6 +185,17 @@ class ControlUnit:
         assert alu.alu_registers is self.ALU_REGISTERS
 
         self._failed = False
+        self._hooks = None
+        self.fusion_counts = None
+        self._fusion_heads = frozenset(head for head, _ in self.FUSIONS)
+        self._fusion_head = None
+        self._opcodes = self.OPCODES
+        self._instruction_words = self.INSTRUCTION_WORDS
+
+        # Variable length instructions take several words
+        self._prefetch = (
+            Prefetch(ram) if ram.word_bits < self.IR_BITS else None
+        )
 
         self._registers.add_register(
             RegisterName.PC, bits=self._ram.address_bits
@@ -129,43 +216,153 @@ class ControlUnit:
             self._load()
             self._execute()
             self._write_back()
+        except EndOfInputError:
+            self._alu.halt()
         except HaltError as exc:
-            printf(str(exc))
-            warn("Because of previous exception cpu halted", stacklevel=1)
-            self._failed = True
+            self._fail(exc)
+
+    def _fail(self, exc: HaltError) -> None:
+        printf(str(exc))
+        warn("Because of previous exception cpu halted", stacklevel=1)
+        self._failed = True
+        self._alu.halt()
+
+    def set_hooks(self, hooks: CpuHooks | None) -> None:
+        """Swap in step calling step hooks, None restores plain step."""
+        self._hooks = hooks
+        self.__dict__.pop("_execute", None)
+        if hooks is not None and hooks.execute:
+            self._plain_execute = self._execute
+            self._execute = self._hooked_execute  # type: ignore[method-assign]
+
+        if hooks is not None:
+            self.step = self._hooked_step  # type: ignore[method-assign]
+        elif self.fusion_counts is not None:
+            self.step = self._fused_step  # type: ignore[method-assign]
+        else:
+            self.__dict__.pop("step", None)
+
+    def disable_prefetch(self) -> None:
+        """Read every instruction word by word from ram."""
+        self._prefetch = None
+
+    def disable_width_ops(self) -> None:
+        """Compute alu operations on cells, see alu.plain_ops."""
+        self._alu.disable_width_ops()
+
+    def disable_decode_tables(self) -> None:
+        """Decode opcodes by Opcode enum instead of OPCODES tables."""
+        self._opcodes = _EnumOpcodes(type(self))
+        self._instruction_words = _EnumInstructionWords(type(self))
+
+    def enable_fusion(self) -> None:
+        """Swap in step running tails of FUSIONS by fused handlers.
+
+        Every instruction is still executed by its own step, so the
+        debugger and jumps into the middle of the pair see the same
+        state. Tail handlers skip generic dispatch of the stages and
+        fire only right after head opcode. Hooks disable fusion.
+        """
+        self.fusion_counts = dict.fromkeys(self.FUSIONS, 0)
+        self.set_hooks(self._hooks)
+
+    def _fused_step(self) -> None:
+        """Execution of one instruction, fused handler for pair tails."""
+        assert self.fusion_counts is not None
+        head = self._fusion_head
+        self._fusion_head = None
+        try:
+            opcode = self._fetch()
+            if head is not None and (head, opcode) in self.FUSIONS:
+                getattr(self, self.FUSIONS[head, opcode])(opcode)
+                self.fusion_counts[head, opcode] += 1
+                return
+
+            self._decode()
+            self._load()
+            self._execute()
+            self._write_back()
+            if opcode in self._fusion_heads:
+                self._fusion_head = opcode
+        except EndOfInputError:
             self._alu.halt()
+        except HaltError as exc:
+            self._fail(exc)
+
+    def _cond_jump_tail(self, opcode: Opcode) -> None:
+        """Conditional jump by flags of the previous comparison."""
+        self._decode()
+        self._load()
+        signed, comp, equal = COND_JUMPS[opcode]
+        self._alu.cond_jump(signed=signed, comp=comp, equal=equal)
+
+    def _hooked_step(self) -> None:
+        """Plain step with hooks of modelmachine.cpu.hooks around it."""
+        hooks = self._hooks
+        assert hooks is not None
+        pc = self._registers[RegisterName.PC].unsigned
+        for hook in hooks.fetch:
+            hook(pc)
+
+        type(self).step(self)
+
+        if hooks.halt and self.status == Status.HALTED:
+            for halt_hook in hooks.halt:
+                halt_hook()
+
+    def _hooked_execute(self) -> None:
+        """Execute stage, which calls execute hooks first."""
+        hooks = self._hooks
+        assert hooks is not None
+        opcode = self._opcode
+        for hook in hooks.execute:
+            hook(opcode)
+        self._plain_execute()
 
     @property
     def status(self) -> Status:
         """Show, can we or not execute another one instruction."""
-        if Flags(self._registers[RegisterName.FLAGS].unsigned) & Flags.HALT:
+        if self._registers[RegisterName.FLAGS].unsigned & _HALT:
             return Status.HALTED
 
         return Status.RUNNING
 
-    def run(self) -> None:
-        """Execute instruction one-by-one until we met HALT command."""
-        while self.status == Status.RUNNING:
+    def run(self, max_steps: int | None = None) -> None:
+        """Execute instruction one-by-one until we met HALT command.
+
+        If max_steps is given, execute at most max_steps instructions.
+        """
+        steps = count() if max_steps is None else range(max_steps)
+        for _ in steps:
+            if self.status != Status.RUNNING:
+                break
             self.step()
 
     @classmethod
     def instruction_bits(cls, _opcode: Opcode) -> int:
         return cls.IR_BITS
 
-    def _fetch(self) -> None:
+    def _fetch(self) -> Opcode:
         """Read instruction and fetch opcode."""
+        if self._prefetch is not None:
+            opcode = self._fetch_prefetched(self._prefetch)
+            if opcode is not None:
+                return opcode
+
         instruction_address = self._registers[RegisterName.PC]
         opcode_word = self._ram.fetch(
             address=instruction_address, bits=self._ram.word_bits
         )
-        opcode_data = opcode_word[-OPCODE_BITS:].unsigned
-
-        try:
-            opcode = self.Opcode(opcode_data)
-        except ValueError as e:
-            self._wrong_opcode(opcode_data, e)
+        opcode_data = opcode_word.unsigned >> (
+            self._ram.word_bits - OPCODE_BITS
+        )
+        opcode = self._opcodes[opcode_data]
+        if opcode is None:
+            self._wrong_opcode(opcode_data)
 
-        instruction_bits = self.instruction_bits(opcode)
+        instruction_bits = (
+            self._instruction_words[opcode_data] * self._ram.word_bits
+        )
 
         additional_bits = instruction_bits - opcode_word.bits
         assert additional_bits >= 0
@@ -191,6 +388,35 @@ class ControlUnit:
             bits=self._ram.address_bits,
         )
         self._registers[RegisterName.PC] = instruction_address
+        return opcode
+
+    def _fetch_prefetched(self, prefetch: Prefetch) -> Opcode | None:
+        """Fetch from prefetch buffer, None if ram has to be read."""
+        pc = self._registers[RegisterName.PC].unsigned
+        opcode_word = prefetch.read(pc, 1)
+        if opcode_word is None:
+            return None
+
+        opcode_data = opcode_word >> (self._ram.word_bits - OPCODE_BITS)
+        opcode = self._opcodes[opcode_data]
+        if opcode is None:
+            return None
+        words = self._instruction_words[opcode_data]
+
+        instruction = prefetch.read(pc, words)
+        if instruction is None:
+            return None
+
+        self._ram.count_read(pc, words)
+        instruction_bits = words * self._ram.word_bits
+        self._registers[RegisterName.IR] = Cell(
+            instruction << (self.IR_BITS - instruction_bits),
+            bits=self.IR_BITS,
+        )
+        self._registers[RegisterName.PC] = Cell(
+            pc + words, bits=self._ram.address_bits
+        )
+        return opcode
 
     def _decode(self) -> None:
         """Verify that opcode is correct and decode addreses."""
@@ -204,46 +430,47 @@ class ControlUnit:
 
     def _execute(self) -> None:
         """Run arithmetic instructions."""
-        if self._opcode in self.EXEC_NOP:
+        opcode = self._opcode
+        if opcode in self.EXEC_NOP:
             pass
-        elif self._opcode == self.Opcode.halt:
+        elif opcode == self.Opcode.halt:
             self._alu.halt()
-        elif self._opcode == self.Opcode.add:
+        elif opcode == self.Opcode.add:
             self._alu.add()
-        elif self._opcode == self.Opcode.sub:
+        elif opcode == self.Opcode.sub:
             self._alu.sub()
-        elif self._opcode == self.Opcode.smul:
+        elif opcode == self.Opcode.smul:
             self._alu.smul()
-        elif self._opcode == self.Opcode.umul:
+        elif opcode == self.Opcode.umul:
             self._alu.umul()
-        elif self._opcode == self.Opcode.sdiv:
+        elif opcode == self.Opcode.sdiv:
             self._alu.sdivmod()
-        elif self._opcode == self.Opcode.udiv:
+        elif opcode == self.Opcode.udiv:
             self._alu.udivmod()
-        elif self._opcode == self.Opcode.jump:
+        elif opcode == self.Opcode.jump:
             self._alu.jump()
-        elif self._opcode == self.Opcode.jeq:
+        elif opcode == self.Opcode.jeq:
             self._alu.cond_jump(signed=False, comp=EQUAL, equal=True)
-        elif self._opcode == self.Opcode.jneq:
+        elif opcode == self.Opcode.jneq:
             self._alu.cond_jump(signed=False, comp=EQUAL, equal=False)
-        elif self._opcode == self.Opcode.sjl:
+        elif opcode == self.Opcode.sjl:
             self._alu.cond_jump(signed=True, comp=LESS, equal=False)
-        elif self._opcode == self.Opcode.sjgeq:
+        elif opcode == self.Opcode.sjgeq:
             self._alu.cond_jump(signed=True, comp=GREATER, equal=True)
-        elif self._opcode == self.Opcode.sjleq:
+        elif opcode == self.Opcode.sjleq:
             self._alu.cond_jump(signed=True, comp=LESS, equal=True)
-        elif self._opcode == self.Opcode.sjg:
+        elif opcode == self.Opcode.sjg:
             self._alu.cond_jump(signed=True, comp=GREATER, equal=False)
-        elif self._opcode == self.Opcode.ujl:
+        elif opcode == self.Opcode.ujl:
             self._alu.cond_jump(signed=False, comp=LESS, equal=False)
-        elif self._opcode == self.Opcode.ujgeq:
+        elif opcode == self.Opcode.ujgeq:
             self._alu.cond_jump(signed=False, comp=GREATER, equal=True)
-        elif self._opcode == self.Opcode.ujleq:
+        elif opcode == self.Opcode.ujleq:
             self._alu.cond_jump(signed=False, comp=LESS, equal=True)
-        elif self._opcode == self.Opcode.ujg:
+        elif opcode == self.Opcode.ujg:
             self._alu.cond_jump(signed=False, comp=GREATER, equal=False)
         else:
-            self._wrong_opcode(self._opcode)
+            self._wrong_opcode(opcode)
 
     def _write_back(self) -> None:
         """Save result of calculation to memory."""
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from itertools import count
 from typing import TYPE_CHECKING
 
 from modelmachine.alu import AluRegisters
@@ -11,13 +12,21 @@ from .control_unit_s import StackAccessError
 from .opcode import (
     ARITHMETIC_OPCODES,
     COMP,
+    CONDJUMP_OPCODES,
     OPCODE_BITS,
     CommonOpcode,
+    fusions,
 )
+from .stack_window import PlainStack, StackWindow
+from .status import Status
 
 if TYPE_CHECKING:
     from typing import Final
 
+    from modelmachine.alu import ArithmeticLogicUnit
+    from modelmachine.memory.ram import RandomAccessMemory
+    from modelmachine.memory.register import RegisterMemory
+
 
 class ControlUnit0(ControlUnit):
     """Control unit for model-machine-0."""
@@ -31,6 +40,8 @@ class ControlUnit0(ControlUnit):
         dup = 0x5C
         swap = 0x5D
 
+    FUSIONS = fusions({Opcode.comp}, CONDJUMP_OPCODES, "_cond_jump_tail")
+
     RELATIVE_BITS: Final = 8
     IR_BITS = OPCODE_BITS + RELATIVE_BITS
     WORD_BITS = IR_BITS
@@ -46,35 +57,69 @@ class ControlUnit0(ControlUnit):
     )
     IS_STACK_IO = True
 
+    _window: StackWindow | PlainStack
+    _sp: int
+
+    def __init__(
+        self,
+        *,
+        registers: RegisterMemory,
+        ram: RandomAccessMemory,
+        alu: ArithmeticLogicUnit,
+    ):
+        """See help(type(x))."""
+        super().__init__(registers=registers, ram=ram, alu=alu)
+        self._window = StackWindow(ram, alu.operand_bits)
+        self._sp = 0
+
+    def disable_stack_cache(self) -> None:
+        """Read every stack value from ram."""
+        self._window = PlainStack(self._ram, self._alu.operand_bits)
+
+    def run(self, max_steps: int | None = None) -> None:
+        """Execute until halt, stack writes are spilled to ram at exit."""
+        if (
+            self._hooks is not None
+            or self._registers.on_write is not None
+            or not self._window.defer_writes()
+        ):
+            super().run(max_steps)
+            return
+
+        steps = count() if max_steps is None else range(max_steps)
+        try:
+            for _ in steps:
+                if self.status != Status.RUNNING:
+                    break
+                self._window.flush_below(
+                    self._registers[RegisterName.PC].unsigned + 1
+                )
+                self.step()
+        finally:
+            self._window.flush()
+
     @property
     def _stack_size(self) -> int:
-        sp = self._registers[RegisterName.SP]
-        if sp == 0:
+        if self._sp == 0:
             return 0
-        return (1 << self._ram.address_bits) - sp.unsigned
+        return self._ram.memory_size - self._sp
 
-    @property
-    def _stack_pointer(self) -> Cell:
-        if self._stack_size == 0:
+    def _stack_address(self, depth: int) -> int:
+        """Address of stack value at depth, top of the stack is 0."""
+        if self._stack_size <= depth:
             msg = (
                 f"Read outside stack by opcode={self._opcode}; "
                 f"ir={self._registers[RegisterName.IR]}; "
                 f"stack size={self._stack_size}"
             )
             raise StackAccessError(msg)
-        return self._registers[RegisterName.SP]
+        return self._sp + depth
 
-    @property
-    def _stack_pointer_next(self) -> Cell:
-        if self._stack_size <= 1:
-            msg = (
-                f"Read outside stack by opcode={self._opcode}; "
-                f"ir={self._registers[RegisterName.IR]}; "
-                f"stack size={self._stack_size}"
-            )
-            raise StackAccessError(msg)
-        return self._registers[RegisterName.SP] + Cell(
-            1, bits=self._ram.address_bits
+    def _move_sp(self, values: int) -> None:
+        """Pop positive or push negative number of values."""
+        self._sp = (self._sp + values) % self._ram.memory_size
+        self._registers[RegisterName.SP] = Cell(
+            self._sp, bits=self._ram.address_bits
         )
 
     @property
@@ -89,27 +134,17 @@ class ControlUnit0(ControlUnit):
             self._registers[RegisterName.A1].unsigned, bits=self.WORD_BITS
         )
 
-    @property
-    def _stack_pointer_a(self) -> Cell:
-        if self._stack_size <= self._registers[RegisterName.A1].unsigned:
-            msg = (
-                f"Read outside stack by opcode={self._opcode}; "
-                f"ir={self._registers[RegisterName.IR]}; "
-                f"stack size={self._stack_size}"
-            )
-            raise StackAccessError(msg)
-        return self._registers[RegisterName.SP] + self._a_word_unsigned
-
     def _decode(self) -> None:
         if self._opcode == self.Opcode.halt:
             self._expect_zero()
 
-        self._registers[RegisterName.A1] = self._ir[: self.RELATIVE_BITS]
-        self._registers[RegisterName.ADDR] = (
-            self._registers[RegisterName.PC]
-            + self._a_word_signed
-            - Cell(1, bits=self.ADDRESS_BITS)
+        relative = self._ir[: self.RELATIVE_BITS]
+        self._registers[RegisterName.A1] = relative
+        self._registers[RegisterName.ADDR] = Cell(
+            self._registers[RegisterName.PC].unsigned + relative.signed - 1,
+            bits=self.ADDRESS_BITS,
         )
+        self._sp = self._registers[RegisterName.SP].unsigned
 
     _LOAD_R1R2: Final = ARITHMETIC_OPCODES | {
         Opcode.comp,
@@ -119,17 +154,16 @@ class ControlUnit0(ControlUnit):
 
     def _load(self) -> None:
         """Load registers R1 and R2."""
-        if self._opcode == self.Opcode.push:
+        opcode = self._opcode
+        if opcode == self.Opcode.push:
             self._registers[RegisterName.R1] = self._a_word_signed
 
-        if self._opcode in self._LOAD_R1R2:
-            self._registers[RegisterName.R1] = self._ram.fetch(
-                address=self._stack_pointer_a,
-                bits=self._alu.operand_bits,
+        if opcode in self._LOAD_R1R2:
+            self._registers[RegisterName.R1] = self._window.read(
+                self._stack_address(self._registers[RegisterName.A1].unsigned)
             )
-
-            self._registers[RegisterName.R2] = self._ram.fetch(
-                address=self._stack_pointer, bits=self._alu.operand_bits
+            self._registers[RegisterName.R2] = self._window.read(
+                self._stack_address(0)
             )
 
     _SP_MINUS: Final = frozenset(
@@ -139,22 +173,19 @@ class ControlUnit0(ControlUnit):
 
     def _execute(self) -> None:
         """Add specific commands."""
-        if self._opcode == self.Opcode.comp:
+        opcode = self._opcode
+        if opcode == self.Opcode.comp:
             self._alu.sub()
-        elif self._opcode == self.Opcode.swap:
+        elif opcode == self.Opcode.swap:
             self._alu.swap()
         else:
             super()._execute()
 
-        if self._opcode == self.Opcode.comp:
-            self._registers[RegisterName.SP] += Cell(
-                1, bits=self._ram.address_bits
-            )
-        elif self._opcode in self._SP_MINUS:
-            self._registers[RegisterName.SP] -= Cell(
-                1, bits=self._ram.address_bits
-            )
-        elif self._opcode == self.Opcode.pop:
+        if opcode == self.Opcode.comp:
+            self._move_sp(1)
+        elif opcode in self._SP_MINUS:
+            self._move_sp(-1)
+        elif opcode == self.Opcode.pop:
             if self._stack_size < self._registers[RegisterName.A1].unsigned:
                 msg = (
                     f"Pop too many elements from stack by opcode={self._opcode}; "
@@ -162,7 +193,7 @@ class ControlUnit0(ControlUnit):
                     f"stack size={self._stack_size}"
                 )
                 raise StackAccessError(msg)
-            self._registers[RegisterName.SP] += self._a_word_unsigned
+            self._move_sp(self._registers[RegisterName.A1].unsigned)
 
     _WB_R1: Final = frozenset(
         {
@@ -184,28 +215,25 @@ class ControlUnit0(ControlUnit):
 
     def _write_back(self) -> None:
         """Write result back."""
-        if self._opcode in self._WB_R1:
-            self._ram.put(
-                address=self._stack_pointer,
-                value=self._registers[RegisterName.R1],
+        opcode = self._opcode
+        if opcode in self._WB_R1:
+            self._window.write(
+                self._stack_address(0), self._registers[RegisterName.R1]
             )
 
-        if self._opcode in self._WB_DWORD:
-            self._ram.put(
-                address=self._stack_pointer_next,
-                value=self._registers[RegisterName.R1],
+        if opcode in self._WB_DWORD:
+            self._window.write(
+                self._stack_address(1), self._registers[RegisterName.R1]
             )
-            self._ram.put(
-                address=self._stack_pointer,
-                value=self._registers[RegisterName.R2],
+            self._window.write(
+                self._stack_address(0), self._registers[RegisterName.R2]
             )
 
-        if self._opcode == self.Opcode.swap:
-            self._ram.put(
-                address=self._stack_pointer_a,
-                value=self._registers[RegisterName.R1],
+        if opcode == self.Opcode.swap:
+            self._window.write(
+                self._stack_address(self._registers[RegisterName.A1].unsigned),
+                self._registers[RegisterName.R1],
             )
-            self._ram.put(
-                address=self._stack_pointer,
-                value=self._registers[RegisterName.R2],
+            self._window.write(
+                self._stack_address(0), self._registers[RegisterName.R2]
             )
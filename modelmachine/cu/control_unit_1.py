@@ -9,10 +9,12 @@ from .control_unit import ControlUnit
 from .opcode import (
     ARITHMETIC_OPCODES,
     COMP,
+    CONDJUMP_OPCODES,
     LOAD,
     OPCODE_BITS,
     STORE,
     CommonOpcode,
+    fusions,
 )
 
 if TYPE_CHECKING:
@@ -30,6 +32,8 @@ class ControlUnit1(ControlUnit):
         store = STORE
         swap = 0x20
 
+    FUSIONS = fusions({Opcode.comp}, CONDJUMP_OPCODES, "_cond_jump_tail")
+
     IR_BITS = OPCODE_BITS + ControlUnit.ADDRESS_BITS
     WORD_BITS = IR_BITS
     ALU_REGISTERS = AluRegisters(
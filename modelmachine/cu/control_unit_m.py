@@ -16,25 +16,18 @@ class ControlUnitM(ControlUnitR):
         addr = 0x11
 
     def _decode(self) -> None:
-        if self._opcode in JUMP_OPCODES:
+        opcode = self._opcode
+        if opcode in JUMP_OPCODES:
             self._expect_zero(-REG_NO_BITS)
 
-        if self._opcode == self.Opcode.halt:
+        if opcode == self.Opcode.halt:
             self._expect_zero()
 
-        self._registers[RegisterName.R] = self._ir[
-            self._ram.address_bits + REG_NO_BITS : self._ram.address_bits
-            + 2 * REG_NO_BITS
-        ]
-        self._registers[RegisterName.M] = self._ir[
-            self._ram.address_bits : self._ram.address_bits + REG_NO_BITS
-        ]
-        if self._m == RegisterName.R0:
-            modifier = Cell(0, bits=self._ram.address_bits)
-        else:
-            modifier = self._registers[self._m][: self._ram.address_bits]
-        self._registers[RegisterName.ADDR] = (
-            self._ir[: self._ram.address_bits] + modifier
+        address = self._decode_registers()
+        if self._m_no != 0:
+            address += self._registers[self._m].unsigned
+        self._registers[RegisterName.ADDR] = Cell(
+            address, bits=self._ram.address_bits
         )
 
     EXEC_NOP = ControlUnitR.EXEC_NOP | {Opcode.addr}
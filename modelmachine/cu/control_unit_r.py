@@ -10,18 +10,31 @@ from .control_unit import ControlUnit
 from .opcode import (
     ARITHMETIC_OPCODES,
     COMP,
+    CONDJUMP_OPCODES,
     JUMP_OPCODES,
     LOAD,
     OPCODE_BITS,
     STORE,
     CommonOpcode,
+    fusions,
 )
+from .prefetch import Prefetch
 
 if TYPE_CHECKING:
     from typing import ClassVar, Final
 
+    from modelmachine.alu import ArithmeticLogicUnit
+    from modelmachine.memory.ram import RandomAccessMemory
+    from modelmachine.memory.register import RegisterMemory
+
 
 REG_NO_BITS = 4
+REG_NO_MASK = (1 << REG_NO_BITS) - 1
+# General purpose register by its number
+GENERAL_REGISTERS: Final = tuple(
+    RegisterName(RegisterName.R0 + reg_no)
+    for reg_no in range(1 << REG_NO_BITS)
+)
 
 
 class ControlUnitR(ControlUnit):
@@ -42,6 +55,10 @@ class ControlUnitR(ControlUnit):
         rumul = 0x33
         rudiv = 0x34
 
+    FUSIONS = fusions(
+        {Opcode.comp, Opcode.rcomp}, CONDJUMP_OPCODES, "_cond_jump_tail"
+    )
+
     IR_BITS = OPCODE_BITS + 2 * REG_NO_BITS + ControlUnit.ADDRESS_BITS
     WORD_BITS: ClassVar[int] = ControlUnit.ADDRESS_BITS
     ALU_REGISTERS = AluRegisters(
@@ -78,33 +95,58 @@ class ControlUnitR(ControlUnit):
         Opcode.rcomp,
     }
 
+    # Register numbers of the decoded instruction,
+    # registers R and M hold the same values for the debugger
+    _r_no: int
+    _m_no: int
+    # Memory operands of array loops are read in bulk
+    _operand_window: Prefetch | None
+
+    def __init__(
+        self,
+        *,
+        registers: RegisterMemory,
+        ram: RandomAccessMemory,
+        alu: ArithmeticLogicUnit,
+    ):
+        """See help(type(x))."""
+        super().__init__(registers=registers, ram=ram, alu=alu)
+        self._r_no = 0
+        self._m_no = 0
+        self._operand_window = (
+            Prefetch(ram) if ram.word_bits < alu.operand_bits else None
+        )
+
+    def disable_prefetch(self) -> None:
+        """Read every instruction and memory operand word by word."""
+        super().disable_prefetch()
+        self._operand_window = None
+
+    def disable_decode_tables(self) -> None:
+        """Decode also register numbers by slicing of IR cell."""
+        super().disable_decode_tables()
+        self._decode_registers = self._slice_registers  # type: ignore[method-assign]
+
     @property
     def _r(self) -> RegisterName:
-        return RegisterName(
-            RegisterName.R0._value_ + self._registers[RegisterName.R].unsigned
-        )
+        return GENERAL_REGISTERS[self._r_no]
 
     @property
     def _r_next(self) -> RegisterName:
-        reg_no = (
-            self._registers[RegisterName.R] + Cell(1, bits=REG_NO_BITS)
-        ).unsigned
-        return RegisterName(RegisterName.R0 + reg_no)
+        return GENERAL_REGISTERS[(self._r_no + 1) & REG_NO_MASK]
 
     @property
     def _m(self) -> RegisterName:
-        return RegisterName(
-            RegisterName.R0._value_ + self._registers[RegisterName.M].unsigned
-        )
+        return GENERAL_REGISTERS[self._m_no]
 
     _ONE_WORD_OPCODES: Final = REGISTER_OPCODES | {Opcode.halt}
 
     @classmethod
     def instruction_bits(cls, opcode: Opcode) -> int:
         if opcode in cls._ONE_WORD_OPCODES:
-            return ControlUnitR.WORD_BITS
+            return cls.WORD_BITS
 
-        return 2 * ControlUnitR.WORD_BITS
+        return 2 * cls.WORD_BITS
 
     _EXPECT_ZERO_M: Final = ARITHMETIC_OPCODES | {
         Opcode.comp,
@@ -112,24 +154,43 @@ class ControlUnitR(ControlUnit):
         Opcode.store,
     }
 
+    def _decode_registers(self) -> int:
+        """Decode register numbers into R and M, return address field."""
+        ir = self._ir.unsigned
+        address_bits = self._ram.address_bits
+        self._m_no = (ir >> address_bits) & REG_NO_MASK
+        self._r_no = (ir >> (address_bits + REG_NO_BITS)) & REG_NO_MASK
+        self._registers[RegisterName.R] = Cell(self._r_no, bits=REG_NO_BITS)
+        self._registers[RegisterName.M] = Cell(self._m_no, bits=REG_NO_BITS)
+        return ir & ((1 << address_bits) - 1)
+
+    def _slice_registers(self) -> int:
+        """Plain path of _decode_registers."""
+        address_bits = self._ram.address_bits
+        self._registers[RegisterName.R] = self._ir[
+            address_bits + REG_NO_BITS : address_bits + 2 * REG_NO_BITS
+        ]
+        self._registers[RegisterName.M] = self._ir[
+            address_bits : address_bits + REG_NO_BITS
+        ]
+        self._r_no = self._registers[RegisterName.R].unsigned
+        self._m_no = self._registers[RegisterName.M].unsigned
+        return self._ir[:address_bits].unsigned
+
     def _decode(self) -> None:
-        if self._opcode in self._EXPECT_ZERO_M:
+        opcode = self._opcode
+        if opcode in self._EXPECT_ZERO_M:
             self._expect_zero(self._ram.address_bits, -REG_NO_BITS)
 
-        if self._opcode in JUMP_OPCODES:
+        if opcode in JUMP_OPCODES:
             self._expect_zero(self._ram.address_bits)
 
-        if self._opcode == self.Opcode.halt:
+        if opcode == self.Opcode.halt:
             self._expect_zero()
 
-        self._registers[RegisterName.R] = self._ir[
-            self._ram.address_bits + REG_NO_BITS : self._ram.address_bits
-            + 2 * REG_NO_BITS
-        ]
-        self._registers[RegisterName.M] = self._ir[
-            self._ram.address_bits : self._ram.address_bits + REG_NO_BITS
-        ]
-        self._registers[RegisterName.ADDR] = self._ir[: self._ram.address_bits]
+        self._registers[RegisterName.ADDR] = Cell(
+            self._decode_registers(), bits=self._ram.address_bits
+        )
 
     _LOAD_FROM_MEMORY: Final = ARITHMETIC_OPCODES | {
         Opcode.comp,
@@ -141,17 +202,29 @@ class ControlUnitR(ControlUnit):
         | {Opcode.rcomp, Opcode.comp, Opcode.store}
     )
 
+    def _read_operand(self) -> Cell:
+        """Read operand by ADDR, from operand window if possible."""
+        address = self._address
+        bits = self._alu.operand_bits
+        if self._operand_window is not None:
+            words = bits // self._ram.word_bits
+            value = self._operand_window.read(address.unsigned, words)
+            if value is not None:
+                self._ram.count_read(address.unsigned, words)
+                return Cell(value, bits=bits)
+
+        return self._ram.fetch(address=address, bits=bits)
+
     def _load(self) -> None:
         """Load registers S and S1."""
-        if self._opcode in self._LOAD_FROM_MEMORY:
-            self._registers[RegisterName.S1] = self._ram.fetch(
-                address=self._address, bits=self._alu.operand_bits
-            )
+        opcode = self._opcode
+        if opcode in self._LOAD_FROM_MEMORY:
+            self._registers[RegisterName.S1] = self._read_operand()
 
-        if self._opcode in self.REGISTER_OPCODES:
+        if opcode in self.REGISTER_OPCODES:
             self._registers[RegisterName.S1] = self._registers[self._m]
 
-        if self._opcode in self._LOAD_S:
+        if opcode in self._LOAD_S:
             self._registers[RegisterName.S] = self._registers[self._r]
 
     _EXEC_SUB: Final = frozenset(
@@ -163,19 +236,20 @@ class ControlUnitR(ControlUnit):
 
     def _execute(self) -> None:
         """Execute the command."""
-        if self._opcode in self._EXEC_SUB:
+        opcode = self._opcode
+        if opcode in self._EXEC_SUB:
             self._alu.sub()
-        elif self._opcode in self._EXEC_MOV:
+        elif opcode in self._EXEC_MOV:
             self._registers[RegisterName.S] = self._registers[RegisterName.S1]
-        elif self._opcode == self.Opcode.radd:
+        elif opcode == self.Opcode.radd:
             self._alu.add()
-        elif self._opcode == self.Opcode.rumul:
+        elif opcode == self.Opcode.rumul:
             self._alu.umul()
-        elif self._opcode == self.Opcode.rudiv:
+        elif opcode == self.Opcode.rudiv:
             self._alu.udivmod()
-        elif self._opcode == self.Opcode.rsmul:
+        elif opcode == self.Opcode.rsmul:
             self._alu.smul()
-        elif self._opcode == self.Opcode.rsdiv:
+        elif opcode == self.Opcode.rsdiv:
             self._alu.sdivmod()
         else:
             super()._execute()
@@ -196,13 +270,14 @@ class ControlUnitR(ControlUnit):
 
     def _write_back(self) -> None:
         """Write result back."""
-        if self._opcode in self.WB_R1:
+        opcode = self._opcode
+        if opcode in self.WB_R1:
             self._registers[self._r] = self._registers[RegisterName.S]
 
-        if self._opcode in self._WB_R_NEXT:
+        if opcode in self._WB_R_NEXT:
             self._registers[self._r_next] = self._registers[RegisterName.S1]
 
-        if self._opcode == self.Opcode.store:
+        if opcode == self.Opcode.store:
             self._ram.put(
                 address=self._address, value=self._registers[RegisterName.S]
             )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from itertools import count
 from typing import TYPE_CHECKING
 
 from modelmachine.alu import AluRegisters
@@ -11,13 +12,21 @@ from .halt_error import HaltError
 from .opcode import (
     ARITHMETIC_OPCODES,
     COMP,
+    CONDJUMP_OPCODES,
     JUMP_OPCODES,
     OPCODE_BITS,
     CommonOpcode,
+    fusions,
 )
+from .stack_window import PlainStack, StackWindow
+from .status import Status
 
 if TYPE_CHECKING:
-    from typing import Final
+    from typing import ClassVar, Final
+
+    from modelmachine.alu import ArithmeticLogicUnit
+    from modelmachine.memory.ram import RandomAccessMemory
+    from modelmachine.memory.register import RegisterMemory
 
 
 class StackAccessError(KeyError, HaltError):
@@ -36,6 +45,15 @@ class ControlUnitS(ControlUnit):
         dup = 0x5C
         swap = 0x5D
 
+    FUSIONS: ClassVar = {
+        **fusions({Opcode.comp}, CONDJUMP_OPCODES, "_cond_jump_tail"),
+        **fusions(
+            {Opcode.push},
+            {Opcode.add, Opcode.sub, Opcode.smul, Opcode.umul},
+            "_arithmetic_tail",
+        ),
+    }
+
     IR_BITS = OPCODE_BITS + ControlUnit.ADDRESS_BITS
     WORD_BITS = 8
     ALU_REGISTERS = AluRegisters(
@@ -46,35 +64,75 @@ class ControlUnitS(ControlUnit):
     )
     CU_REGISTERS = ((RegisterName.SP, ControlUnit.ADDRESS_BITS),)
 
+    # Stack value takes 3 words
+    CELL_WORDS: Final = 3
+
+    _window: StackWindow | PlainStack
+    _sp: int
+
+    def __init__(
+        self,
+        *,
+        registers: RegisterMemory,
+        ram: RandomAccessMemory,
+        alu: ArithmeticLogicUnit,
+    ):
+        """See help(type(x))."""
+        super().__init__(registers=registers, ram=ram, alu=alu)
+        self._window = StackWindow(ram, alu.operand_bits)
+        self._sp = 0
+
+    def disable_stack_cache(self) -> None:
+        """Read every stack value from ram."""
+        self._window = PlainStack(self._ram, self._alu.operand_bits)
+
+    def run(self, max_steps: int | None = None) -> None:
+        """Execute until halt, stack writes are spilled to ram at exit."""
+        if (
+            self._hooks is not None
+            or self._registers.on_write is not None
+            or not self._window.defer_writes()
+        ):
+            super().run(max_steps)
+            return
+
+        words = max(self.INSTRUCTION_WORDS)
+        steps = count() if max_steps is None else range(max_steps)
+        try:
+            for _ in steps:
+                if self.status != Status.RUNNING:
+                    break
+                self._window.flush_below(
+                    self._registers[RegisterName.PC].unsigned + words
+                )
+                self.step()
+        finally:
+            self._window.flush()
+
     @property
     def _stack_size(self) -> int:
-        sp = self._registers[RegisterName.SP]
-        if sp == 0:
+        if self._sp == 0:
             return 0
-        return ((1 << self._ram.address_bits) - sp.unsigned) // 3
+        return (self._ram.memory_size - self._sp) // self.CELL_WORDS
 
-    @property
-    def _stack_pointer(self) -> Cell:
-        if self._stack_size == 0:
+    def _stack_address(self, depth: int) -> int:
+        """Address of stack value at depth, top of the stack is 0."""
+        if self._stack_size <= depth:
             msg = (
                 f"Read outside stack by opcode={self._opcode}; "
                 f"ir={self._registers[RegisterName.IR]}; "
                 f"stack size={self._stack_size}"
             )
             raise StackAccessError(msg)
-        return self._registers[RegisterName.SP]
+        return self._sp + depth * self.CELL_WORDS
 
-    @property
-    def _stack_pointer_next(self) -> Cell:
-        if self._stack_size <= 1:
-            msg = (
-                f"Read outside stack by opcode={self._opcode}; "
-                f"ir={self._registers[RegisterName.IR]}; "
-                f"stack size={self._stack_size}"
-            )
-            raise StackAccessError(msg)
-        return self._registers[RegisterName.SP] + Cell(
-            3, bits=self._ram.address_bits
+    def _move_sp(self, values: int) -> None:
+        """Pop positive or push negative number of values."""
+        self._sp = (self._sp + values * self.CELL_WORDS) % (
+            self._ram.memory_size
+        )
+        self._registers[RegisterName.SP] = Cell(
+            self._sp, bits=self._ram.address_bits
         )
 
     _OPCODES_WITH_ADDRESS: Final = JUMP_OPCODES | {
@@ -91,30 +149,31 @@ class ControlUnitS(ControlUnit):
 
     def _decode(self) -> None:
         self._registers[RegisterName.ADDR] = self._ir[: self._ram.address_bits]
+        self._sp = self._registers[RegisterName.SP].unsigned
 
     _LOAD_R1R2: Final = ARITHMETIC_OPCODES | {Opcode.comp, Opcode.swap}
     _LOAD_R1: Final = frozenset({Opcode.pop, Opcode.dup})
 
     def _load(self) -> None:
         """Load registers R1 and R2."""
-        if self._opcode == self.Opcode.push:
+        opcode = self._opcode
+        if opcode == self.Opcode.push:
+            self._window.flush_below(self._address.unsigned + self.CELL_WORDS)
             self._registers[RegisterName.R1] = self._ram.fetch(
                 address=self._address, bits=self._alu.operand_bits
             )
 
-        if self._opcode in self._LOAD_R1:
-            self._registers[RegisterName.R1] = self._ram.fetch(
-                address=self._stack_pointer, bits=self._alu.operand_bits
+        if opcode in self._LOAD_R1:
+            self._registers[RegisterName.R1] = self._window.read(
+                self._stack_address(0)
             )
 
-        if self._opcode in self._LOAD_R1R2:
-            self._registers[RegisterName.R1] = self._ram.fetch(
-                address=self._stack_pointer_next,
-                bits=self._alu.operand_bits,
+        if opcode in self._LOAD_R1R2:
+            self._registers[RegisterName.R1] = self._window.read(
+                self._stack_address(1)
             )
-
-            self._registers[RegisterName.R2] = self._ram.fetch(
-                address=self._stack_pointer, bits=self._alu.operand_bits
+            self._registers[RegisterName.R2] = self._window.read(
+                self._stack_address(0)
             )
 
     _SP_PLUS: Final = frozenset(
@@ -132,25 +191,20 @@ class ControlUnitS(ControlUnit):
 
     def _execute(self) -> None:
         """Add specific commands."""
-        if self._opcode == self.Opcode.comp:
+        opcode = self._opcode
+        if opcode == self.Opcode.comp:
             self._alu.sub()
-        elif self._opcode == self.Opcode.swap:
+        elif opcode == self.Opcode.swap:
             self._alu.swap()
         else:
             super()._execute()
 
-        if self._opcode == self.Opcode.comp:
-            self._registers[RegisterName.SP] += Cell(
-                6, bits=self._ram.address_bits
-            )
-        elif self._opcode in self._SP_PLUS:
-            self._registers[RegisterName.SP] += Cell(
-                3, bits=self._ram.address_bits
-            )
-        elif self._opcode in self._SP_MINUS:
-            self._registers[RegisterName.SP] -= Cell(
-                3, bits=self._ram.address_bits
-            )
+        if opcode == self.Opcode.comp:
+            self._move_sp(2)
+        elif opcode in self._SP_PLUS:
+            self._move_sp(1)
+        elif opcode in self._SP_MINUS:
+            self._move_sp(-1)
 
     _WB_R1: Final = frozenset(
         {
@@ -173,23 +227,37 @@ class ControlUnitS(ControlUnit):
 
     def _write_back(self) -> None:
         """Write result back."""
-        if self._opcode == self.Opcode.pop:
+        opcode = self._opcode
+        if opcode == self.Opcode.pop:
+            self._window.flush_below(self._address.unsigned + self.CELL_WORDS)
             self._ram.put(
                 address=self._address, value=self._registers[RegisterName.R1]
             )
 
-        if self._opcode in self._WB_R1:
-            self._ram.put(
-                address=self._stack_pointer,
-                value=self._registers[RegisterName.R1],
+        if opcode in self._WB_R1:
+            self._window.write(
+                self._stack_address(0), self._registers[RegisterName.R1]
             )
 
-        if self._opcode in self._WB_DWORD:
-            self._ram.put(
-                address=self._stack_pointer_next,
-                value=self._registers[RegisterName.R1],
+        if opcode in self._WB_DWORD:
+            self._window.write(
+                self._stack_address(1), self._registers[RegisterName.R1]
             )
-            self._ram.put(
-                address=self._stack_pointer,
-                value=self._registers[RegisterName.R2],
+            self._window.write(
+                self._stack_address(0), self._registers[RegisterName.R2]
             )
+
+    def _arithmetic_tail(self, opcode: Opcode) -> None:
+        """Arithmetic operation on the value pushed by the previous push."""
+        self._decode()
+        self._registers[RegisterName.R1] = self._window.read(
+            self._stack_address(1)
+        )
+        self._registers[RegisterName.R2] = self._window.read(
+            self._stack_address(0)
+        )
+        getattr(self._alu, str(opcode))()
+        self._move_sp(1)
+        self._window.write(
+            self._stack_address(0), self._registers[RegisterName.R1]
+        )
@@ -9,11 +9,13 @@ from .control_unit import ControlUnit
 from .opcode import (
     ARITHMETIC_OPCODES,
     COMP,
+    CONDJUMP_OPCODES,
     DWORD_WRITE_BACK,
     JUMP_OPCODES,
     MOVE,
     OPCODE_BITS,
     CommonOpcode,
+    fusions,
 )
 
 if TYPE_CHECKING:
@@ -31,6 +33,8 @@ class ControlUnitV(ControlUnit):
         move = MOVE
         comp = COMP
 
+    FUSIONS = fusions({Opcode.comp}, CONDJUMP_OPCODES, "_cond_jump_tail")
+
     IR_BITS = OPCODE_BITS + 2 * ControlUnit.ADDRESS_BITS
     WORD_BITS = 8
     ALU_REGISTERS = AluRegisters(
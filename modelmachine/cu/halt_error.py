@@ -3,3 +3,7 @@ from __future__ import annotations
 
 class HaltError(Exception):
     pass
+
+
+class EndOfInputError(HaltError):
+    """Input port reached end of stream, machine halts normally."""
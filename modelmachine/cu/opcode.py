@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from modelmachine.shared.enum_mixin import EnumMixin
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
 
 class CommonOpcode(EnumMixin):
     add = 0x01
@@ -60,3 +65,10 @@ CONDJUMP_OPCODES = frozenset(
     }
 )
 JUMP_OPCODES = CONDJUMP_OPCODES | {CommonOpcode.jump}
+
+
+def fusions(
+    heads: Iterable[CommonOpcode], tails: Iterable[CommonOpcode], handler: str
+) -> dict[tuple[CommonOpcode, CommonOpcode], str]:
+    """Fusion table: every tail after every head runs by handler."""
+    return {(head, tail): handler for head in heads for tail in tails}
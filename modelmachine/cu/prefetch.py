@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from modelmachine.cell import Endianess
+
+if TYPE_CHECKING:
+    from array import array
+    from typing import Final
+
+    from modelmachine.memory.ram import RandomAccessMemory
+
+
+class Prefetch:
+    """Buffer of raw words following the program counter.
+
+    Variable length instructions are read from the buffer at once
+    instead of word by word. Buffer is refilled, when the instruction
+    is outside of it (after jumps) or when a write changes words
+    of the buffer; writes elsewhere only move its version forward.
+    Dirty memory, memory end and mapped ports are left to ram.fetch,
+    which reports them.
+    """
+
+    WINDOW: Final = 16
+
+    _ram: Final[RandomAccessMemory]
+    _start: int
+    _stop: int
+    _words: array[int]
+    _version: int
+
+    def __init__(self, ram: RandomAccessMemory):
+        self._ram = ram
+        self._start = 0
+        self._stop = 0
+        self._words = ram.read_words(0, 0)
+        self._version = ram.version
+
+    def _refill(self, address: int) -> None:
+        ram = self._ram
+        self._start = address
+        self._stop = ram.filled_until(
+            address, min(address + self.WINDOW, ram.memory_size)
+        )
+        self._words = ram.read_words(address, self._stop)
+        self._version = ram.version
+
+    def _is_clean(self) -> bool:
+        """Check that writes since the last check missed the buffer."""
+        written = self._ram.written_since(self._version)
+        if written is None or any(
+            start < self._stop and self._start < stop
+            for start, stop in written
+        ):
+            return False
+        self._version = self._ram.version
+        return True
+
+    def read(self, address: int, words: int) -> int | None:
+        """Return value of words at address, None if ram has to read it."""
+        ram = self._ram
+        if ram.has_ports:
+            return None
+
+        if (
+            (ram.version != self._version and not self._is_clean())
+            or address < self._start
+            or address + words > self._stop
+        ):
+            self._refill(address)
+            if address + words > self._stop:
+                return None
+
+        offset = address - self._start
+        chunk = self._words[offset : offset + words]
+        if ram.endianess is Endianess.LITTLE:
+            chunk.reverse()
+
+        value = 0
+        for word in chunk:
+            value = (value << ram.word_bits) | word
+        return value
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from modelmachine.cell import Cell
+from modelmachine.memory.ram import RandomAccessMemory
+
+if TYPE_CHECKING:
+    from typing import Final
+
+
+class PlainStack:
+    """Stack values read and written in ram, plain path of StackWindow."""
+
+    _ram: Final[RandomAccessMemory]
+    _bits: Final[int]
+
+    def __init__(self, ram: RandomAccessMemory, bits: int):
+        self._ram = ram
+        self._bits = bits
+
+    def read(self, address: int) -> Cell:
+        return self._ram.fetch(
+            address=Cell(address, bits=self._ram.address_bits),
+            bits=self._bits,
+        )
+
+    def write(self, address: int, value: Cell) -> None:
+        self._ram.put(
+            address=Cell(address, bits=self._ram.address_bits), value=value
+        )
+
+    @staticmethod
+    def defer_writes() -> bool:
+        return False
+
+    def flush_below(self, stop: int) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class StackWindow:
+    """Cache of stack values for stack machines, kept as ints.
+
+    By default writes go through to memory. Control unit run defers
+    them with defer_writes: written values stay in the window and are
+    counted as ram access, but are spilled to ram only by flush,
+    which run calls on exit, and by flush_below before the cpu reads
+    or writes the same addresses by other means. Writes are deferred
+    only while nobody can observe memory during run: no hooks, no
+    mapped ports, no recording of history and no watching of writes;
+    the debugger executes step by step, so it sees every write.
+    Pending values never overlap: values at another offset modulo
+    value size and values over memory end spill the pending ones
+    and go to ram as usual.
+    Cached values are read without decoding memory words; any other
+    write into memory changes ram version and drops them.
+    """
+
+    _ram: Final[RandomAccessMemory]
+    _bits: Final[int]
+    _words: Final[int]
+    _values: Final[dict[int, int]]
+    _pending: Final[dict[int, int]]
+    _deferred: bool
+    _low: int
+    _phase: int
+    _version: int
+
+    def __init__(self, ram: RandomAccessMemory, bits: int):
+        self._ram = ram
+        self._bits = bits
+        self._words = bits // ram.word_bits
+        self._values = {}
+        self._pending = {}
+        self._deferred = False
+        self._low = ram.memory_size
+        self._phase = 0
+        self._version = ram.version
+
+    def read(self, address: int) -> Cell:
+        if self._pending and address % self._words != self._phase:
+            self._spill()
+
+        value = self._pending.get(address)
+        if value is not None:
+            self._ram.count_read(address, self._words)
+            return Cell(value, bits=self._bits)
+
+        if self._ram.version != self._version:
+            self._values.clear()
+            self._version = self._ram.version
+
+        value = self._values.get(address)
+        if value is not None and not self._ram.has_ports:
+            self._ram.count_read(address, self._words)
+            return Cell(value, bits=self._bits)
+
+        cell = self._ram.fetch(
+            address=Cell(address, bits=self._ram.address_bits),
+            bits=self._bits,
+        )
+        self._values[address] = cell.unsigned
+        self._version = self._ram.version
+        return cell
+
+    def write(self, address: int, value: Cell) -> None:
+        if self._deferred and address + self._words <= self._ram.memory_size:
+            if self._pending and address % self._words != self._phase:
+                self._spill()
+            self._phase = address % self._words
+            self._ram.count_write(address, self._words)
+            self._pending[address] = value.unsigned
+            self._low = min(self._low, address)
+            return
+
+        self._spill()
+        if self._ram.version != self._version:
+            self._values.clear()
+        self._ram.put(
+            address=Cell(address, bits=self._ram.address_bits), value=value
+        )
+        self._values[address] = value.unsigned
+        self._version = self._ram.version
+
+    def defer_writes(self) -> bool:
+        """Keep written values until flush, if memory is not observed."""
+        self._deferred = (
+            type(self._ram) is RandomAccessMemory and not self._ram.has_ports
+        )
+        return self._deferred
+
+    def flush_below(self, stop: int) -> None:
+        """Spill pending values before access of memory below stop."""
+        if stop > self._low:
+            self._spill()
+
+    def flush(self) -> None:
+        """Spill pending values to ram and stop deferring writes."""
+        self._deferred = False
+        self._spill()
+
+    def _spill(self) -> None:
+        if not self._pending:
+            return
+
+        if self._ram.version != self._version:
+            self._values.clear()
+        for address in sorted(self._pending):
+            value = self._pending[address]
+            self._ram.put(
+                address=Cell(address, bits=self._ram.address_bits),
+                value=Cell(value, bits=self._bits),
+                from_cpu=False,
+            )
+            self._values[address] = value
+        self._pending.clear()
+        self._low = self._ram.memory_size
+        self._version = self._ram.version
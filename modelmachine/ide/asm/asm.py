@@ -3,13 +3,13 @@ from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
 from functools import lru_cache
-from itertools import chain
+from itertools import chain, groupby
 from typing import TYPE_CHECKING
 
 import pyparsing as pp
 from pyparsing import Group as Gr
 
-from modelmachine.cell import Cell
+from modelmachine.cell import Cell, Endianess
 from modelmachine.cu.opcode import OPCODE_BITS
 from modelmachine.ide.common_parsing import (
     ch,
@@ -21,6 +21,7 @@ from modelmachine.ide.common_parsing import (
     posinteger,
 )
 from modelmachine.ide.directive import Directive
+from modelmachine.io import Patcher
 from modelmachine.memory.ram import Comment
 
 from .errors import (
@@ -36,7 +37,7 @@ from .opcode_table import OPCODE_TABLE
 from .operand import Addressing, Operand
 
 if TYPE_CHECKING:
-    from typing import Callable, Final, Iterator, Sequence
+    from typing import Callable, Final, Iterable, Iterator, Sequence
 
     from modelmachine.cpu.cpu import Cpu
     from modelmachine.cu.control_unit import ControlUnit
@@ -63,6 +64,15 @@ class Link:
     addr: Cell
 
 
+@dataclass(frozen=True)
+class Cursor:
+    """Assembler position: next address, current function, pending labels."""
+
+    addr: int
+    func: Label | None
+    labels: tuple[str, ...]
+
+
 @dataclass(frozen=True)
 class Ref:
     addr: Cell
@@ -229,8 +239,19 @@ def enroll(operands: Sequence[Operand]) -> Iterator[Operand]:
             yield from enroll((op.modifier,))
 
 
+@lru_cache(maxsize=None)
+def patcher(decl: Operand, word_bits: int, endianess: Endianess) -> Patcher:
+    return Patcher.create(
+        offset_bits=decl.offset_bits,
+        bits=decl.bits,
+        word_bits=word_bits,
+        endianess=endianess,
+    )
+
+
 class Asm:
     _opcode_table: Final[dict[CommonOpcode, Sequence[Operand]]]
+    _patchers: Final[dict[Operand, Patcher]]
     _cpu: Final[Cpu]
     _labels: dict[str, Link]
     _refs: list[Ref]
@@ -238,10 +259,15 @@ class Asm:
     _cur_labels: list[str]
     _cur_addr: Cell
 
-    def __init__(self, cpu: Cpu):
+    def __init__(self, cpu: Cpu, labels: dict[str, Link] | None = None):
         self._opcode_table = OPCODE_TABLE[type(cpu.control_unit)]
         self._cpu = cpu
-        self._labels = {}
+        self._patchers = {
+            decl: patcher(decl, cpu.ram.word_bits, cpu.ram.endianess)
+            for operands in self._opcode_table.values()
+            for decl in enroll(operands)
+        }
+        self._labels = {} if labels is None else labels
         self._refs = []
         self._cur_addr = Cell(0, bits=self._cpu.ram.address_bits)
         self._cur_func = None
@@ -304,7 +330,7 @@ class Asm:
         pstr: str,
         loc: int,
         opcode: CommonOpcode,
-        arguments: pp.ParseResults,
+        arguments: Iterable[Label | int | None],
     ) -> None:
         instr_bits = self._cpu.control_unit.instruction_bits(opcode)
         instr = Cell(
@@ -324,6 +350,7 @@ class Asm:
             instr_len.unsigned, com, is_instruction=True
         )
         self._cur_labels = []
+        fields = []
         for decl, arg in zip(enroll(self._opcode_table[opcode]), arguments):
             if isinstance(arg, Label):
                 label = self.fullname(arg)
@@ -338,13 +365,11 @@ class Asm:
                 addr = self.address(
                     pstr, loc, instr_addr, decl, arg, immediate=True
                 )
-                self._cpu.io_unit.override(
-                    address=instr_addr,
-                    offset_bits=decl.offset_bits,
-                    value=addr,
-                )
+                fields.append((self._patchers[decl], addr.unsigned))
             else:
                 assert arg is None
+        if fields:
+            self._cpu.io_unit.patch(instr_addr.unsigned, fields)
 
     def put_word(self, pstr: str, loc: int, word: pp.ParseResults) -> None:
         original = "".join(word)
@@ -379,6 +404,11 @@ class Asm:
             self._cur_func = label
 
         label = self.fullname(label)
+        self.check_duplicate(label)
+        self._labels[label.name] = Link(label=label, addr=self._cur_addr)
+        self._cur_labels.append(f"{label.name}:")
+
+    def check_duplicate(self, label: Label) -> None:
         if label.name in self._labels:
             prev = self._labels[label.name].label
             pcol = pp.col(prev.loc, prev.pstr)
@@ -391,35 +421,68 @@ class Asm:
             )
             raise DuplicateLabelError(pstr=label.pstr, loc=label.loc, msg=msg)
 
-        self._labels[label.name] = Link(label=label, addr=self._cur_addr)
-        self._cur_labels.append(f"{label.name}:")
+    def add_links(self, links: dict[str, Link], refs: list[Ref]) -> None:
+        """Add labels and references of separately assembled code."""
+        for link in links.values():
+            self.check_duplicate(link.label)
+        self._labels.update(links)
+        self._refs.extend(refs)
+
+    @property
+    def labels(self) -> dict[str, Link]:
+        return self._labels
+
+    @property
+    def refs(self) -> list[Ref]:
+        return self._refs
+
+    @property
+    def cursor(self) -> Cursor:
+        return Cursor(
+            self._cur_addr.unsigned, self._cur_func, tuple(self._cur_labels)
+        )
+
+    def seek(self, cursor: Cursor) -> None:
+        self._cur_addr = Cell(cursor.addr, bits=self._cpu.ram.address_bits)
+        self._cur_func = cursor.func
+        self._cur_labels = list(cursor.labels)
+
+    def parse_cmd(self, pstr: str, cmd: pp.ParseResults) -> None:
+        cmd_name = Cmd(cmd.get_name())
+        loc: int = cmd["loc"]
+        if cmd_name == Cmd.word:
+            for x in cmd:
+                self.put_word(pstr, loc, x)
+        elif cmd_name == Cmd.label:
+            self.store_label(cmd[0])
+        elif cmd_name == Cmd.instruction:
+            self.put_instruction(pstr, loc, cmd[0], cmd[1:])
+        else:
+            msg = f"Unknown asm command: {cmd.get_name()}"
+            raise NotImplementedError(msg)
 
     def parse(self, pstr: str, address: int, code: pp.ParseResults) -> None:
-        self._cur_addr = Cell(address, bits=self._cpu.ram.address_bits)
-        self._cur_func = None
+        self.seek(Cursor(address, None, tuple(self._cur_labels)))
 
         for cmd in code:
-            cmd_name = Cmd(cmd.get_name())
-            loc: int = cmd["loc"]
-            if cmd_name == Cmd.word:
-                for x in cmd:
-                    self.put_word(pstr, loc, x)
-            elif cmd_name == Cmd.label:
-                self.store_label(cmd[0])
-            elif cmd_name == Cmd.instruction:
-                self.put_instruction(pstr, loc, cmd[0], cmd[1:])
-            else:
-                msg = f"Unknown asm command: {cmd.get_name()}"
-                raise NotImplementedError(msg)
+            self.parse_cmd(pstr, cmd)
 
     def link(self) -> None:
-        for ref in self._refs:
-            int_addr = self.resolve(ref.label)
-            addr = self.address(
-                ref.label.pstr, ref.label.loc, ref.addr, ref.decl, int_addr
-            )
-            self._cpu.io_unit.override(
-                address=ref.addr,
-                offset_bits=ref.decl.offset_bits,
-                value=addr,
-            )
+        """Resolve references, all operands of instruction at once.
+
+        Also maps addresses to label names for reports.
+        """
+        for instr_addr, refs in groupby(
+            self._refs, key=lambda ref: ref.addr.unsigned
+        ):
+            fields = []
+            for ref in refs:
+                int_addr = self.resolve(ref.label)
+                addr = self.address(
+                    ref.label.pstr, ref.label.loc, ref.addr, ref.decl, int_addr
+                )
+                fields.append((self._patchers[ref.decl], addr.unsigned))
+            self._cpu.io_unit.patch(instr_addr, fields)
+
+        for name, link in self._labels.items():
+            self._cpu.labels.setdefault(link.addr.unsigned, name)
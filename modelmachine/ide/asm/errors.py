@@ -13,6 +13,10 @@ class UnexpectedLocalLabelError(ParsingError):
     pass
 
 
+class WrongIOBlockError(ParsingError):
+    pass
+
+
 class ExpectedPositiveIntegerError(ParsingError):
     pass
 
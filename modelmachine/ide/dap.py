@@ -0,0 +1,375 @@
+"""Debug adapter protocol server for model machine.
+
+Server reads requests from input stream and writes responses and
+events to output stream, messages are framed by Content-Length header.
+Stepping is done by Ide, continue runs on the background worker of Ide,
+so requests are served while the machine is running.
+Breakpoints are instruction breakpoints by word address of memory.
+Memory reference is a byte address: memory is read as bytes of words
+in big endian order, so word address times bytes per word is
+the memory reference of the word.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import sys
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+from typing import TYPE_CHECKING
+
+from modelmachine.cell import Cell
+from modelmachine.cu.status import Status
+from modelmachine.memory.register import RegisterName
+
+from .debug import Ide
+
+if TYPE_CHECKING:
+    from typing import Any, BinaryIO, Callable, Final
+
+    from modelmachine.cpu.cpu import Cpu
+
+THREAD_ID = 1
+REGISTERS_REF = 1
+
+CAPABILITIES = {
+    "supportsConfigurationDoneRequest": True,
+    "supportsStepBack": True,
+    "supportsInstructionBreakpoints": True,
+    "supportsReadMemoryRequest": True,
+}
+
+
+class DapError(Exception):
+    pass
+
+
+def read_message(fin: BinaryIO) -> dict[str, Any] | None:
+    """Returns None at the end of stream."""
+    length = None
+    while True:
+        line = fin.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+
+    if length is None:
+        msg = "Missed Content-Length header"
+        raise DapError(msg)
+
+    res = json.loads(fin.read(length).decode("utf-8"))
+    assert isinstance(res, dict)
+    return res
+
+
+def write_message(fout: BinaryIO, message: dict[str, Any]) -> None:
+    data = json.dumps(message).encode("utf-8")
+    fout.write(f"Content-Length: {len(data)}\r\n\r\n".encode("ascii") + data)
+    fout.flush()
+
+
+class DebugAdapter:
+    ide: Final[Ide]
+    _fin: Final[BinaryIO]
+    _fout: Final[BinaryIO]
+    _seq: int
+    _write_lock: Final[threading.Lock]
+    _start: Callable[[], bool] | None
+    _done: bool
+    _stop_reason: str | None
+    _handlers: Final[dict[str, Callable[[dict[str, Any]], Any]]]
+
+    def __init__(self, *, cpu: Cpu, fin: BinaryIO, fout: BinaryIO):
+        self.ide = Ide(cpu=cpu, colors=False)
+        self._fin = fin
+        self._fout = fout
+        self._seq = 0
+        self._write_lock = threading.Lock()
+        self._start = None
+        self._done = False
+        self._stop_reason = None
+        self._handlers = {
+            "initialize": self.initialize,
+            "launch": self.launch,
+            "attach": self.launch,
+            "configurationDone": self.configuration_done,
+            "setBreakpoints": self.set_breakpoints,
+            "setInstructionBreakpoints": self.set_instruction_breakpoints,
+            "setExceptionBreakpoints": self.set_exception_breakpoints,
+            "threads": self.threads,
+            "stackTrace": self.stack_trace,
+            "scopes": self.scopes,
+            "variables": self.variables,
+            "readMemory": self.read_memory,
+            "next": self.step,
+            "stepIn": self.step,
+            "stepOut": self.step,
+            "stepBack": self.step_back,
+            "continue": self.continue_,
+            "reverseContinue": self.reverse_continue,
+            "pause": self.pause,
+            "disconnect": self.disconnect,
+            "terminate": self.disconnect,
+        }
+
+    def send(self, message: dict[str, Any]) -> None:
+        with self._write_lock:
+            self._seq += 1
+            message["seq"] = self._seq
+            write_message(self._fout, message)
+
+    def event(self, event: str, body: dict[str, Any] | None = None) -> None:
+        message: dict[str, Any] = {"type": "event", "event": event}
+        if body is not None:
+            message["body"] = body
+        self.send(message)
+
+    def stopped(self, reason: str) -> None:
+        if self.ide.cpu.control_unit.status == Status.HALTED:
+            if not self.ide.cpu.control_unit.failed:
+                with StringIO() as fout:
+                    self.ide.cpu.print_result(fout)
+                    result = fout.getvalue()
+                self.event("output", {"category": "stdout", "output": result})
+            reason = "halted"
+        self.event(
+            "stopped",
+            {
+                "reason": reason,
+                "threadId": THREAD_ID,
+                "allThreadsStopped": True,
+            },
+        )
+
+    def handle(self, request: dict[str, Any]) -> None:
+        command = request.get("command", "")
+        response: dict[str, Any] = {
+            "type": "response",
+            "request_seq": request.get("seq", 0),
+            "command": command,
+            "success": True,
+        }
+        handler = self._handlers.get(command)
+        if handler is None:
+            handler = self.unsupported
+        self._stop_reason = None
+        try:
+            body = handler(request.get("arguments") or {})
+        except DapError as exc:
+            response["success"] = False
+            response["message"] = str(exc)
+        except Exception as exc:  # noqa: BLE001
+            # Bad request must not stop the server
+            response["success"] = False
+            response["message"] = f"{type(exc).__name__}: {exc}"
+        else:
+            if body is not None:
+                response["body"] = body
+        self.send(response)
+
+        if command == "initialize" and response["success"]:
+            self.event("initialized")
+        # Worker is started after response, so stopped event follows it
+        if self._start is not None:
+            exec_step, self._start = self._start, None
+            self.ide.run_background(exec_step, self._on_stop)
+        if self._stop_reason is not None:
+            self.stopped(self._stop_reason)
+
+    def serve(self) -> None:
+        # Ide reports to stdout, which is the protocol channel
+        with redirect_stdout(sys.stderr):
+            while not self._done:
+                request = read_message(self._fin)
+                if request is None:
+                    break
+                self.handle(request)
+            self.stop()
+
+    def check_paused(self) -> None:
+        if self.ide.is_running:
+            msg = "Machine is running, pause it first"
+            raise DapError(msg)
+
+    @staticmethod
+    def unsupported(_args: dict[str, Any]) -> None:
+        msg = "Unsupported request"
+        raise DapError(msg)
+
+    @staticmethod
+    def initialize(_args: dict[str, Any]) -> dict[str, Any]:
+        return CAPABILITIES
+
+    @staticmethod
+    def launch(_args: dict[str, Any]) -> None:
+        return None
+
+    def configuration_done(self, _args: dict[str, Any]) -> None:
+        self._stop_reason = "entry"
+
+    @staticmethod
+    def set_breakpoints(args: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "breakpoints": [
+                {
+                    "verified": False,
+                    "message": "Use instruction breakpoints by address",
+                }
+                for _ in args.get("breakpoints", [])
+            ]
+        }
+
+    @staticmethod
+    def set_exception_breakpoints(_args: dict[str, Any]) -> None:
+        return None
+
+    def set_instruction_breakpoints(
+        self, args: dict[str, Any]
+    ) -> dict[str, Any]:
+        bits = self.ide.cpu.ram.address_bits
+        breakpoints = []
+        res = []
+        for br in args["breakpoints"]:
+            address = int(br["instructionReference"], 0) + br.get("offset", 0)
+            verified = 0 <= address < self.ide.cpu.ram.memory_size
+            if verified:
+                breakpoints.append(Cell(address, bits=bits))
+            res.append(
+                {
+                    "verified": verified,
+                    "instructionReference": f"0x{address:x}",
+                }
+            )
+        with self.ide.lock:
+            self.ide.set_breakpoints(breakpoints)
+        return {"breakpoints": res}
+
+    def threads(self, _args: dict[str, Any]) -> dict[str, Any]:
+        return {"threads": [{"id": THREAD_ID, "name": self.ide.cpu.name}]}
+
+    def stack_trace(self, _args: dict[str, Any]) -> dict[str, Any]:
+        with self.ide.lock:
+            pc = self.ide.cpu.registers[RegisterName.PC]
+            comment = self.ide.cpu.ram.comment.get(pc.unsigned)
+            name = self.ide.opcode_str
+            if comment is not None and comment.is_instruction:
+                name = comment.text.strip()
+        return {
+            "stackFrames": [
+                {
+                    "id": 0,
+                    "name": name,
+                    "line": 0,
+                    "column": 0,
+                    "instructionPointerReference": f"0x{pc.unsigned:x}",
+                }
+            ],
+            "totalFrames": 1,
+        }
+
+    @staticmethod
+    def scopes(_args: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "scopes": [
+                {
+                    "name": "Registers",
+                    "presentationHint": "registers",
+                    "variablesReference": REGISTERS_REF,
+                    "expensive": False,
+                }
+            ]
+        }
+
+    def variables(self, args: dict[str, Any]) -> dict[str, Any]:
+        if args["variablesReference"] != REGISTERS_REF:
+            return {"variables": []}
+        with self.ide.lock:
+            state = self.ide.cpu.registers.state
+        return {
+            "variables": [
+                {
+                    "name": reg.name,
+                    "value": str(value),
+                    "variablesReference": 0,
+                }
+                for reg, value in state.items()
+            ]
+        }
+
+    def read_memory(self, args: dict[str, Any]) -> dict[str, Any]:
+        ram = self.ide.cpu.ram
+        word_bytes = ram.word_bits // 8
+        start = int(args["memoryReference"], 0) + args.get("offset", 0)
+        stop = min(start + args["count"], ram.memory_size * word_bytes)
+        start = max(start, 0)
+        if start >= stop:
+            return {"address": f"0x{start:x}", "data": ""}
+
+        with self.ide.lock:
+            words = ram.read_words(start // word_bytes, -(-stop // word_bytes))
+        data = b"".join(
+            word.to_bytes(word_bytes, "big") for word in words.tolist()
+        )
+        skip = start % word_bytes
+        return {
+            "address": f"0x{start:x}",
+            "data": base64.b64encode(data[skip : skip + stop - start]).decode(
+                "ascii"
+            ),
+        }
+
+    def step(self, _args: dict[str, Any]) -> None:
+        self.check_paused()
+        if self.ide.cpu.control_unit.status == Status.HALTED:
+            msg = "Machine halted"
+            raise DapError(msg)
+        with self.ide.lock:
+            self.ide.exec_step(breakp=False)
+        self._stop_reason = "step"
+
+    def step_back(self, _args: dict[str, Any]) -> None:
+        self.check_paused()
+        with self.ide.lock:
+            self.ide.exec_reverse_step(breakp=False)
+        self._stop_reason = "step"
+
+    def _on_stop(self) -> None:
+        self.stopped("entry" if self.ide.cycle == 0 else "breakpoint")
+
+    def _continue(self, exec_step: Callable[[], bool]) -> dict[str, Any]:
+        self.check_paused()
+        self._start = exec_step
+        return {"allThreadsContinued": True}
+
+    def continue_(self, _args: dict[str, Any]) -> dict[str, Any]:
+        if self.ide.cpu.control_unit.status == Status.HALTED:
+            msg = "Machine halted"
+            raise DapError(msg)
+        return self._continue(lambda: self.ide.exec_step(breakp=True))
+
+    def reverse_continue(self, _args: dict[str, Any]) -> dict[str, Any]:
+        return self._continue(lambda: self.ide.exec_reverse_step(breakp=True))
+
+    def pause(self, _args: dict[str, Any]) -> None:
+        if self.ide.pause_background():
+            self._stop_reason = "pause"
+
+    def stop(self) -> None:
+        self.ide.stop()
+
+    def disconnect(self, _args: dict[str, Any]) -> None:
+        self.stop()
+        self._done = True
+
+
+def dap(*, cpu: Cpu, fin: BinaryIO, fout: BinaryIO) -> int:
+    """Serve debug adapter protocol."""
+    DebugAdapter(cpu=cpu, fin=fin, fout=fout).serve()
+    return 0
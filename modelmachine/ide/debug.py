@@ -4,7 +4,9 @@ from __future__ import annotations
 
 import signal
 import sys
+import threading
 import warnings
+from array import array
 from contextlib import contextmanager
 from typing import TYPE_CHECKING
 
@@ -23,10 +25,11 @@ from .common_parsing import kw, posinteger
 
 if TYPE_CHECKING:
     from types import FrameType
-    from typing import Callable, Final, Iterator
+    from typing import Callable, Final, Iterable, Iterator
 
     from modelmachine.cpu.cpu import Cpu
-    from modelmachine.memory.ram import Comment
+    from modelmachine.memory.ram import Comment, RecordingRandomAccessMemory
+    from modelmachine.memory.register import RecordingRegisterMemory
 
 stepc = Gr((kw("step") | kw("s")) + posinteger[0, 1])("step")
 rstepc = Gr((kw("reverse-step") | kw("rstep") | kw("rs")) + posinteger[0, 1])(
@@ -41,7 +44,24 @@ breakc = Gr((kw("breakpoint") | kw("break") | kw("b")) + posinteger[0, 1])(
 )
 memoryc = Gr((kw("memory") | kw("m")) + posinteger[0, 2])("memory")
 quitc = Gr(kw("quit") | kw("q"))("quit")
-debug_cmd = stepc | rstepc | continuec | rcontinuec | memoryc | quitc | breakc
+pausec = Gr(kw("pause") | kw("p"))("pause")
+statusc = Gr(kw("status"))("status")
+debug_cmd = (
+    stepc
+    | rstepc
+    | continuec
+    | rcontinuec
+    | memoryc
+    | quitc
+    | breakc
+    | pausec
+    | statusc
+)
+
+# Commands, which are allowed while machine is running in background
+BACKGROUND_CMDS = frozenset(
+    ("pause", "status", "memory", "breakpoint", "quit")
+)
 
 
 def tabulate(data: list[tuple[Callable[[str], str], str, str]]) -> str:
@@ -54,9 +74,12 @@ def tabulate(data: list[tuple[Callable[[str], str], str, str]]) -> str:
 
 class Ide:
     cpu: Cpu
+    _ram: Final[RecordingRandomAccessMemory]
+    _registers: Final[RecordingRegisterMemory]
     max_register_hex: Final[int]
     _cycle: int
-    _ram_access_count: list[int]
+    # Ram access count after every step, see history of ram
+    _ram_access_count: array[int]
     _quit: bool
     _running: bool
     _breakpoints: set[Cell]
@@ -64,16 +87,24 @@ class Ide:
     _page_size: int
     _cell_width: int
     _page_overflow: int
+    _page_cache: dict[int, tuple[bool, str]]
+    _worker: threading.Thread | None
+    lock: Final[threading.Lock]
+    _warnings: list[str]
+    _worker_warnings: list[str]
+    _changed: set[int]
+    _rendered: set[int]
 
     def __init__(self, *, cpu: Cpu, colors: bool):
         self.cpu = cpu
-        self.cpu.registers.write_log = [{}]
-        self.cpu.ram.write_log = [{}]
+        # Ram and registers of the cpu record history for reverse steps
+        self._registers = cpu.registers.record_history()
+        self._ram = cpu.ram.record_history()
         self.max_register_hex = (
             max(cpu.registers[reg].bits for reg in cpu.registers) // 4 + 2
         )
         self._cycle = 0
-        self._ram_access_count = [0]
+        self._ram_access_count = array("Q", [0])
         self._quit = False
         self._running = False
         self._breakpoints = set()
@@ -83,6 +114,13 @@ class Ide:
         self._page_overflow = (
             self.cpu.control_unit.IR_BITS // self.cpu.ram.word_bits - 1
         )
+        self._page_cache = {}
+        self._worker = None
+        self.lock = threading.Lock()
+        self._warnings = []
+        self._worker_warnings = []
+        self._changed = set()
+        self._rendered = set()
 
     @contextmanager
     def running(self) -> Iterator[None]:
@@ -100,33 +138,55 @@ class Ide:
             signal.signal(signal.SIGINT, prev_handler)
             self._running = False
 
+    @contextmanager
+    def collect_warnings(self) -> Iterator[None]:
+        """Collect warnings of commands and of background execution.
+
+        Warnings filters are global for all threads, so they are set once
+        for the whole session and warnings of the worker are kept apart.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("always")
+            warnings.showwarning = self._show_warning
+            yield
+
+    def _show_warning(
+        self, message: Warning | str, *_args: object, **_kwargs: object
+    ) -> None:
+        if threading.current_thread() is self._worker:
+            self._worker_warnings.append(str(message))
+        else:
+            self._warnings.append(str(message))
+
+    @staticmethod
+    def _print_warnings(warns: list[str]) -> None:
+        for warn in warns:
+            printf(f"Warning: {warn}")
+        warns.clear()
+
     @property
     def is_breakpoint(self) -> bool:
         current_cmd = self.current_cmd
-        assert self.cpu.ram.write_log is not None
+        written = self._ram.history.last_step()
         for br in self._breakpoints:
             if br.unsigned in current_cmd:
                 printf(self.c.error(f"pause at breakpoint: operation at {br}"))
                 return True
-            for addr in self.cpu.ram.write_log[-1]:
-                if br.unsigned == addr:
-                    printf(
-                        self.c.error(
-                            f"pause at data breakpoint: write to {br}"
-                        )
-                    )
-                    return True
+            if br.unsigned in written:
+                printf(
+                    self.c.error(f"pause at data breakpoint: write to {br}")
+                )
+                return True
         return False
 
     def exec_step(self, *, breakp: bool) -> bool:
         """Returns if we should continue execution."""
         self._cycle += 1
-        assert self.cpu.registers.write_log is not None
-        self.cpu.registers.write_log.append({})
-        assert self.cpu.ram.write_log is not None
-        self.cpu.ram.write_log.append({})
+        self._registers.history.new_step()
+        self._ram.history.new_step()
         self.cpu.control_unit.step()
         self._ram_access_count.append(self.cpu.ram.access_count)
+        self._changed.update(self._ram.history.last_step())
 
         if breakp and self.is_breakpoint:
             return False
@@ -157,8 +217,9 @@ class Ide:
         self._cycle -= 1
         self._ram_access_count.pop()
 
-        self.cpu.registers.debug_reverse_step()
-        self.cpu.ram.debug_reverse_step()
+        self._registers.debug_reverse_step()
+        self._changed.update(self._ram.history.last_step())
+        self._ram.debug_reverse_step()
 
         self.cpu.ram.access_count = self._ram_access_count[-1]
 
@@ -194,19 +255,99 @@ class Ide:
 
         self.dump_state()
 
+    @property
+    def is_running(self) -> bool:
+        """Machine is running in background."""
+        return self._worker is not None and self._worker.is_alive()
+
+    def _run_background(
+        self, exec_step: Callable[[], bool], on_stop: Callable[[], None]
+    ) -> None:
+        while self._running:
+            with self.lock:
+                if not exec_step():
+                    break
+
+        with self.lock:
+            stopped = self._running
+            self._running = False
+            if stopped:
+                on_stop()
+
+    def run_background(
+        self, exec_step: Callable[[], bool], on_stop: Callable[[], None]
+    ) -> None:
+        """Exec steps on worker thread until exec_step returns False.
+
+        Steps are done under the lock. Worker calls on_stop under the lock
+        if machine stopped by itself and not by pause_background.
+        """
+        self._running = True
+        self._worker_warnings.clear()
+        self._worker = threading.Thread(
+            target=self._run_background,
+            args=(exec_step, on_stop),
+            daemon=True,
+        )
+        self._worker.start()
+
+    def pause_background(self) -> bool:
+        """Stop background execution at step boundary.
+
+        Returns True if machine was paused and False if it had stopped
+        by itself.
+        """
+        if self._worker is None:
+            return False
+
+        with self.lock:
+            paused = self._running
+            self._running = False
+        self._worker.join()
+        return paused
+
+    def _report_stop(self) -> None:
+        self.dump_state()
+        self._print_warnings(self._worker_warnings)
+
     def continue_(self) -> None:
-        """Exec debug continue command."""
+        """Exec debug continue command in background."""
 
         if self.cpu.control_unit.status == Status.HALTED:
             printf(self.c.error("cannot execute 'continue': machine halted"))
             return
 
-        with self.running():
-            while self._running:
-                if not self.exec_step(breakp=True):
-                    break
+        self.run_background(
+            lambda: self.exec_step(breakp=True), self._report_stop
+        )
+        printf(
+            self.c.info(
+                "running in background; enter 'pause' to stop"
+                " or 'status' to view progress"
+            )
+        )
 
-        self.dump_state()
+    def pause(self) -> None:
+        """Stop background execution at step boundary."""
+        if not self.is_running:
+            printf(self.c.error("cannot execute 'pause': machine is paused"))
+            return
+
+        if self.pause_background():
+            self._report_stop()
+
+    def status(self) -> None:
+        with self.lock:
+            if self.cpu.control_unit.status == Status.HALTED:
+                state = "halted"
+            elif self.is_running:
+                state = "running"
+            else:
+                state = "paused"
+            printf(
+                f"Cycle: {self._cycle:>4} | "
+                f"PC: {self.cpu.registers[RegisterName.PC]} | {state}"
+            )
 
     def dump_state(self) -> None:
         """Print contents of registers."""
@@ -221,14 +362,11 @@ class Ide:
         )
         self.dump_full_memory()
         printf("")
+        updated = self._registers.history.last_step()
         for reg, value in self.cpu.registers.state.items():
             hex_data = str(value).rjust(self.max_register_hex, " ")
             line = f"  {reg.name:<5s}  {hex_data}"
-            assert self.cpu.registers.write_log is not None
-            if (
-                reg in {RegisterName.PC, RegisterName.IR}
-                or reg in self.cpu.registers.write_log[-1]
-            ):
+            if reg in {RegisterName.PC, RegisterName.IR} or reg in updated:
                 printf(self.c.just_updated(line))
             else:
                 printf(line)
@@ -272,38 +410,32 @@ class Ide:
 
     def _format_range(self, mem_range: range, current_cmd: range) -> str:
         assert mem_range.step == 1
-        line = ""
-
-        for col in mem_range:
-            cell_addr = Cell(col, bits=self.cpu.ram.address_bits)
-            cell = self.cpu.ram.fetch(
-                address=cell_addr,
-                bits=self.cpu.ram.word_bits,
-                from_cpu=False,
-            )
-
-            cell_value = cell.hex()
-
-            if cell_addr in self._breakpoints:
+        updated = self._ram.history.last_step()
+        breakpoints = {br.unsigned for br in self._breakpoints}
+        words = self.cpu.io_unit.hex_words(mem_range.start, mem_range.stop)
+        line = []
+
+        for col, word in zip(mem_range, words):
+            cell_value = word
+            if col in breakpoints:
                 cell_value = self.c.breakpoint(cell_value)
 
-            assert self.cpu.ram.write_log is not None
-            if cell_addr.unsigned in self.cpu.ram.write_log[-1]:
+            if col in updated:
                 cell_value = self.c.just_updated(cell_value)
-            elif not self.cpu.ram.is_fill(cell_addr):
+            elif not self.cpu.ram.has_fill(col, col + 1):
                 cell_value = self.c.dirty_memory(cell_value)
 
-            if cell_addr in current_cmd:
-                if cell_addr.unsigned == current_cmd.start:
+            if col in current_cmd:
+                if col == current_cmd.start:
                     cell_value = f" {self.c.next_command(cell_value)}"
                 else:
                     cell_value = self.c.next_command(f" {cell_value}")
             else:
                 cell_value = f" {cell_value}"
 
-            line += cell_value
+            line.append(cell_value)
 
-        return line
+        return "".join(line)
 
     def _before_space(self, start: int) -> str:
         return (
@@ -384,7 +516,19 @@ class Ide:
 
         return res
 
-    def dump_full_memory(self) -> None:
+    def _dirty_pages(self, current_cmd: range) -> set[int]:
+        """Pages with cells changed since the previous rendering."""
+        highlighted = self._ram.history.last_step().union(current_cmd)
+        dirty = self._changed | self._rendered | highlighted
+        self._changed = set()
+        self._rendered = highlighted
+        # Line of instruction may start on the previous page
+        return {addr // self._page_size for addr in dirty} | {
+            (addr - self._page_overflow) // self._page_size for addr in dirty
+        }
+
+    def render_full_memory(self) -> str:
+        """Render filled pages, reuse pages rendered before."""
         page_set: set[int] = set()
         for interval in self.cpu.ram.filled_intervals:
             page_set.update(
@@ -396,18 +540,32 @@ class Ide:
 
         page_list = sorted(page_set)
         current_cmd = self.current_cmd
+        dirty_pages = self._dirty_pages(current_cmd)
+        res = []
         for i, page in enumerate(page_list):
             has_printed_prev = i > 0 and page_list[i - 1] == page - 1
             if i > 0 and not has_printed_prev:
-                printf(self.c.dirty_memory("... dirty memory ..."))
-            printf(
-                self._format_page(
-                    page,
-                    current_cmd=current_cmd,
-                    has_printed_prev=has_printed_prev,
-                ),
-                end="",
-            )
+                res.append(self.c.dirty_memory("... dirty memory ...") + "\n")
+            cached = self._page_cache.get(page)
+            if (
+                cached is None
+                or cached[0] != has_printed_prev
+                or page in dirty_pages
+            ):
+                cached = (
+                    has_printed_prev,
+                    self._format_page(
+                        page,
+                        current_cmd=current_cmd,
+                        has_printed_prev=has_printed_prev,
+                    ),
+                )
+                self._page_cache[page] = cached
+            res.append(cached[1])
+        return "".join(res)
+
+    def dump_full_memory(self) -> None:
+        printf(self.render_full_memory(), end="")
 
     def memory(self, begin: int = -1, end: int = -1) -> None:
         """Print contents of RAM."""
@@ -436,6 +594,14 @@ class Ide:
                 end="",
             )
 
+    @property
+    def cycle(self) -> int:
+        return self._cycle
+
+    def set_breakpoints(self, addresses: Iterable[Cell]) -> None:
+        self._page_cache.clear()
+        self._breakpoints = set(addresses)
+
     def breakpoint(self, addr: int = -1) -> None:
         if addr == -1:
             if self._breakpoints:
@@ -446,6 +612,7 @@ class Ide:
             return
 
         ram_addr = Cell(addr, bits=self.cpu.ram.address_bits)
+        self._page_cache.clear()
         if ram_addr in self._breakpoints:
             self._breakpoints.remove(ram_addr)
             printf(self.c.info(f"Unset breakpoint at {ram_addr}"))
@@ -463,6 +630,15 @@ class Ide:
 
         cmd_name = parsed_cmd.get_name()
 
+        if self.is_running and cmd_name not in BACKGROUND_CMDS:
+            printf(
+                self.c.error(
+                    f"cannot execute '{cmd_name}': machine is running,"
+                    " enter 'pause' first"
+                )
+            )
+            return True
+
         if cmd_name == "step":
             self.step(*parsed_cmd[0])
         elif cmd_name == "reverse_step":
@@ -472,16 +648,27 @@ class Ide:
         elif cmd_name == "reverse_continue":
             self.reverse_continue()
         elif cmd_name == "memory":
-            self.memory(*parsed_cmd[0])
+            with self.lock:
+                self.memory(*parsed_cmd[0])
         elif cmd_name == "quit":
+            self.stop()
             self._quit = True
         elif cmd_name == "breakpoint":
-            self.breakpoint(*parsed_cmd[0])
+            with self.lock:
+                self.breakpoint(*parsed_cmd[0])
+        elif cmd_name == "pause":
+            self.pause()
+        elif cmd_name == "status":
+            self.status()
         else:
             return False
 
         return True
 
+    def stop(self) -> None:
+        """Stop background execution silently."""
+        self.pause_background()
+
     def confirm_quit(self) -> bool:
         try:
             approve = prompt("\nQuit? (y/n)> ").lower()
@@ -531,7 +718,9 @@ class Ide:
         instruction = (
             "\nEnter\n"
             f"  {self.c.hl('s')}tep [count=1]        make count of steps\n"
-            f"  {self.c.hl('c')}ontinue              continue until breakpoint or halt\n"
+            f"  {self.c.hl('c')}ontinue              continue in background until breakpoint or halt\n"
+            f"  {self.c.hl('p')}ause                 pause background execution\n"
+            f"  status                view cycle and PC of running machine\n"
             f"  {self.c.hl('b')}reakpoint [addr]     set/unset breakpoint at addr\n"
             f"  {self.c.hl('m')}emory [begin] [end]  view random access memory\n"
             f"  {self.c.hl('rs')}tep [count=1]       make count of steps in reverse direction\n"
@@ -542,24 +731,28 @@ class Ide:
         command = ""
 
         need_help = True
-        while not self._quit:
-            if need_help:
-                printf(instruction)
-
-            try:
-                command = prompt("> ") or command
-            except (KeyboardInterrupt, EOFError):
-                if not self._quit:
-                    self.confirm_quit()
-                continue
-
-            with warnings.catch_warnings(record=True) as warns:
-                warnings.simplefilter("always")
+        with self.collect_warnings():
+            while not self._quit:
+                if need_help:
+                    printf(instruction)
+
+                try:
+                    command = prompt("> ") or command
+                except KeyboardInterrupt:
+                    if self.is_running:
+                        self.pause()
+                    elif not self._quit:
+                        self.confirm_quit()
+                    continue
+                except EOFError:
+                    if not self._quit:
+                        self.confirm_quit()
+                    continue
 
                 need_help = not self.cmd(command)
+                self._print_warnings(self._warnings)
 
-                for warn in warns:
-                    printf(f"Warning: {warn.message}")
+            self.stop()
 
         return 0
 
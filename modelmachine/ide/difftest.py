@@ -0,0 +1,385 @@
+"""Differential testing of execution engines.
+
+Random programs are generated from opcode tables of the assembler:
+valid instructions with random operands, raw words with garbage bits
+and random data with corner values. Reference engine is the plain
+path with every optimization switched off, candidate engines switch
+them on. Every program runs in both engines in lockstep, registers,
+memory, printed messages, warnings and status are compared after
+every step. Engines of RUN_ENGINES execute the program by one
+control_unit.run call, their state is compared only at the end.
+Failed programs are shrunk to minimal reproducers, which are printed
+as machine code source.
+"""
+
+from __future__ import annotations
+
+import random
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass, replace
+from io import StringIO
+from typing import TYPE_CHECKING, Union
+
+from modelmachine.cell import Cell
+from modelmachine.cpu.cpu import CU_MAP, Cpu
+from modelmachine.cu.control_unit_0 import ControlUnit0
+from modelmachine.cu.control_unit_s import ControlUnitS
+from modelmachine.cu.opcode import OPCODE_BITS
+from modelmachine.cu.status import Status
+
+from .asm.asm import Asm, Cursor, enroll
+from .asm.opcode_table import OPCODE_TABLE
+from .asm.operand import Addressing
+from .dump import dump
+
+if TYPE_CHECKING:
+    from array import array
+    from typing import Callable, Final, Sequence
+
+    from modelmachine.cu.opcode import CommonOpcode
+
+    from .asm.operand import Operand
+
+DATA_ADDRESS = 0x100
+MAX_STEPS = 200
+
+
+def _hook(*_args: object) -> None:
+    pass
+
+
+def _hooked(cpu: Cpu) -> None:
+    for on in (
+        cpu.hooks.on_fetch,
+        cpu.hooks.on_execute,
+        cpu.hooks.on_ram_write,
+        cpu.hooks.on_register_write,
+        cpu.hooks.on_halt,
+    ):
+        on(_hook)
+
+
+def _no_stack_cache(cpu: Cpu) -> None:
+    if isinstance(cpu.control_unit, (ControlUnit0, ControlUnitS)):
+        cpu.control_unit.disable_stack_cache()
+
+
+def _plain(cpu: Cpu) -> None:
+    _no_stack_cache(cpu)
+    cpu.control_unit.disable_prefetch()
+    cpu.control_unit.disable_decode_tables()
+    cpu.control_unit.disable_width_ops()
+
+
+# Engine prepares cpu for execution by control_unit.step
+ENGINES: Final[dict[str, Callable[[Cpu], None]]] = {
+    "plain": _plain,
+    "step": lambda _cpu: None,
+    "hooks": _hooked,
+    "fusion": lambda cpu: cpu.control_unit.enable_fusion(),
+    "no-prefetch": lambda cpu: cpu.control_unit.disable_prefetch(),
+    "no-decode-tables": lambda cpu: cpu.control_unit.disable_decode_tables(),
+    "no-width-ops": lambda cpu: cpu.control_unit.disable_width_ops(),
+    "no-stack-cache": _no_stack_cache,
+    "run": lambda _cpu: None,
+}
+REFERENCE = "plain"
+# Engines executing the whole program by control_unit.run
+RUN_ENGINES: Final = frozenset({"run"})
+
+
+@dataclass(frozen=True)
+class Instruction:
+    opcode: CommonOpcode
+    arguments: tuple[int, ...]
+
+
+Item = Union[Instruction, int]
+
+
+@dataclass(frozen=True)
+class Program:
+    cpu_name: str
+    code: tuple[Item, ...]
+    data: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    program: Program
+    seed: int
+    step: int
+    message: str
+
+    def __str__(self) -> str:
+        with StringIO() as fout:
+            dump(load_program(self.program), fout)
+            source = fout.getvalue()
+        return (
+            f"{self.program.cpu_name} seed={self.seed} step={self.step}:"
+            f" {self.message}\n{source}"
+        )
+
+
+def _corner(rng: random.Random, bits: int) -> int:
+    """Half of values are corner cases of arithmetic."""
+    corners = (0, 1, (1 << bits) - 1, 1 << (bits - 1), (1 << (bits - 1)) - 1)
+    choice = rng.randrange(2 * len(corners))
+    if choice < len(corners):
+        return corners[choice]
+    return rng.getrandbits(bits)
+
+
+def _is_jump(opcode: CommonOpcode) -> bool:
+    return str(opcode).lstrip("su").startswith("j")
+
+
+def _argument(
+    rng: random.Random,
+    decl: Operand,
+    *,
+    jump: bool,
+    size: int,
+    data_words: int,
+    io_words: int,
+) -> int:
+    if decl.addressing == Addressing.ABSOLUTE:
+        choice = rng.randrange(16)
+        if choice == 0:
+            return rng.getrandbits(decl.bits)
+        if jump or choice == 1:
+            return rng.randrange(size)
+        return DATA_ADDRESS + io_words * rng.randrange(data_words)
+    if decl.addressing == Addressing.PC_RELATIVE:
+        return rng.randrange(-4, 5)
+    if decl.addressing == Addressing.IMMEDIATE:
+        return _corner(rng, decl.bits)
+    return rng.getrandbits(decl.bits)
+
+
+def random_program(
+    cpu_name: str, seed: int, *, size: int = 32, data_words: int = 16
+) -> Program:
+    rng = random.Random(seed)  # noqa: S311
+    control_unit = CU_MAP[cpu_name]
+    table = OPCODE_TABLE[control_unit]
+    opcodes = list(table)
+    io_words = control_unit.IR_BITS // control_unit.WORD_BITS
+
+    code: list[Item] = []
+    for _ in range(size):
+        if rng.randrange(16) == 0:
+            word = rng.getrandbits(control_unit.WORD_BITS)
+            if rng.randrange(2) == 0:
+                raw_opcode = int(rng.choice(opcodes))
+                shift = control_unit.WORD_BITS - OPCODE_BITS
+                word = (raw_opcode << shift) | (word & ((1 << shift) - 1))
+            code.append(word)
+        else:
+            opcode = rng.choice(opcodes)
+            operands = list(enroll(table[opcode]))
+            code.append(
+                Instruction(
+                    opcode,
+                    tuple(
+                        _argument(
+                            rng,
+                            decl,
+                            jump=_is_jump(opcode) and i == len(operands) - 1,
+                            size=size,
+                            data_words=data_words,
+                            io_words=io_words,
+                        )
+                        for i, decl in enumerate(operands)
+                    ),
+                )
+            )
+
+    data = tuple(_corner(rng, control_unit.IR_BITS) for _ in range(data_words))
+    return Program(cpu_name, tuple(code), data)
+
+
+def load_program(program: Program) -> Cpu:
+    cpu = Cpu(control_unit=CU_MAP[program.cpu_name], protect_memory=True)
+    asm = Asm(cpu)
+    asm.seek(Cursor(0, None, ()))
+    address_bits = cpu.ram.address_bits
+    for item in program.code:
+        if isinstance(item, Instruction):
+            asm.put_instruction("", 0, item.opcode, item.arguments)
+        else:
+            address = asm.cursor.addr
+            cpu.ram.put(
+                address=Cell(address, bits=address_bits),
+                value=Cell(item, bits=cpu.ram.word_bits),
+                from_cpu=False,
+            )
+            asm.seek(Cursor(address + 1, None, ()))
+
+    data_address = Cell(DATA_ADDRESS, bits=address_bits)
+    for value in program.data:
+        data_address += cpu.ram.put(
+            address=data_address,
+            value=Cell(value, bits=cpu.io_unit.io_bits),
+            from_cpu=False,
+        )
+    return cpu
+
+
+@dataclass(frozen=True)
+class _State:
+    status: Status
+    failed: bool
+    registers: dict[str, int]
+    memory: array[int]
+    filled: list[range]
+    output: str
+    warnings: list[str]
+
+
+def _observe(cpu: Cpu, execute: Callable[[], None]) -> _State:
+    with StringIO() as fout, warnings.catch_warnings(record=True) as warns:
+        warnings.simplefilter("always")
+        with redirect_stdout(fout):
+            execute()
+        output = fout.getvalue()
+
+    return _State(
+        status=cpu.control_unit.status,
+        failed=cpu.control_unit.failed,
+        registers={
+            reg.name: value.unsigned
+            for reg, value in cpu.registers.state.items()
+        },
+        memory=cpu.ram.read_words(0, cpu.ram.memory_size),
+        filled=list(cpu.ram.filled_intervals),
+        output=output,
+        warnings=[str(warn.message) for warn in warns],
+    )
+
+
+def _step(cpu: Cpu) -> _State:
+    return _observe(cpu, cpu.control_unit.step)
+
+
+def _diff(ref: _State, cand: _State) -> str | None:
+    for field in ("status", "failed", "registers", "output", "warnings"):
+        if getattr(ref, field) != getattr(cand, field):
+            return (
+                f"{field} differs: {getattr(ref, field)!r}"
+                f" != {getattr(cand, field)!r}"
+            )
+    if ref.filled != cand.filled:
+        return f"filled memory differs: {ref.filled} != {cand.filled}"
+    if ref.memory != cand.memory:
+        for address, (a, b) in enumerate(zip(ref.memory, cand.memory)):
+            if a != b:
+                return f"memory differs at 0x{address:x}: 0x{a:x} != 0x{b:x}"
+    return None
+
+
+def compare(
+    program: Program, engine: str, *, max_steps: int = MAX_STEPS
+) -> tuple[int, str] | None:
+    """Run program in lockstep, returns step and difference or None."""
+    ref = load_program(program)
+    cand = load_program(program)
+    ENGINES[REFERENCE](ref)
+    ENGINES[engine](cand)
+    if engine in RUN_ENGINES:
+        return _compare_run(ref, cand, max_steps=max_steps)
+
+    for step in range(max_steps):
+        if ref.control_unit.status != Status.RUNNING:
+            break
+        diff = _diff(_step(ref), _step(cand))
+        if diff is not None:
+            return step, diff
+    return None
+
+
+def _compare_run(
+    ref: Cpu, cand: Cpu, *, max_steps: int
+) -> tuple[int, str] | None:
+    """Step reference, compare its final state with run of candidate."""
+    steps = 0
+
+    def step_ref() -> None:
+        nonlocal steps
+        while steps < max_steps and ref.control_unit.status == Status.RUNNING:
+            ref.control_unit.step()
+            steps += 1
+
+    ref_state = _observe(ref, step_ref)
+    diff = _diff(
+        ref_state, _observe(cand, lambda: cand.control_unit.run(max_steps))
+    )
+    if diff is not None:
+        return steps, diff
+    return None
+
+
+def shrink(program: Program, engine: str) -> Program:
+    """Remove code chunks and simplify data while program still fails."""
+    chunk = len(program.code) // 2
+    while chunk > 0:
+        i = 0
+        while i < len(program.code):
+            code = program.code[:i] + program.code[i + chunk :]
+            smaller = replace(program, code=code)
+            if code and compare(smaller, engine) is not None:
+                program = smaller
+            else:
+                i += chunk
+        chunk //= 2
+
+    for i, value in enumerate(program.data):
+        if value != 0:
+            data = program.data[:i] + (0,) + program.data[i + 1 :]
+            simpler = replace(program, data=data)
+            if compare(simpler, engine) is not None:
+                program = simpler
+    return program
+
+
+def check_seed(cpu_name: str, engine: str, seed: int) -> Mismatch | None:
+    program = random_program(cpu_name, seed)
+    if compare(program, engine) is None:
+        return None
+
+    program = shrink(program, engine)
+    res = compare(program, engine)
+    assert res is not None
+    step, message = res
+    return Mismatch(program, seed, step, message)
+
+
+def difftest(
+    cpu_names: Sequence[str],
+    engine: str,
+    *,
+    programs: int,
+    seed: int = 0,
+    jobs: int = 1,
+) -> list[Mismatch]:
+    """Check programs with seeds from seed on every cpu."""
+    if engine not in ENGINES:
+        msg = f"Unknown engine '{engine}', expected one of {list(ENGINES)}"
+        raise ValueError(msg)
+
+    tasks = [
+        (cpu_name, seed + i) for cpu_name in cpu_names for i in range(programs)
+    ]
+    names = [cpu_name for cpu_name, _ in tasks]
+    engines = [engine] * len(tasks)
+    seeds = [task_seed for _, task_seed in tasks]
+    if jobs <= 1:
+        results = list(map(check_seed, names, engines, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(
+                pool.map(check_seed, names, engines, seeds, chunksize=16)
+            )
+    return [res for res in results if res is not None]
@@ -8,3 +8,4 @@ class Directive(Enum):
     enter = ".enter"
     code = ".code"
     asm = ".asm"
+    import_ = ".import"
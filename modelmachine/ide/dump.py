@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+from bisect import bisect_left
+from itertools import islice
 from typing import TYPE_CHECKING
 
-from modelmachine.memory.ram import Comment
-
 if TYPE_CHECKING:
     from typing import TextIO
 
-    from modelmachine.cpu.cpu import Cpu
+    from modelmachine.cpu.cpu import Cpu, IOReq
+
+
+def _io_address(req: IOReq) -> str:
+    if req.count == 1:
+        return f"0x{req.address:x}"
+    return f"0x{req.address:x}[{req.count}]"
 
 
 def dump(cpu: Cpu, fout: TextIO) -> None:
@@ -15,35 +21,47 @@ def dump(cpu: Cpu, fout: TextIO) -> None:
 
     for req in cpu.input_req:
         msg = f" {req.message}" if req.message is not None else ""
-        fout.write(f".input 0x{req.address:x}{msg}\n")
+        fout.write(f".input {_io_address(req)}{msg}\n")
 
     for req in cpu.output_req:
         msg = f" {req.message}" if req.message is not None else ""
-        fout.write(f".output 0x{req.address:x}{msg}\n")
+        fout.write(f".output {_io_address(req)}{msg}\n")
 
     io_bits = cpu.io_unit.io_bits
     code_width = io_bits // 4 + io_bits // cpu.ram.word_bits
+    opcode_len = 8
+    split_opcode = cpu.ram.word_bits > opcode_len
+    starts = sorted(cpu.ram.comment)
 
     for seg in cpu.ram.filled_intervals:
         addr = f" 0x{seg.start:x}" if seg.start != 0 else ""
-        fout.write(f"\n.code{addr}\n")
+        lines = [f"\n.code{addr}\n"]
+        words = cpu.io_unit.hex_words(seg.start, seg.stop)
         i = seg.start
-        while i < seg.stop:
-            comment = cpu.ram.comment.get(i)
-            if comment is None:
-                comment = Comment(1, "")
-
-            line = cpu.io_unit.store_source(
-                start=i, bits=comment.len * cpu.ram.word_bits
+        for start in islice(starts, bisect_left(starts, seg.start), None):
+            if start >= seg.stop:
+                break
+            if start < i:
+                continue
+            lines.extend(
+                f"{words[j - seg.start].ljust(code_width)} ; {j:04x} ; \n"
+                for j in range(i, start)
             )
-            opcode_len = 8
-            if comment.is_instruction and cpu.ram.word_bits > opcode_len:
+            comment = cpu.ram.comment[start]
+            line = " ".join(
+                words[start - seg.start : start - seg.start + comment.len]
+            )
+            if comment.is_instruction and split_opcode:
                 line = line[:2] + " " + line[2:]
-
-            line = line.ljust(code_width)
-            fout.write(f"{line} ; {i:04x} ; {comment.text}\n")
-
-            i += comment.len
+            lines.append(
+                f"{line.ljust(code_width)} ; {start:04x} ; {comment.text}\n"
+            )
+            i = start + comment.len
+        lines.extend(
+            f"{words[j - seg.start].ljust(code_width)} ; {j:04x} ; \n"
+            for j in range(i, seg.stop)
+        )
+        fout.write("".join(lines))
 
     if cpu.enter:
         fout.write(f"\n.enter{cpu.enter}\n")
@@ -0,0 +1,290 @@
+"""Binary executable image of the model machine (.mmbin).
+
+Image is a magic number followed by a sequence of chunks.
+Chunk is a tag (4 bytes), payload size (u32) and payload padded
+to 8 bytes, so segment words are aligned for direct mapping into ram.
+All integers are little-endian.
+
+* HEAD - cpu name, word bits, address bits, endianess, bytes per word
+* SEGM - start address (u32), word count (u32) and raw words
+* INPT, OUTP - io requests: address (u32), count (u32) and optional
+  message
+* ENTR - default input data from .enter directives
+* CMNT - debug comments: address (u32), length (u32),
+  is instruction (u8) and text
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+from contextlib import suppress
+from typing import TYPE_CHECKING
+
+from modelmachine.cpu.cpu import CU_MAP, Cpu, IOReq
+from modelmachine.memory.ram import Comment
+
+if TYPE_CHECKING:
+    from typing import BinaryIO, Iterator
+
+    from modelmachine.memory.ram import RandomAccessMemory
+
+MAGIC = b"MMBIN\x00\x01\x00"
+ALIGN = 8
+
+HEAD = b"HEAD"
+SEGM = b"SEGM"
+INPT = b"INPT"
+OUTP = b"OUTP"
+ENTR = b"ENTR"
+CMNT = b"CMNT"
+
+_U32 = struct.Struct("<I")
+_CHUNK = struct.Struct("<4sI")
+_HEAD = struct.Struct("<BBBB")
+_SEGM = struct.Struct("<II")
+_IO = struct.Struct("<II")
+_COMMENT = struct.Struct("<IIB")
+NO_MESSAGE = 0xFFFF_FFFF
+
+TYPECODE_BY_SIZE = {array(t).itemsize: t for t in "QIHB"}
+
+
+class ImageError(SystemExit):
+    pass
+
+
+def is_image(filename: str) -> bool:
+    with open(filename, "rb") as fin:
+        return fin.read(len(MAGIC)) == MAGIC
+
+
+def _chunk(tag: bytes, payload: bytes) -> bytes:
+    padding = b"\x00" * (-len(payload) % ALIGN)
+    return _CHUNK.pack(tag, len(payload)) + payload + padding
+
+
+def _text(text: str | None) -> bytes:
+    if text is None:
+        return _U32.pack(NO_MESSAGE)
+    data = text.encode("utf-8")
+    return _U32.pack(len(data)) + data
+
+
+def _io_chunk(tag: bytes, io_req: list[IOReq]) -> bytes:
+    return _chunk(
+        tag,
+        b"".join(
+            _IO.pack(req.address, req.count) + _text(req.message)
+            for req in io_req
+        ),
+    )
+
+
+def _le_words(ram: RandomAccessMemory, seg: range) -> bytes:
+    words = ram.read_words(seg.start, seg.stop)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words.tobytes()
+
+
+def dump_image(cpu: Cpu, fout: BinaryIO) -> None:
+    ram = cpu.ram
+    itemsize = array(ram.typecode).itemsize
+
+    fout.write(MAGIC)
+    fout.write(
+        _chunk(
+            HEAD,
+            _text(cpu.name)
+            + _HEAD.pack(
+                ram.word_bits, ram.address_bits, ram.endianess, itemsize
+            ),
+        )
+    )
+
+    for seg in ram.filled_intervals:
+        fout.write(
+            _chunk(
+                SEGM,
+                _SEGM.pack(seg.start, len(seg)) + _le_words(ram, seg),
+            )
+        )
+
+    fout.write(_io_chunk(INPT, cpu.input_req))
+    fout.write(_io_chunk(OUTP, cpu.output_req))
+
+    if cpu.enter:
+        fout.write(_chunk(ENTR, cpu.enter.encode("utf-8")))
+
+    if ram.comment:
+        fout.write(
+            _chunk(
+                CMNT,
+                b"".join(
+                    _COMMENT.pack(address, comment.len, comment.is_instruction)
+                    + _text(comment.text)
+                    for address, comment in sorted(ram.comment.items())
+                ),
+            )
+        )
+
+
+class _Reader:
+    """Cursor over memory mapped payload."""
+
+    data: memoryview
+    pos: int
+
+    def __init__(self, data: memoryview):
+        self.data = data
+        self.pos = 0
+
+    @property
+    def eof(self) -> bool:
+        return self.pos >= len(self.data)
+
+    def unpack(self, fmt: struct.Struct) -> tuple[int, ...]:
+        if self.pos + fmt.size > len(self.data):
+            msg = "Unexpected end of binary image"
+            raise ImageError(msg)
+        res = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return res
+
+    def take(self, size: int) -> memoryview:
+        if self.pos + size > len(self.data):
+            msg = "Unexpected end of binary image"
+            raise ImageError(msg)
+        res = self.data[self.pos : self.pos + size]
+        self.pos += size
+        return res
+
+    def text(self) -> str | None:
+        (size,) = self.unpack(_U32)
+        if size == NO_MESSAGE:
+            return None
+        return bytes(self.take(size)).decode("utf-8")
+
+    def chunks(self) -> Iterator[tuple[bytes, _Reader]]:
+        while not self.eof:
+            tag, size = self.unpack(_CHUNK)
+            payload = self.take(size)
+            self.take(-size % ALIGN)
+            yield bytes(tag), _Reader(payload)
+
+
+def _load_segment(cpu: Cpu, itemsize: int, payload: _Reader) -> None:
+    start, count = payload.unpack(_SEGM)
+    data = payload.take(count * itemsize)
+    ram = cpu.ram
+
+    if ram.has_fill(start, start + count):
+        msg = f"Code sections overlaps at address 0x{start:x}"
+        raise ImageError(msg)
+
+    if itemsize == array(ram.typecode).itemsize and sys.byteorder == "little":
+        words: array[int] | memoryview = data.cast(
+            ram.typecode  # type: ignore[call-overload]
+        )
+    else:
+        words = array(TYPECODE_BY_SIZE[itemsize], data)
+        if sys.byteorder != "little":
+            words.byteswap()
+        words = array(ram.typecode, words)
+
+    if count and max(words) >> ram.word_bits:
+        msg = f"Too long word in segment at address 0x{start:x}"
+        raise ImageError(msg)
+
+    ram.write_words(start, words, from_cpu=False)
+
+
+def _load_io(payload: _Reader, io_req: list[IOReq]) -> None:
+    while not payload.eof:
+        address, count = payload.unpack(_IO)
+        io_req.append(IOReq(address, payload.text(), count))
+
+
+def _load_comments(cpu: Cpu, payload: _Reader) -> None:
+    while not payload.eof:
+        address, length, is_instruction = payload.unpack(_COMMENT)
+        text = payload.text()
+        assert text is not None
+        cpu.ram.comment[address] = Comment(
+            length, text, is_instruction=bool(is_instruction)
+        )
+
+
+def _load_head(payload: _Reader, *, protect_memory: bool) -> tuple[Cpu, int]:
+    cpu_name = payload.text()
+    word_bits, address_bits, endianess, itemsize = payload.unpack(_HEAD)
+
+    control_unit = CU_MAP.get(str(cpu_name))
+    if control_unit is None:
+        msg = f"Unknown cpu in binary image: {cpu_name}"
+        raise ImageError(msg)
+
+    cpu = Cpu(control_unit=control_unit, protect_memory=protect_memory)
+    if (
+        word_bits != cpu.ram.word_bits
+        or address_bits != cpu.ram.address_bits
+        or endianess != cpu.ram.endianess
+        or itemsize not in TYPECODE_BY_SIZE
+    ):
+        msg = (
+            f"Binary image header doesn't match {cpu_name}: "
+            f"word_bits={word_bits} address_bits={address_bits} "
+            f"endianess={endianess} itemsize={itemsize}"
+        )
+        raise ImageError(msg)
+
+    return cpu, itemsize
+
+
+def load_image(data: memoryview, *, protect_memory: bool) -> Cpu:
+    if bytes(data[: len(MAGIC)]) != MAGIC:
+        msg = "Unexpected binary image format"
+        raise ImageError(msg)
+
+    chunks = _Reader(data[len(MAGIC) :]).chunks()
+    try:
+        tag, payload = next(chunks)
+    except StopIteration:
+        tag = b""
+    if tag != HEAD:
+        msg = "Missed header in binary image"
+        raise ImageError(msg)
+
+    cpu, itemsize = _load_head(payload, protect_memory=protect_memory)
+
+    for tag, payload in chunks:
+        if tag == SEGM:
+            _load_segment(cpu, itemsize, payload)
+        elif tag == INPT:
+            _load_io(payload, cpu.input_req)
+        elif tag == OUTP:
+            _load_io(payload, cpu.output_req)
+        elif tag == ENTR:
+            cpu.enter = bytes(payload.data).decode("utf-8")
+        elif tag == CMNT:
+            _load_comments(cpu, payload)
+        else:
+            msg = f"Unknown chunk in binary image: {tag!r}"
+            raise ImageError(msg)
+
+    return cpu
+
+
+def load_image_file(filename: str, *, protect_memory: bool) -> Cpu:
+    with open(filename, "rb") as fin:
+        mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return load_image(memoryview(mm), protect_memory=protect_memory)
+        finally:
+            # Views into mapping may be still alive in traceback,
+            # then mapping is closed by garbage collector
+            with suppress(BufferError):
+                mm.close()
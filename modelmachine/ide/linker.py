@@ -0,0 +1,246 @@
+"""Object modules for .import directive.
+
+Module is a program with .cpu, .code and .asm directives, which is
+assembled separately without linking. Object module keeps assembled
+words, exported labels and unresolved references, so it is linked
+into the importing program by the same link step as the program
+itself. References are relocation entries: module can be moved to
+another load base, its words, labels and references are shifted and
+operands are resolved at link. Numeric addresses are not relocated.
+Object modules are cached by content hash in memory and
+in the user cache directory, so unchanged modules are never parsed
+again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from array import array
+from contextlib import suppress
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from modelmachine.__about__ import __version__
+from modelmachine.cell import Cell
+from modelmachine.memory.ram import Comment
+
+from .asm.asm import Label, Link, Ref
+from .asm.operand import Addressing, Operand
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+    from modelmachine.cpu.cpu import Cpu
+
+    from .asm.asm import Asm
+
+
+class ImportModuleError(SystemExit):
+    pass
+
+
+@dataclass(frozen=True)
+class ObjectModule:
+    cpu_name: str
+    image: list[tuple[int, array[int]]]
+    comment: dict[int, Comment]
+    labels: dict[str, Link]
+    refs: list[Ref]
+
+    @property
+    def origin(self) -> int:
+        """Lowest address of the module."""
+        return min((start for start, _ in self.image), default=0)
+
+    def relocate(self, base: int) -> ObjectModule:
+        """Return module moved to load base."""
+        offset = base - self.origin
+        if offset == 0:
+            return self
+
+        def shift(addr: Cell) -> Cell:
+            return Cell(addr.unsigned + offset, bits=addr.bits)
+
+        return ObjectModule(
+            cpu_name=self.cpu_name,
+            image=[(start + offset, words) for start, words in self.image],
+            comment={
+                address + offset: com for address, com in self.comment.items()
+            },
+            labels={
+                name: replace(link, addr=shift(link.addr))
+                for name, link in self.labels.items()
+            },
+            refs=[replace(ref, addr=shift(ref.addr)) for ref in self.refs],
+        )
+
+    def dumps(self, pstr: str, address_bits: int) -> str:
+        """Serialize module, all labels are declared in pstr."""
+        return json.dumps(
+            {
+                "cpu": self.cpu_name,
+                "pstr": pstr,
+                "address_bits": address_bits,
+                "image": [
+                    (start, words.typecode, words.tolist())
+                    for start, words in self.image
+                ],
+                "comment": [
+                    (address, asdict(com))
+                    for address, com in self.comment.items()
+                ],
+                "labels": [
+                    (link.label.name, link.label.loc, link.addr.unsigned)
+                    for link in self.labels.values()
+                ],
+                "refs": [
+                    (
+                        ref.addr.unsigned,
+                        asdict(ref.decl),
+                        ref.label.name,
+                        ref.label.loc,
+                    )
+                    for ref in self.refs
+                ],
+            }
+        )
+
+    @classmethod
+    def loads(cls, data: str) -> ObjectModule:
+        obj = json.loads(data)
+        pstr = obj["pstr"]
+        bits = obj["address_bits"]
+        return cls(
+            cpu_name=obj["cpu"],
+            image=[
+                (start, array(typecode, words))
+                for start, typecode, words in obj["image"]
+            ],
+            comment={
+                address: Comment(**com) for address, com in obj["comment"]
+            },
+            labels={
+                name: Link(Label(name, pstr, loc), Cell(addr, bits=bits))
+                for name, loc, addr in obj["labels"]
+            },
+            refs=[
+                Ref(
+                    addr=Cell(addr, bits=bits),
+                    decl=_operand(decl),
+                    label=Label(name, pstr, loc),
+                )
+                for addr, decl, name, loc in obj["refs"]
+            ],
+        )
+
+
+def _operand(decl: dict[str, Any]) -> Operand:
+    modifier = decl["modifier"]
+    return Operand(
+        offset_bits=decl["offset_bits"],
+        bits=decl["bits"],
+        addressing=Addressing(decl["addressing"]),
+        signed=decl["signed"],
+        modifier=None if modifier is None else _operand(modifier),
+    )
+
+
+_modules: dict[str, ObjectModule] = {}
+
+
+def cache_dir() -> Path:
+    cache = Path.home() / ".cache"
+    xdg_cache = os.getenv("XDG_CACHE_HOME")
+    if xdg_cache:
+        cache = Path(xdg_cache)
+
+    return cache / "modelmachine" / "modules"
+
+
+def object_module(cpu: Cpu, asm: Asm) -> ObjectModule:
+    return ObjectModule(
+        cpu_name=cpu.name,
+        image=[
+            (seg.start, cpu.ram.read_words(seg.start, seg.stop))
+            for seg in cpu.ram.filled_intervals
+        ],
+        comment=cpu.ram.comment,
+        labels=asm.labels,
+        refs=asm.refs,
+    )
+
+
+def load_module(
+    filename: Path, assemble: Callable[[str], tuple[ObjectModule, str]]
+) -> ObjectModule:
+    try:
+        data = filename.read_bytes()
+    except OSError as exc:
+        msg = f"Cannot import module '{filename}': {exc.strerror}"
+        raise ImportModuleError(msg) from exc
+
+    key = hashlib.sha256(__version__.encode() + b"\0" + data).hexdigest()
+    module = _modules.get(key)
+    if module is not None:
+        return module
+
+    cached = cache_dir() / f"{key}.json"
+    try:
+        module = ObjectModule.loads(cached.read_text(encoding="utf-8"))
+    except (OSError, ValueError, KeyError, TypeError):
+        module, serialized = assemble(data.decode("utf-8"))
+        with suppress(OSError):
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(serialized, encoding="utf-8")
+            tmp.replace(cached)
+
+    _modules[key] = module
+    return module
+
+
+def link_module(
+    cpu: Cpu,
+    asm: Asm,
+    module: ObjectModule,
+    filename: Path,
+    base: int | None = None,
+) -> None:
+    """Put module words into memory and add its labels to the program.
+
+    Module is moved to base, if it is given.
+    """
+    if module.cpu_name != cpu.name:
+        msg = (
+            f"Cannot import module '{filename}' for {module.cpu_name}"
+            f" into program for {cpu.name}"
+        )
+        raise ImportModuleError(msg)
+
+    if base is not None:
+        module = module.relocate(base)
+
+    for start, words in module.image:
+        stop = start + len(words)
+        if stop > cpu.ram.memory_size:
+            msg = (
+                f"Cannot import module '{filename}': it does not fit into"
+                f" memory at 0x{start:x}:0x{stop:x}"
+            )
+            raise ImportModuleError(msg)
+        if cpu.ram.has_fill(start, stop):
+            msg = (
+                f"Cannot import module '{filename}': it overlaps code of"
+                f" the program or other modules at 0x{start:x}:0x{stop:x},"
+                " set load address by .import ADDRESS FILE"
+            )
+            raise ImportModuleError(msg)
+
+    for start, words in module.image:
+        cpu.ram.write_words(start, words, from_cpu=False)
+
+    cpu.ram.comment.update(module.comment)
+    asm.add_links(module.labels, module.refs)
@@ -1,20 +1,34 @@
 from __future__ import annotations
 
 import sys
+from contextlib import contextmanager
 from io import StringIO
+from pathlib import Path
 from typing import TYPE_CHECKING
 
+from .image import is_image, load_image_file
 from .source import source
 from .user_config import user_config
 
 if TYPE_CHECKING:
+    from typing import Iterator, TextIO
+
     from modelmachine.cpu.cpu import Cpu
 
+    from .session import Session
+
 
 def load_from_string(
-    source_code: str, *, protect_memory: bool = True, enter: str | None = None
+    source_code: str,
+    *,
+    protect_memory: bool = True,
+    enter: str | None = None,
+    session: Session | None = None,
 ) -> Cpu:
-    cpu = source(source_code, protect_memory=protect_memory)
+    if session is None:
+        cpu = source(source_code, protect_memory=protect_memory)
+    else:
+        cpu = session.source(source_code, protect_memory=protect_memory)
 
     if enter is None:
         enter = cpu.enter
@@ -25,28 +39,41 @@ def load_from_string(
     return cpu
 
 
-def load_from_file(
-    filename: str, *, protect_memory: bool, enter: str | None
-) -> Cpu:
+def read_program(filename: str, *, protect_memory: bool) -> Cpu:
     if not protect_memory:
         protect_memory = user_config().get("protect_memory", False)
         assert isinstance(protect_memory, bool)
 
     if filename == "-":
-        source_code = sys.stdin.read()
-    else:
-        with open(filename, encoding="utf-8") as fin:
-            source_code = fin.read()
+        return source(sys.stdin.read(), protect_memory=protect_memory)
+    if is_image(filename):
+        return load_image_file(filename, protect_memory=protect_memory)
+    with open(filename, encoding="utf-8") as fin:
+        return source(
+            fin.read(),
+            protect_memory=protect_memory,
+            import_dir=Path(filename).parent,
+        )
 
-    cpu = source(source_code, protect_memory=protect_memory)
 
+@contextmanager
+def open_enter(cpu: Cpu, enter: str | None) -> Iterator[TextIO]:
     if enter is None:
         with StringIO(cpu.enter) as fin:
-            cpu.input(fin)
+            yield fin
     elif enter == "-":
-        cpu.input(sys.stdin)
+        yield sys.stdin
     else:
         with open(enter, encoding="utf-8") as fin:
-            cpu.input(fin)
+            yield fin
+
+
+def load_from_file(
+    filename: str, *, protect_memory: bool, enter: str | None
+) -> Cpu:
+    cpu = read_program(filename, protect_memory=protect_memory)
+
+    with open_enter(cpu, enter) as fin:
+        cpu.input(fin)
 
     return cpu
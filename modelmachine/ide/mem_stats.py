@@ -0,0 +1,111 @@
+"""Memory access statistics of the program run.
+
+Counts are collected by ram after enable_access_stats, report maps
+addresses back to labels and comments of the source.
+"""
+
+from __future__ import annotations
+
+import csv
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+    from modelmachine.cpu.cpu import Cpu
+
+HOT_ADDRESSES = 10
+
+
+@dataclass(frozen=True)
+class AddressStats:
+    address: int
+    reads: int
+    writes: int
+    label: str
+    comment: str
+
+    @property
+    def total(self) -> int:
+        return self.reads + self.writes
+
+
+def address_stats(cpu: Cpu) -> list[AddressStats]:
+    """Return stats of accessed addresses in order of address."""
+    reads = cpu.ram.read_counts
+    writes = cpu.ram.write_counts
+    assert reads is not None
+    assert writes is not None
+
+    labels = sorted(cpu.labels)
+    starts = sorted(cpu.ram.comment)
+    res = []
+    for address in range(cpu.ram.memory_size):
+        if not reads[address] and not writes[address]:
+            continue
+
+        label = ""
+        i = bisect_right(labels, address) - 1
+        if i >= 0:
+            offset = address - labels[i]
+            label = cpu.labels[labels[i]] + (f"+{offset}" if offset else "")
+
+        comment = None
+        i = bisect_right(starts, address) - 1
+        if i >= 0 and address < starts[i] + cpu.ram.comment[starts[i]].len:
+            comment = cpu.ram.comment[starts[i]]
+
+        res.append(
+            AddressStats(
+                address=address,
+                reads=reads[address],
+                writes=writes[address],
+                label=label,
+                comment="" if comment is None else comment.text.strip(),
+            )
+        )
+    return res
+
+
+def print_mem_stats(
+    cpu: Cpu, fout: TextIO, *, hot: int = HOT_ADDRESSES
+) -> None:
+    stats = address_stats(cpu)
+    reads = sum(st.reads for st in stats)
+    writes = sum(st.writes for st in stats)
+    ratio = f"{reads / writes:.2f}" if writes else "-"
+
+    fout.write(
+        "Memory access stats:\n"
+        f"  reads: {reads} words, writes: {writes} words,"
+        f" read/write ratio: {ratio}\n"
+        f"  working set: {len(stats)} words\n"
+    )
+    if not stats:
+        return
+
+    top = sorted(stats, key=lambda st: -st.total)[:hot]
+    label_width = max(len("label"), *(len(st.label) for st in top))
+    fout.write(
+        f"  hot addresses:\n"
+        f"    {'address':>7} {'reads':>7} {'writes':>7}"
+        f"  {'label':<{label_width}}  comment\n"
+    )
+    width = cpu.ram.address_bits // 4
+    for st in top:
+        line = (
+            f"    {f'0x{st.address:0{width}x}':>7} {st.reads:>7}"
+            f" {st.writes:>7}  {st.label:<{label_width}}  {st.comment}"
+        )
+        fout.write(line.rstrip() + "\n")
+
+
+def write_mem_stats_csv(cpu: Cpu, fout: TextIO) -> None:
+    writer = csv.writer(fout)
+    writer.writerow(("address", "label", "reads", "writes", "comment"))
+    for st in address_stats(cpu):
+        writer.writerow(
+            (f"0x{st.address:x}", st.label, st.reads, st.writes, st.comment)
+        )
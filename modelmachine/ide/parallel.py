@@ -0,0 +1,176 @@
+"""Parallel assembly of independent .asm sections.
+
+Bodies of .asm sections are parsed and encoded in a process pool,
+each section into its own memory image. Then images, label tables and
+references are merged in the program order and linked at once.
+Sections, which depend on each other (overlapped memory, duplicate
+labels, labels before the next section) or any error fall back
+to source(), so error messages are exactly the same.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from modelmachine.cpu.cpu import CU_MAP, Cpu
+
+from .asm.asm import Asm, Cursor, Link, Ref
+from .common_parsing import group_by_name
+from .directive import Directive
+from .session import ERRORS, line_language, split_sections
+from .source import (
+    cpud,
+    language,
+    link_imports,
+    parse_io_dir,
+    remove_comment,
+)
+from .source import source as full_source
+
+if TYPE_CHECKING:
+    from array import array
+
+    from modelmachine.memory.ram import Comment
+
+# Smaller programs are assembled faster without process pool
+MIN_LINES = 1000
+
+
+@dataclass(frozen=True)
+class Section:
+    image: list[tuple[int, array[int]]]
+    comment: dict[int, Comment]
+    labels: dict[str, Link]
+    refs: list[Ref]
+    pending: tuple[str, ...]
+
+
+def assemble_section(cpu_name: str, address: int, text: str) -> Section | None:
+    """Parse and encode section body without linking.
+
+    Returns None on any error.
+    """
+    try:
+        cpu = Cpu(control_unit=CU_MAP[cpu_name], protect_memory=False)
+        asm = Asm(cpu)
+        asm.seek(Cursor(address, None, ()))
+        for cmd in line_language(cpu_name).parse_string(text, parse_all=True):
+            asm.parse_cmd(text, cmd)
+    except ERRORS:
+        return None
+
+    return Section(
+        image=[
+            (seg.start, cpu.ram.read_words(seg.start, seg.stop))
+            for seg in cpu.ram.filled_intervals
+        ],
+        comment=cpu.ram.comment,
+        labels=asm.labels,
+        refs=asm.refs,
+        pending=asm.cursor.labels,
+    )
+
+
+def parallel_source(
+    pstr: str,
+    *,
+    protect_memory: bool,
+    jobs: int,
+    min_lines: int = MIN_LINES,
+    import_dir: Path | None = None,
+) -> Cpu:
+    try:
+        cpu = _parallel_source(
+            pstr,
+            protect_memory=protect_memory,
+            jobs=jobs,
+            min_lines=min_lines,
+            import_dir=Path() if import_dir is None else import_dir,
+        )
+    except ERRORS:
+        cpu = None
+    if cpu is None:
+        return full_source(
+            pstr, protect_memory=protect_memory, import_dir=import_dir
+        )
+    return cpu
+
+
+def _parallel_source(
+    pstr: str,
+    *,
+    protect_memory: bool,
+    jobs: int,
+    min_lines: int,
+    import_dir: Path,
+) -> Cpu | None:
+    """Returns None if sections cannot be assembled independently."""
+    skeleton, sections = split_sections(pstr + "\n")
+    if (
+        jobs <= 1
+        or len(sections) <= 1
+        or sum(len(section) for section in sections) < min_lines
+    ):
+        return None
+
+    cpu_name = cpud.parse_string(skeleton)[0]
+    control_unit = CU_MAP[cpu_name]
+    program = group_by_name(
+        language(control_unit).parse_string(skeleton, parse_all=True),
+        Directive,
+    )
+    cpu = Cpu(control_unit=control_unit, protect_memory=protect_memory)
+    asm = Asm(cpu)
+
+    for code_dir in program[Directive.code]:
+        address = code_dir[0][0] if code_dir[0] else 0
+        cpu.io_unit.load_source(address, "".join(code_dir[1]))
+
+    link_imports(program, asm, cpu, import_dir)
+
+    addresses = [
+        asm_dir[0][0] if asm_dir[0] else 0
+        for asm_dir in program[Directive.asm]
+    ]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(
+            pool.map(
+                assemble_section,
+                [cpu_name] * len(sections),
+                addresses,
+                ["\n".join(section) + "\n" for section in sections],
+            )
+        )
+
+    for i, section in enumerate(results):
+        if (
+            section is None
+            or (section.pending and i + 1 < len(results))
+            or any(
+                cpu.ram.has_fill(start, start + len(words))
+                for start, words in section.image
+            )
+            or not asm.labels.keys().isdisjoint(section.labels)
+        ):
+            return None
+
+        for start, words in section.image:
+            cpu.ram.write_words(start, words, from_cpu=False)
+        cpu.ram.comment.update(section.comment)
+        asm.add_links(section.labels, section.refs)
+
+    asm.link()
+
+    for input_dir in program[Directive.input]:
+        parse_io_dir(input_dir, asm, cpu, cpu.input_req)
+
+    for output_dir in program[Directive.output]:
+        parse_io_dir(output_dir, asm, cpu, cpu.output_req)
+
+    for enter_dir in program[Directive.enter]:
+        cpu.enter += f" {remove_comment(enter_dir[0])}"
+
+    return cpu
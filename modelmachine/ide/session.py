@@ -0,0 +1,381 @@
+"""Incremental assembler session for repeatedly edited programs.
+
+Lines of .asm sections are parsed one by one and cached, the rest of
+the program (directives and .code sections) is parsed as a whole.
+If only some asm lines are changed and the layout of the program
+stays the same, just these lines are encoded again into the previous
+memory image and only their references are linked.
+On any error the program is assembled by source() from scratch,
+so error messages are exactly the same.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Tuple
+
+import pyparsing as pp
+
+from modelmachine.cpu.cpu import CU_MAP, Cpu, IOReq
+from modelmachine.cu.halt_error import HaltError
+
+from .asm.asm import Asm, Cmd, Cursor, Link, asm_lang
+from .common_parsing import group_by_name
+from .directive import Directive
+from .linker import load_module
+from .source import (
+    assemble_module,
+    comment,
+    cpud,
+    language,
+    link_imports,
+    parse_io_dir,
+    remove_comment,
+)
+from .source import source as full_source
+
+if TYPE_CHECKING:
+    from array import array
+
+    from modelmachine.cu.control_unit import ControlUnit
+    from modelmachine.memory.ram import Comment
+
+    from .linker import ObjectModule
+
+DIRECTIVE_LINE = re.compile(
+    r"[ \t]*\.(cpu|input|output|enter|code|asm|import)(?![A-Za-z0-9_$])",
+    re.IGNORECASE,
+)
+
+# Parsed line: source string and commands of the line
+Parsed = Tuple[str, List[pp.ParseResults]]
+
+ERRORS = (
+    SystemExit,
+    pp.ParseBaseException,
+    HaltError,
+    NotImplementedError,
+    ValueError,
+)
+
+
+@lru_cache(maxsize=None)
+def line_language(cpu_name: str) -> pp.ParserElement:
+    return asm_lang(CU_MAP[cpu_name]).ignore(comment)
+
+
+def split_sections(pstr: str) -> tuple[str, list[list[str]]]:
+    """Cut bodies of .asm sections out of the program.
+
+    Returns program without asm bodies and list of asm bodies.
+    """
+    skeleton = []
+    sections: list[list[str]] = []
+    in_asm = False
+    for line in pstr.split("\n"):
+        directive = DIRECTIVE_LINE.match(line)
+        if directive is not None:
+            in_asm = directive.group(1).lower() == "asm"
+            if in_asm:
+                sections.append([])
+        elif in_asm:
+            sections[-1].append(line)
+            continue
+        skeleton.append(line)
+    return "".join(f"{line}\n" for line in skeleton), sections
+
+
+@dataclass(frozen=True)
+class Line:
+    text: str
+    tokens: Parsed
+    before: Cursor
+    after: Cursor
+    labels: tuple[str, ...]
+
+
+def same_cursor(a: Cursor, b: Cursor) -> bool:
+    return (
+        a.addr == b.addr
+        and a.labels == b.labels
+        and (None if a.func is None else a.func.name)
+        == (None if b.func is None else b.func.name)
+    )
+
+
+@dataclass(frozen=True)
+class State:
+    skeleton: str
+    control_unit: type[ControlUnit]
+    program: dict[Directive, list[pp.ParseResults]]
+    section_sizes: list[int]
+    lines: list[Line]
+    labels: dict[str, Link]
+    image: list[tuple[int, array[int]]]
+    comment: dict[int, Comment]
+    input_req: list[IOReq]
+    output_req: list[IOReq]
+    enter: str
+    modules: list[tuple[Path, ObjectModule]]
+
+
+class Session:
+    """Assembler that reuses results of the previous call."""
+
+    _cache: dict[str, Parsed]
+    _state: State | None
+    reused: int
+
+    def __init__(self) -> None:
+        self._cache = {}
+        self._state = None
+        self.reused = 0
+
+    def source(self, pstr: str, *, protect_memory: bool) -> Cpu:
+        try:
+            return self._source(pstr, protect_memory=protect_memory)
+        except ERRORS:
+            self._state = None
+        return full_source(pstr, protect_memory=protect_memory)
+
+    def _parse_lines(
+        self, control_unit: type[ControlUnit], texts: list[str]
+    ) -> list[Parsed]:
+        """Parse new lines at once by a single parser call."""
+        missing = list(dict.fromkeys(t for t in texts if t not in self._cache))
+        if missing:
+            pstr = "\n".join(missing) + "\n"
+            starts = list(accumulate(len(t) + 1 for t in missing))
+            cmds: list[list[pp.ParseResults]] = [[] for _ in missing]
+            for cmd in line_language(control_unit.NAME).parse_string(
+                pstr, parse_all=True
+            ):
+                cmds[bisect_right(starts, cmd["loc"])].append(cmd)
+            self._cache.update(
+                (text, (pstr, line_cmds))
+                for text, line_cmds in zip(missing, cmds)
+            )
+
+        res = [self._cache[text] for text in texts]
+        self._cache = dict(zip(texts, res))
+        return res
+
+    def _source(self, pstr: str, *, protect_memory: bool) -> Cpu:
+        skeleton, sections = split_sections(pstr + "\n")
+        state = self._state
+        if state is not None and state.skeleton == skeleton:
+            control_unit = state.control_unit
+            program = state.program
+        else:
+            control_unit = CU_MAP[cpud.parse_string(skeleton)[0]]
+            program = group_by_name(
+                language(control_unit).parse_string(skeleton, parse_all=True),
+                Directive,
+            )
+            if state is not None and state.control_unit != control_unit:
+                self._cache = {}
+            state = None
+        assert len(program[Directive.asm]) == len(sections)
+
+        texts = [text for section in sections for text in section]
+        tokens = self._parse_lines(control_unit, texts)
+
+        section_sizes = [len(section) for section in sections]
+        if state is not None and state.section_sizes == section_sizes:
+            changed = [
+                i
+                for i, line in enumerate(state.lines)
+                if line.text != texts[i]
+            ]
+            try:
+                cpu = self._update(
+                    state, changed, texts, tokens, protect_memory
+                )
+            except ERRORS:
+                cpu = None
+            if cpu is not None:
+                self.reused += 1
+                return cpu
+
+        return self._build(
+            skeleton,
+            control_unit,
+            program,
+            section_sizes,
+            texts,
+            tokens,
+            protect_memory,
+        )
+
+    @staticmethod
+    def _encode(
+        asm: Asm, parsed: Parsed
+    ) -> tuple[Cursor, Cursor, tuple[str, ...]]:
+        pstr, cmds = parsed
+        before = asm.cursor
+        labels = []
+        for cmd in cmds:
+            if Cmd(cmd.get_name()) == Cmd.label:
+                labels.append(asm.fullname(cmd[0]).name)
+            asm.parse_cmd(pstr, cmd)
+        return before, asm.cursor, tuple(labels)
+
+    def _build(
+        self,
+        skeleton: str,
+        control_unit: type[ControlUnit],
+        program: dict[Directive, list[pp.ParseResults]],
+        section_sizes: list[int],
+        texts: list[str],
+        tokens: list[Parsed],
+        protect_memory: bool,  # noqa: FBT001
+    ) -> Cpu:
+        cpu = Cpu(control_unit=control_unit, protect_memory=protect_memory)
+        asm = Asm(cpu)
+
+        for code_dir in program[Directive.code]:
+            address = code_dir[0][0] if code_dir[0] else 0
+            cpu.io_unit.load_source(address, "".join(code_dir[1]))
+
+        modules = link_imports(program, asm, cpu, Path())
+
+        lines = []
+        pos = 0
+        for asm_dir, size in zip(program[Directive.asm], section_sizes):
+            address = asm_dir[0][0] if asm_dir[0] else 0
+            asm.seek(Cursor(address, None, asm.cursor.labels))
+            for i in range(pos, pos + size):
+                before, after, labels = self._encode(asm, tokens[i])
+                lines.append(Line(texts[i], tokens[i], before, after, labels))
+            pos += size
+
+        asm.link()
+
+        for input_dir in program[Directive.input]:
+            parse_io_dir(input_dir, asm, cpu, cpu.input_req)
+
+        for output_dir in program[Directive.output]:
+            parse_io_dir(output_dir, asm, cpu, cpu.output_req)
+
+        for enter_dir in program[Directive.enter]:
+            cpu.enter += f" {remove_comment(enter_dir[0])}"
+
+        self._state = State(
+            skeleton=skeleton,
+            control_unit=control_unit,
+            program=program,
+            section_sizes=section_sizes,
+            lines=lines,
+            labels=dict(asm.labels),
+            image=self._image(cpu),
+            comment=dict(cpu.ram.comment),
+            input_req=list(cpu.input_req),
+            output_req=list(cpu.output_req),
+            enter=cpu.enter,
+            modules=modules,
+        )
+        return cpu
+
+    @staticmethod
+    def _image(cpu: Cpu) -> list[tuple[int, array[int]]]:
+        return [
+            (seg.start, cpu.ram.read_words(seg.start, seg.stop))
+            for seg in cpu.ram.filled_intervals
+        ]
+
+    def _update(
+        self,
+        state: State,
+        changed: list[int],
+        texts: list[str],
+        tokens: list[Parsed],
+        protect_memory: bool,  # noqa: FBT001
+    ) -> Cpu | None:
+        """Encode changed lines into the previous image.
+
+        Returns None if layout of the program or imported module
+        is changed.
+        """
+        if any(
+            load_module(filename, assemble_module) is not module
+            for filename, module in state.modules
+        ):
+            return None
+
+        old_lines = [state.lines[i] for i in changed]
+        holes = sorted(
+            (line.before.addr, line.after.addr) for line in old_lines
+        )
+        removed = {name for line in old_lines for name in line.labels}
+
+        cpu = Cpu(
+            control_unit=state.control_unit, protect_memory=protect_memory
+        )
+        for start, words in state.image:
+            stop = start + len(words)
+            pos = start
+            for hole_start, hole_stop in holes:
+                if hole_stop <= pos or stop <= hole_start:
+                    continue
+                if pos < hole_start:
+                    cpu.ram.write_words(
+                        pos,
+                        words[pos - start : hole_start - start],
+                        from_cpu=False,
+                    )
+                pos = hole_stop
+            if pos < stop:
+                cpu.ram.write_words(pos, words[pos - start :], from_cpu=False)
+
+        cpu.ram.comment.update(
+            (address, com)
+            for address, com in state.comment.items()
+            if not any(start <= address < stop for start, stop in holes)
+        )
+
+        labels = {
+            name: link
+            for name, link in state.labels.items()
+            if name not in removed
+        }
+        asm = Asm(cpu, labels)
+        lines = list(state.lines)
+        for i, old in zip(changed, old_lines):
+            asm.seek(old.before)
+            before, after, declared = self._encode(asm, tokens[i])
+            if not same_cursor(after, old.after) or declared != old.labels:
+                return None
+            lines[i] = Line(texts[i], tokens[i], before, after, declared)
+
+        if any(
+            link.addr != state.labels[name].addr
+            for name, link in asm.labels.items()
+        ):
+            return None
+
+        asm.link()
+
+        cpu.input_req.extend(state.input_req)
+        cpu.output_req.extend(state.output_req)
+        cpu.enter = state.enter
+
+        self._state = State(
+            skeleton=state.skeleton,
+            control_unit=state.control_unit,
+            program=state.program,
+            section_sizes=state.section_sizes,
+            lines=lines,
+            labels=dict(asm.labels),
+            image=self._image(cpu),
+            comment=dict(cpu.ram.comment),
+            input_req=state.input_req,
+            output_req=state.output_req,
+            enter=state.enter,
+            modules=state.modules,
+        )
+        return cpu
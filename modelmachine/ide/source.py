@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from functools import lru_cache
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pyparsing as pp
@@ -9,9 +11,14 @@ from pyparsing import Group as Gr
 from modelmachine.cpu.cpu import CU_MAP, Cpu, IOReq
 
 from .asm.asm import Asm, Label, asm_lang, label
-from .asm.errors import MissedCodeError, UnexpectedLocalLabelError
+from .asm.errors import (
+    MissedCodeError,
+    UnexpectedLocalLabelError,
+    WrongIOBlockError,
+)
 from .common_parsing import (
     ParsingError,
+    ch,
     group_by_name,
     hexnums,
     ignore,
@@ -23,6 +30,13 @@ from .common_parsing import (
     string,
 )
 from .directive import Directive
+from .linker import (
+    ImportModuleError,
+    ObjectModule,
+    link_module,
+    load_module,
+    object_module,
+)
 
 if TYPE_CHECKING:
     from modelmachine.cu.control_unit import ControlUnit
@@ -35,19 +49,53 @@ cpud = (nl[0, ...] - kw(Directive.cpu.value) - cpu_name - nl)(
 ).ignore(comment)
 
 
+@dataclass(frozen=True)
+class IOBlock:
+    """Block of consecutive io values: start[count] or start:stop."""
+
+    start: int | Label
+    count: int | None
+    stop: int | Label | None
+    pstr: str
+    loc: int
+
+
+io_block = (
+    (posinteger | label)
+    + (
+        pp.Literal("[") - posinteger - ch("]")
+        | pp.Literal(":") - (posinteger | label)
+    )
+).add_parse_action(
+    lambda pstr, loc, t: IOBlock(
+        t[0],
+        count=t[2] if t[1] == "[" else None,
+        stop=t[2] if t[1] == ":" else None,
+        pstr=pstr,
+        loc=loc,
+    )
+)
+io_address = io_block | posinteger | label
+
 inputd = ngr(
     kw(Directive.input.value)
-    - Gr(pp.DelimitedList(posinteger | label, ","))
+    - Gr(pp.DelimitedList(io_address, ","))
     - (string | pp.empty),
     Directive.input.value,
 )
 outputd = ngr(
     kw(Directive.output.value)
-    - Gr(pp.DelimitedList(posinteger | label, ","))
+    - Gr(pp.DelimitedList(io_address, ","))
     - (string | pp.empty),
     Directive.output.value,
 )
 enterd = ngr(kw(Directive.enter.value) - string, Directive.enter.value)
+importd = ngr(
+    kw(Directive.import_.value)
+    - Gr(posinteger + pp.FollowedBy(pp.White(" \t")) | pp.empty)
+    - string,
+    Directive.import_.value,
+)
 
 coded = ngr(
     kw(Directive.code.value)
@@ -57,7 +105,7 @@ coded = ngr(
     Directive.code.value,
 )
 
-one_line_directive = inputd | outputd | enterd
+one_line_directive = inputd | outputd | enterd | importd
 
 
 @lru_cache(maxsize=None)
@@ -97,56 +145,151 @@ def remove_comment(line: str) -> str:
 
 
 def parse_io_dir(
-    io_dir: pp.ParseResults, asm: Asm, io_req: list[IOReq]
+    io_dir: pp.ParseResults, asm: Asm, cpu: Cpu, io_req: list[IOReq]
 ) -> None:
     message = io_dir[1] if len(io_dir) > 1 else None
 
-    for address in io_dir[0]:
+    for item in io_dir[0]:
         msg = message
-        addr = address
-        if isinstance(address, Label):
-            if address.is_local:
-                msg = "Local labels in io directive are unsupported"
-                raise UnexpectedLocalLabelError(
-                    pstr=address.pstr, loc=address.loc, msg=msg
-                )
-            if msg is None:
-                msg = address.name
+        count = 1
+        block = item if isinstance(item, IOBlock) else None
+        address: int | Label = item if block is None else block.start
+        if block is not None and cpu.control_unit.IS_STACK_IO:
+            msg = "Block io directive is unsupported for stack io"
+            raise WrongIOBlockError(pstr=block.pstr, loc=block.loc, msg=msg)
+
+        if isinstance(address, Label) and msg is None:
+            msg = address.name
+        addr = _resolve_io_address(address, asm)
 
-            addr = asm.resolve(address)
+        if block is not None:
+            count = _block_count(block, addr, asm, cpu)
 
-        io_req.append(IOReq(addr, msg))
+        io_req.append(IOReq(addr, msg, count))
 
 
-def source(pstr: str, *, protect_memory: bool) -> Cpu:
+def _resolve_io_address(address: int | Label, asm: Asm) -> int:
+    if not isinstance(address, Label):
+        return address
+
+    if address.is_local:
+        msg = "Local labels in io directive are unsupported"
+        raise UnexpectedLocalLabelError(
+            pstr=address.pstr, loc=address.loc, msg=msg
+        )
+    return asm.resolve(address)
+
+
+def _block_count(block: IOBlock, start: int, asm: Asm, cpu: Cpu) -> int:
+    if block.count is not None:
+        count = block.count
+    else:
+        assert block.stop is not None
+        stop = _resolve_io_address(block.stop, asm)
+        size = cpu.io_unit.io_bits // cpu.ram.word_bits
+        count, rest = divmod(stop - start, size)
+        if rest:
+            msg = (
+                f"Io block 0x{start:x}:0x{stop:x} should be divided"
+                f" by value size={size}"
+            )
+            raise WrongIOBlockError(pstr=block.pstr, loc=block.loc, msg=msg)
+
+    if count <= 0:
+        msg = "Io block should contain at least one value"
+        raise WrongIOBlockError(pstr=block.pstr, loc=block.loc, msg=msg)
+    return count
+
+
+def link_imports(
+    program: dict[Directive, list[pp.ParseResults]],
+    asm: Asm,
+    cpu: Cpu,
+    import_dir: Path | None,
+) -> list[tuple[Path, ObjectModule]]:
+    """Link object modules of .import directives into the program.
+
+    Returns linked modules with their files.
+    """
+    modules = []
+    for import_dir_ in program[Directive.import_]:
+        if import_dir is None:
+            msg = "Nested .import directive is unsupported in modules"
+            raise ImportModuleError(msg)
+        base = import_dir_[0][0] if import_dir_[0] else None
+        filename = import_dir / remove_comment(import_dir_[1]).strip()
+        module = load_module(filename, assemble_module)
+        link_module(cpu, asm, module, filename, base)
+        modules.append((filename, module))
+    return modules
+
+
+def _assemble(
+    pstr: str, *, protect_memory: bool, import_dir: Path | None
+) -> tuple[Cpu, Asm, dict[Directive, list[pp.ParseResults]]]:
+    """Parse program and encode asm sections without linking."""
+    cpu_dir = cpud.parse_string(pstr)
+    cpu_name = cpu_dir[0]
+    control_unit = CU_MAP[cpu_name]
+    cpu = Cpu(control_unit=control_unit, protect_memory=protect_memory)
+    asm = Asm(cpu)
+
+    parsed_program = group_by_name(
+        language(control_unit).parse_string(pstr, parse_all=True),
+        Directive,
+    )
+
+    for code_dir in parsed_program[Directive.code]:
+        address = code_dir[0][0] if code_dir[0] else 0
+        cpu.io_unit.load_source(address, "".join(code_dir[1]))
+
+    link_imports(parsed_program, asm, cpu, import_dir)
+
+    for asm_dir in parsed_program[Directive.asm]:
+        address = asm_dir[0][0] if asm_dir[0] else 0
+        asm.parse(pstr, address, asm_dir[1])
+
+    return cpu, asm, parsed_program
+
+
+def assemble_module(pstr: str) -> tuple[ObjectModule, str]:
+    """Assemble module, returns it with serialized form."""
     pstr += "\n"
     try:
-        cpu_dir = cpud.parse_string(pstr)
-        cpu_name = cpu_dir[0]
-        control_unit = CU_MAP[cpu_name]
-        cpu = Cpu(control_unit=control_unit, protect_memory=protect_memory)
-        asm = Asm(cpu)
-
-        parsed_program = group_by_name(
-            language(control_unit).parse_string(pstr, parse_all=True),
-            Directive,
+        cpu, asm, parsed_program = _assemble(
+            pstr, protect_memory=False, import_dir=None
         )
+    except pp.ParseBaseException as exc:
+        raise ParsingError(msg=exc.msg, loc=exc.loc, pstr=exc.pstr) from exc
+
+    for directive in (Directive.input, Directive.output, Directive.enter):
+        if parsed_program[directive]:
+            msg = f"Unexpected {directive.value} directive in module"
+            raise ImportModuleError(msg)
+
+    module = object_module(cpu, asm)
+    return module, module.dumps(pstr, cpu.ram.address_bits)
 
-        for code_dir in parsed_program[Directive.code]:
-            address = code_dir[0][0] if code_dir[0] else 0
-            cpu.io_unit.load_source(address, "".join(code_dir[1]))
 
-        for asm_dir in parsed_program[Directive.asm]:
-            address = asm_dir[0][0] if asm_dir[0] else 0
-            asm.parse(pstr, address, asm_dir[1])
+def source(
+    pstr: str, *, protect_memory: bool, import_dir: Path | None = None
+) -> Cpu:
+    """Assemble program, .import paths are relative to import_dir."""
+    pstr += "\n"
+    try:
+        cpu, asm, parsed_program = _assemble(
+            pstr,
+            protect_memory=protect_memory,
+            import_dir=Path() if import_dir is None else import_dir,
+        )
 
         asm.link()
 
         for input_dir in parsed_program[Directive.input]:
-            parse_io_dir(input_dir, asm, cpu.input_req)
+            parse_io_dir(input_dir, asm, cpu, cpu.input_req)
 
         for output_dir in parsed_program[Directive.output]:
-            parse_io_dir(output_dir, asm, cpu.output_req)
+            parse_io_dir(output_dir, asm, cpu, cpu.output_req)
 
         for enter_dir in parsed_program[Directive.enter]:
             cpu.enter += f" {remove_comment(enter_dir[0])}"
@@ -3,10 +3,14 @@
 from __future__ import annotations
 
 import sys
+from array import array
+from dataclasses import dataclass
 from traceback import print_exc
 from typing import TYPE_CHECKING
 
 from .cell import Cell, Endianess, ceil_div
+from .cu.halt_error import EndOfInputError
+from .memory.ram import Port
 from .memory.register import RegisterName
 from .prompt.is_interactive import is_interactive
 from .prompt.prompt import (
@@ -18,7 +22,7 @@ from .prompt.prompt import (
 )
 
 if TYPE_CHECKING:
-    from typing import Final, TextIO
+    from typing import Final, Iterator, Sequence, TextIO
 
     from .memory.ram import RandomAccessMemory
     from .memory.register import RegisterMemory
@@ -26,6 +30,50 @@ if TYPE_CHECKING:
 ACCEPTED_CHARS = set("0123456789abcdefABCDEF")
 
 
+@dataclass(frozen=True)
+class Patcher:
+    """Put operand value into instruction with integer operations.
+
+    Instruction is an integer made of words in memory order.
+    """
+
+    words: int
+    offset_bits: int
+    bits: int
+    mask: int
+    endianess: Endianess
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        offset_bits: int,
+        bits: int,
+        word_bits: int,
+        endianess: Endianess,
+    ) -> Patcher:
+        return cls(
+            words=ceil_div(offset_bits + bits, word_bits),
+            offset_bits=offset_bits,
+            bits=bits,
+            mask=(1 << bits) - 1,
+            endianess=endianess,
+        )
+
+    def shift(self, instruction_bits: int) -> int:
+        if self.endianess is Endianess.BIG:
+            return instruction_bits - self.offset_bits - self.bits
+        return self.offset_bits
+
+    def patch(
+        self, instruction: int, instruction_bits: int, value: int
+    ) -> int:
+        shift = self.shift(instruction_bits)
+        return (instruction & ~(self.mask << shift)) | (
+            (value & self.mask) << shift
+        )
+
+
 class InputOutputUnit:
     """Allow to input and output program and data."""
 
@@ -64,20 +112,24 @@ class InputOutputUnit:
             raise ValueError(msg)
         return word
 
+    def _check_address(self, address: int, action: str) -> None:
+        if not 0 <= address < self._ram.memory_size:
+            msg = (
+                f"Unexpected address for {action}: 0x{address:x}, expected"
+                f" interval is [0, 0x{self._ram.memory_size:x})"
+            )
+            raise SystemExit(msg)
+
     def input(
         self,
         *,
         address: int,
         message: str | None = None,
+        count: int = 1,
         file: TextIO = sys.stdin,
     ) -> None:
         """Data loader (decimal numbers)."""
-        if not 0 <= address < self._ram.memory_size:
-            msg = (
-                f"Unexpected address for input: 0x{address:x}, expected"
-                f" interval is [0, 0x{self._ram.memory_size:x})"
-            )
-            raise SystemExit(msg)
+        self._check_address(address, "input")
 
         if self._is_stack_io:
             for _ in range(address):
@@ -89,11 +141,129 @@ class InputOutputUnit:
                 msg = "To stack" if message is None else message
                 self._input_cell(addr=addr, message=msg, file=file)
         else:
-            addr = Cell(address, bits=self._ram.address_bits)
-            msg = f"Ram[{addr}]" if message is None else message
-            self._input_cell(addr=addr, message=msg, file=file)
+            for addr, msg in self._block(address, message, count, "input"):
+                self._input_cell(addr=addr, message=msg, file=file)
+
+    def _block(
+        self, address: int, message: str | None, count: int, action: str
+    ) -> Iterator[tuple[Cell, str]]:
+        size = self.io_bits // self._ram.word_bits
+        for i in range(count):
+            self._check_address(address + i * size, action)
+            addr = Cell(address + i * size, bits=self._ram.address_bits)
+            if message is None:
+                yield addr, f"Ram[{addr}]"
+            elif count > 1:
+                yield addr, f"{message}[{i}]"
+            else:
+                yield addr, message
+
+    def input_many(self, addresses: Sequence[int], file: TextIO) -> None:
+        """Bulk data loader for non-interactive input.
+
+        Reads the whole file at once and writes contiguous words by
+        a single ram write. Falls back to input on any error, so error
+        messages are the same.
+        """
+        tokens = self._cache.res[::-1]
+        tokens.extend(file.read().split())
+        count = sum(addresses) if self._is_stack_io else len(addresses)
+
+        try:
+            words = self._encode_values(tokens[:count])
+            if self._is_stack_io:
+                runs, sp = self._stack_runs(addresses, words)
+            else:
+                runs, sp = self._address_runs(addresses, words), None
+        except ValueError:
+            self._cache.res = tokens[::-1]
+            for address in addresses:
+                self.input(address=address, file=file)
+            return
+
+        self._cache.res = tokens[count:][::-1]
+        for start, run in runs:
+            self._ram.write_words(start, run, from_cpu=False)
+        if sp is not None:
+            self._registers[RegisterName.SP] = sp
+
+    def _encode_values(self, tokens: list[str]) -> list[int]:
+        """Convert decimal values to the flat list of ram words."""
+        values = [int(token, 0) for token in tokens]
+        if values and (
+            min(values) < self._min_v or max(values) >= self._max_v
+        ):
+            msg = "Input value is too long"
+            raise ValueError(msg)
+
+        word_bits = self._ram.word_bits
+        word_mask = (1 << word_bits) - 1
+        io_mask = (1 << self.io_bits) - 1
+        shifts = range(0, self.io_bits, word_bits)
+        if self._ram.endianess is Endianess.BIG:
+            shifts = shifts[::-1]
+        if len(shifts) == 1:
+            return [value & io_mask for value in values]
+        return [
+            (value & io_mask) >> shift & word_mask
+            for value in values
+            for shift in shifts
+        ]
+
+    def _address_runs(
+        self, addresses: Sequence[int], words: list[int]
+    ) -> list[tuple[int, array[int]]]:
+        size = self.io_bits // self._ram.word_bits
+        if len(words) != len(addresses) * size:
+            msg = "Not enough elements in the input"
+            raise ValueError(msg)
+
+        runs: list[tuple[int, array[int]]] = []
+        for i, address in enumerate(addresses):
+            if not 0 <= address <= self._ram.memory_size - size:
+                msg = f"Unexpected address for input: 0x{address:x}"
+                raise ValueError(msg)
+            chunk = words[i * size : (i + 1) * size]
+            if runs and runs[-1][0] + len(runs[-1][1]) == address:
+                runs[-1][1].extend(chunk)
+            else:
+                runs.append((address, array(self._ram.typecode, chunk)))
+        return runs
+
+    def _stack_runs(
+        self, counts: Sequence[int], words: list[int]
+    ) -> tuple[list[tuple[int, array[int]]], Cell]:
+        size = self.io_bits // self._ram.word_bits
+        if len(words) != sum(counts) * size:
+            msg = "Not enough elements in the input"
+            raise ValueError(msg)
+
+        sp = self._registers[RegisterName.SP].unsigned or (
+            self._ram.memory_size
+        )
+        pos = 0
+        runs = []
+        for count in counts:
+            if not 0 <= count * size <= sp:
+                msg = f"Unexpected stack input: {count}"
+                raise ValueError(msg)
+            run = array(self._ram.typecode)
+            for i in reversed(range(pos, pos + count)):
+                run.extend(words[i * size : (i + 1) * size])
+            sp -= count * size
+            pos += count
+            runs.append((sp, run))
+
+        return runs, Cell(sp, bits=self._ram.address_bits)
 
     def _input_cell(self, *, addr: Cell, message: str, file: TextIO) -> None:
+        self._ram.put(
+            address=addr,
+            value=Cell(self._read_value(message, file), bits=self.io_bits),
+            from_cpu=False,
+        )
+
+    def _read_value(self, message: str, file: TextIO) -> int:
         value: int | None = None
         while value is None:
             try:
@@ -110,13 +280,7 @@ class InputOutputUnit:
                 else:
                     raise SystemExit(msg) from e
 
-        self.check_word(value)
-
-        self._ram.put(
-            address=addr,
-            value=Cell(value, bits=self.io_bits),
-            from_cpu=False,
-        )
+        return self.check_word(value)
 
     def check_input_empty(self, file: TextIO) -> None:
         if not is_interactive(file):
@@ -133,15 +297,11 @@ class InputOutputUnit:
         *,
         address: int,
         message: str | None = None,
+        count: int = 1,
         file: TextIO = sys.stdout,
     ) -> None:
         """Return data by address."""
-        if not 0 <= address < self._ram.memory_size:
-            msg = (
-                f"Unexpected address for output: 0x{address:x}, expected"
-                f" interval is [0, 0x{self._ram.memory_size:x})"
-            )
-            raise SystemExit(msg)
+        self._check_address(address, "output")
 
         if self._is_stack_io:
             for _ in range(address):
@@ -157,9 +317,8 @@ class InputOutputUnit:
                 msg = "From stack" if message is None else message
                 self._output_cell(addr=addr, message=msg, file=file)
         else:
-            addr = Cell(address, bits=self._ram.address_bits)
-            msg = f"Ram[{addr}]" if message is None else message
-            self._output_cell(addr=addr, message=msg, file=file)
+            for addr, msg in self._block(address, message, count, "output"):
+                self._output_cell(addr=addr, message=msg, file=file)
 
     def _output_cell(
         self,
@@ -169,11 +328,50 @@ class InputOutputUnit:
         file: TextIO,
     ) -> None:
         value = self._ram.fetch(addr, bits=self.io_bits).signed
+        self._print_value(value, message, file)
+
+    @staticmethod
+    def _print_value(value: int, message: str, file: TextIO) -> None:
         if is_interactive(file):
             printf(f"{message} = {value}", file=file)
         else:
             printf(str(value), file=file)
 
+    def map_input_port(self, *, address: int, file: TextIO) -> None:
+        """Every cpu read of address takes the next value from file."""
+        self._check_address(address, "input port")
+        message = f"Port[0x{address:x}]"
+
+        def read() -> int:
+            try:
+                return self._read_value(message, file)
+            except (NotEnoughInputError, EOFError) as exc:
+                msg = "End of input stream"
+                raise EndOfInputError(msg) from exc
+
+        self._ram.map_port(address, Port(bits=self.io_bits, read=read))
+
+    def map_output_port(self, *, address: int, file: TextIO) -> None:
+        """Every cpu write to address prints the value to file."""
+        self._check_address(address, "output port")
+        message = f"Port[0x{address:x}]"
+
+        def write(value: Cell) -> None:
+            self._print_value(value.signed, message, file)
+            file.flush()
+
+        self._ram.map_port(address, Port(bits=self.io_bits, write=write))
+
+    def hex_words(self, start: int, stop: int) -> list[str]:
+        """Hex strings of words in [start, stop) by single memory read."""
+        words = self._ram.read_words(start, stop)
+        if sys.byteorder == "little":
+            words.byteswap()
+        raw = words.tobytes().hex()
+        size = 2 * words.itemsize
+        skip = size - self._ram.word_bits // 4
+        return [raw[i + skip : i + size] for i in range(0, len(raw), size)]
+
     def store_source(self, *, start: int, bits: int) -> str:
         """Save data to string."""
         assert 0 <= start < self._ram.memory_size
@@ -183,14 +381,7 @@ class InputOutputUnit:
         end = start + bits // self._ram.word_bits
         assert 0 <= end <= self._ram.memory_size
 
-        return " ".join(
-            self._ram.fetch(
-                address=Cell(i, bits=self._ram.address_bits),
-                bits=self._ram.word_bits,
-                from_cpu=False,
-            ).hex()
-            for i in range(start, end)
-        )
+        return " ".join(self.hex_words(start, end))
 
     def load_source(self, address: int, code: str) -> None:
         """Source code loader."""
@@ -238,34 +429,52 @@ class InputOutputUnit:
 
         return self._ram.put(address=address, value=value)
 
-    def override(
-        self, *, address: Cell, offset_bits: int, value: Cell
+    def patch(
+        self, address: int, fields: Sequence[tuple[Patcher, int]]
     ) -> None:
-        word_count = ceil_div(offset_bits + value.bits, self._ram.word_bits)
-        val_end = word_count * self._ram.word_bits
-        if self._ram.endianess is Endianess.BIG:
-            end = val_end - offset_bits
-            start = end - value.bits
-        else:
-            start = offset_bits
-            end = start + value.bits
-
-        for i in range(word_count):
-            a = address + Cell(i, bits=self._ram.address_bits)
-            if not self._ram.is_fill(a):
+        """Put operand values into instruction words by single write."""
+        word_bits = self._ram.word_bits
+        words = max(patcher.words for patcher, _ in fields)
+        for i in range(words):
+            if not self._ram.is_fill(
+                Cell(address + i, bits=self._ram.address_bits)
+            ):
+                patcher, value = next(f for f in fields if f[0].words > i)
                 msg = (
-                    f"Overriding empty cell at address {a}; "
-                    f"address={address} offset_bits={offset_bits} value={value}"
+                    f"Overriding empty cell at address"
+                    f" {Cell(address + i, bits=self._ram.address_bits)};"
+                    f" address={Cell(address, bits=self._ram.address_bits)}"
+                    f" offset_bits={patcher.offset_bits}"
+                    f" value={Cell(value, bits=patcher.bits)}"
                 )
                 raise NotImplementedError(msg)
 
-        val = self._ram.fetch(address, bits=val_end, from_cpu=False)
-        val = Cell.from_bits(
-            [
-                value[i - start].unsigned
-                if start <= i < end
-                else val[i].unsigned
-                for i in range(val_end)
-            ]
+        raw = self._ram.read_words(address, address + words)
+        if self._ram.endianess is Endianess.LITTLE:
+            raw.reverse()
+        instruction = 0
+        for word in raw:
+            instruction = (instruction << word_bits) | word
+
+        instruction_bits = words * word_bits
+        for patcher, value in fields:
+            instruction = patcher.patch(instruction, instruction_bits, value)
+
+        word_mask = (1 << word_bits) - 1
+        for i in reversed(range(words)):
+            raw[i] = instruction & word_mask
+            instruction >>= word_bits
+        if self._ram.endianess is Endianess.LITTLE:
+            raw.reverse()
+        self._ram.write_words(address, raw, from_cpu=False)
+
+    def override(
+        self, *, address: Cell, offset_bits: int, value: Cell
+    ) -> None:
+        patcher = Patcher.create(
+            offset_bits=offset_bits,
+            bits=value.bits,
+            word_bits=self._ram.word_bits,
+            endianess=self._ram.endianess,
         )
-        self._ram.put(address=address, value=val, from_cpu=False)
+        self.patch(address.unsigned, [(patcher, value.unsigned)])
@@ -5,17 +5,24 @@ from IPython.core.magic import register_cell_magic
 from .ide.debug import debug as ide_debug
 from .ide.dump import dump as ide_dump
 from .ide.load import load_from_string
+from .ide.session import Session
+
+_session = Session()
 
 
 @register_cell_magic("mm.debug")  # type: ignore[misc]
 def mm_debug(_line: str, cell: str) -> None:
-    cpu = load_from_string(cell, protect_memory=True, enter=None)
+    cpu = load_from_string(
+        cell, protect_memory=True, enter=None, session=_session
+    )
     ide_debug(cpu=cpu, colors=True)
 
 
 @register_cell_magic("mm.run")  # type: ignore[misc]
 def mm_run(_line: str, cell: str) -> None:
-    cpu = load_from_string(cell, protect_memory=True, enter=None)
+    cpu = load_from_string(
+        cell, protect_memory=True, enter=None, session=_session
+    )
 
     cpu.control_unit.run()
     if cpu.control_unit.failed:
@@ -26,5 +33,7 @@ def mm_run(_line: str, cell: str) -> None:
 
 @register_cell_magic("mm.asm")  # type: ignore[misc]
 def mm_asm(_line: str, cell: str) -> None:
-    cpu = load_from_string(cell, protect_memory=True, enter=None)
+    cpu = load_from_string(
+        cell, protect_memory=True, enter=None, session=_session
+    )
     ide_dump(cpu, sys.stdout)
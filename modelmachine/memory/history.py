@@ -0,0 +1,66 @@
+"""History of writes for reverse steps of the debugger.
+
+Plain ram and registers do not record anything. Debugger swaps in
+recording subclasses, which append every write to parallel arrays:
+key (address or register number), old value and old fill flag, and
+the offset of the first write of every step. Nothing is allocated per
+write, reverse step undoes writes of the last step in reverse order.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class WriteHistory:
+    _steps: array[int]
+    _keys: array[int]
+    _old: array[int]
+    _fill: array[int]
+
+    def __init__(self) -> None:
+        # Writes before the first step belong to the initial state
+        self._steps = array("Q", [0])
+        self._keys = array("H")
+        self._old = array("Q")
+        self._fill = array("B")
+
+    def __len__(self) -> int:
+        """Count of recorded steps."""
+        return len(self._steps) - 1
+
+    def new_step(self) -> None:
+        self._steps.append(len(self._keys))
+
+    def record(self, key: int, old: int, *, fill: int = 1) -> None:
+        self._keys.append(key)
+        self._old.append(old)
+        self._fill.append(fill)
+
+    def record_range(
+        self, start: int, old: array[int], fill: array[int]
+    ) -> None:
+        """Record writes of consecutive keys from start."""
+        self._keys.extend(range(start, start + len(old)))
+        self._old.fromlist(old.tolist())
+        self._fill.extend(fill)
+
+    def last_step(self) -> set[int]:
+        """Keys written by the last step."""
+        return set(self._keys[self._steps[-1] :])
+
+    def pop_step(self) -> Iterator[tuple[int, int, int]]:
+        """Forget the last step, return its writes in reverse order."""
+        assert len(self) > 0
+        start = self._steps.pop()
+        writes = list(
+            zip(self._keys[start:], self._old[start:], self._fill[start:])
+        )
+        del self._keys[start:]
+        del self._old[start:]
+        del self._fill[start:]
+        return reversed(writes)
@@ -2,18 +2,24 @@ from __future__ import annotations
 
 import warnings
 from array import array
+from collections import deque
 from dataclasses import dataclass
+from itertools import islice
 from typing import TYPE_CHECKING
 
 from modelmachine.cell import Cell, Endianess
 from modelmachine.cu.halt_error import HaltError
 from modelmachine.shared.insort_range import insort_range
 
+from .history import WriteHistory
+
 if TYPE_CHECKING:
-    from collections.abc import Collection
-    from typing import Final
+    from collections.abc import Collection, Iterator
+    from typing import Callable, Final
 
 MAX_ADDRESS_BITS = 16
+# Count of last writes, which ranges are kept for caches of memory
+WRITE_LOG_SIZE = 16
 MAX_WORD_BITS = 8 * 8
 BYTE_BITS = 8
 
@@ -22,6 +28,12 @@ class RamAccessError(KeyError, HaltError):
     pass
 
 
+def _count(counts: array[int] | None, start: int, stop: int) -> None:
+    if counts is not None:
+        for address in range(start, stop):
+            counts[address] += 1
+
+
 @dataclass(frozen=True)
 class Comment:
     len: int
@@ -30,10 +42,16 @@ class Comment:
 
 
 @dataclass(frozen=True)
-class RamWriteLog:
-    old: int
-    new: int
-    fill: bool = False
+class Port:
+    """Memory mapped io port.
+
+    Cpu reads of the port address call read, writes call write
+    and store value as usual.
+    """
+
+    bits: int
+    read: Callable[[], int] | None = None
+    write: Callable[[Cell], None] | None = None
 
 
 class RandomAccessMemory:
@@ -42,6 +60,9 @@ class RandomAccessMemory:
     Addresses is x: 0 <= x < memory_size.
     If is_protected == True, you cannot read unassigned memory
     (useful for debug).
+    Every write increments version, so caches of memory can check
+    that nobody changed memory behind them, and written_since tells
+    which addresses the last writes changed.
     """
 
     word_bits: Final[int]
@@ -53,8 +74,13 @@ class RandomAccessMemory:
     _fill: array[int]
     _filled_intervals: list[range]
     access_count: int
-    write_log: list[dict[int, RamWriteLog]] | None
+    read_counts: array[int] | None
+    write_counts: array[int] | None
+    on_write: Callable[[int, int, int], None] | None
+    version: int
+    _write_log: deque[tuple[int, int]]
     comment: dict[int, Comment]
+    _ports: dict[int, Port]
 
     @property
     def filled_intervals(self) -> Collection[range]:
@@ -83,29 +109,94 @@ class RandomAccessMemory:
         elif word_bits <= 2 * BYTE_BITS:
             self._table = array("H", shape)
         elif word_bits <= 4 * BYTE_BITS:
-            self._table = array("L", shape)
+            self._table = array("I", shape)
         else:
             self._table = array("Q", shape)
         self._fill = array("B", shape)
         self.access_count = 0
+        self.read_counts = None
+        self.write_counts = None
         self._filled_intervals = []
-        self.write_log = None
+        self.on_write = None
+        self.version = 0
+        self._write_log = deque(maxlen=WRITE_LOG_SIZE)
+        self._ports = {}
+
+    def enable_access_stats(self) -> None:
+        """Count cpu reads and writes of every address."""
+        self.read_counts = array("Q", bytes(8 * self.memory_size))
+        self.write_counts = array("Q", bytes(8 * self.memory_size))
+
+    @property
+    def has_ports(self) -> bool:
+        return bool(self._ports)
+
+    def count_read(self, address: int, words: int) -> None:
+        """Count cpu read of words, which value is known to caller."""
+        self.access_count += words
+        _count(self.read_counts, address, address + words)
+
+    def count_write(self, address: int, words: int) -> None:
+        """Count cpu write of words, which caller stores later."""
+        self.access_count += words
+        _count(self.write_counts, address, address + words)
+
+    def reset_access_count(self) -> None:
+        self.access_count = 0
+        if self.read_counts is not None:
+            self.enable_access_stats()
 
     def __len__(self) -> int:
         """Return size of memory in unified form."""
         return self.memory_size
 
+    @property
+    def typecode(self) -> str:
+        """Type code of array with raw words, see help(array)."""
+        return self._table.typecode
+
+    def _fill_range(self, start: int, stop: int) -> None:
+        self._fill[start:stop] = array("B", bytes([1]) * (stop - start))
+
+        merged = range(start, stop)
+        intervals = []
+        for e in self._filled_intervals:
+            if e.stop < merged.start or merged.stop < e.start:
+                intervals.append(e)
+            else:
+                merged = range(
+                    min(e.start, merged.start), max(e.stop, merged.stop)
+                )
+        insort_range(intervals, merged)
+        self._filled_intervals = intervals
+
+    def map_port(self, address: int, port: Port) -> None:
+        assert 0 <= address < self.memory_size
+        old = self._ports.get(address)
+        if old is not None:
+            assert old.bits == port.bits
+            port = Port(
+                bits=port.bits,
+                read=port.read or old.read,
+                write=port.write or old.write,
+            )
+        self._ports[address] = port
+
+    def _port(self, address: Cell, bits: int) -> Port | None:
+        port = self._ports.get(address.unsigned)
+        if port is not None and port.bits != bits:
+            msg = (
+                f"Port at address {address} expects {port.bits} bits"
+                f" access, got {bits} bits"
+            )
+            raise RamAccessError(msg)
+        return port
+
     def _fill_cell(self, address: int) -> None:
         if self._fill[address]:
             return
         self._fill[address] = 1
 
-        if self.write_log is not None:
-            mod = self.write_log[-1][address]
-            self.write_log[-1][address] = RamWriteLog(
-                old=mod.old, new=mod.new, fill=True
-            )
-
         for i, ee in enumerate(self._filled_intervals):
             e = ee
             if address == e.start - 1:
@@ -132,15 +223,9 @@ class RandomAccessMemory:
         """Raise an error, if word has wrong format."""
         assert address.bits == self.address_bits
         assert word.bits == self.word_bits
-        if self.write_log is not None:
-            current = self._table[address.unsigned]
-            mod = self.write_log[-1].get(
-                address.unsigned, RamWriteLog(old=current, new=current)
-            )
-            self.write_log[-1][address.unsigned] = RamWriteLog(
-                old=mod.old, new=word.unsigned, fill=mod.fill
-            )
         self._table[address.unsigned] = word.unsigned
+        self.version += 1
+        self._write_log.append((address.unsigned, address.unsigned + 1))
         self._fill_cell(address.unsigned)
 
     def _missing(self, address: Cell, *, from_cpu: bool = True) -> None:
@@ -187,6 +272,14 @@ class RandomAccessMemory:
 
         if from_cpu:
             self.access_count += words
+            _count(
+                self.read_counts, address.unsigned, address.unsigned + words
+            )
+
+            if self._ports:
+                port = self._port(address, bits)
+                if port is not None and port.read is not None:
+                    return Cell(port.read(), bits=bits)
 
         return Cell.decode(
             [
@@ -202,6 +295,17 @@ class RandomAccessMemory:
     def is_fill(self, address: Cell) -> bool:
         return bool(self._fill[address.unsigned])
 
+    def has_fill(self, start: int, stop: int) -> bool:
+        """Check if any cell in [start, stop) is filled."""
+        return any(self._fill[start:stop])
+
+    def filled_until(self, start: int, stop: int) -> int:
+        """Return first dirty address in [start, stop) or stop."""
+        try:
+            return start + self._fill[start:stop].index(0)
+        except ValueError:
+            return stop
+
     def put(
         self, *, address: Cell, value: Cell, from_cpu: bool = True
     ) -> Cell:
@@ -221,6 +325,14 @@ class RandomAccessMemory:
 
         if from_cpu:
             self.access_count += words
+            _count(
+                self.write_counts, address.unsigned, address.unsigned + words
+            )
+
+            if self._ports:
+                port = self._port(address, value.bits)
+                if port is not None and port.write is not None:
+                    port.write(value)
 
         enc_value = value.encode(bits=self.word_bits, endianess=self.endianess)
         for i, v in enumerate(enc_value):
@@ -228,9 +340,148 @@ class RandomAccessMemory:
 
         return Cell(len(enc_value), bits=self.address_bits)
 
+    def _check_range(self, start: int, stop: int, action: str) -> None:
+        if not 0 <= start <= stop <= self.memory_size:
+            msg = (
+                f"Try to {action} {stop - start} words from address"
+                f" 0x{start:x} over memory size {self.memory_size:x}"
+            )
+            raise RamAccessError(msg)
+
+    def read_words(self, start: int, stop: int) -> array[int]:
+        """Return copy of raw words in [start, stop).
+
+        Dirty memory is read as zero, access is not counted.
+        """
+        self._check_range(start, stop, "read")
+        return self._table[start:stop]
+
+    def write_words(
+        self,
+        address: int,
+        words: array[int] | memoryview,
+        *,
+        from_cpu: bool = True,
+    ) -> None:
+        """Write consecutive raw words starting from address at once.
+
+        Words should have the same typecode as ram and fit into word_bits.
+        """
+        stop = address + len(words)
+        self._check_range(address, stop, "write")
+
+        if from_cpu:
+            self.access_count += len(words)
+            _count(self.write_counts, address, stop)
+
+        memoryview(self._table)[address:stop] = words
+        self.version += 1
+        self._write_log.append((address, stop))
+        self._fill_range(address, stop)
+
+    def written_since(self, version: int) -> Iterator[tuple[int, int]] | None:
+        """Ranges [start, stop) written after version, newest first.
+
+        None if some of these writes are not known anymore.
+        """
+        count = self.version - version
+        if count > len(self._write_log):
+            return None
+        return islice(reversed(self._write_log), count)
+
+    def watch_writes(
+        self, on_write: Callable[[int, int, int], None] | None
+    ) -> None:
+        """Swap in calling on_write(address, old, new) on every write.
+
+        None restores plain writes.
+        """
+        self.on_write = on_write
+        self.__class__ = _RAM_CLASSES[
+            isinstance(self, RecordingRandomAccessMemory),
+            on_write is not None,
+        ]
+
+    def record_history(self) -> RecordingRandomAccessMemory:
+        """Swap in recording of writes for reverse steps, see history."""
+        self.__class__ = _RAM_CLASSES[True, self.on_write is not None]
+        assert isinstance(self, RecordingRandomAccessMemory)
+        self.history = WriteHistory()
+        return self
+
+
+class RecordingRandomAccessMemory(RandomAccessMemory):
+    """Random access memory, which records history of writes."""
+
+    history: WriteHistory
+
+    def __setitem__(self, address: Cell, word: Cell) -> None:
+        """Record old word and fill flag before write."""
+        self.history.record(
+            address.unsigned,
+            self._table[address.unsigned],
+            fill=self._fill[address.unsigned],
+        )
+        super().__setitem__(address, word)
+
+    def write_words(
+        self,
+        address: int,
+        words: array[int] | memoryview,
+        *,
+        from_cpu: bool = True,
+    ) -> None:
+        stop = address + len(words)
+        self._check_range(address, stop, "write")
+        self.history.record_range(
+            address, self._table[address:stop], self._fill[address:stop]
+        )
+        super().write_words(address, words, from_cpu=from_cpu)
+
     def debug_reverse_step(self) -> None:
-        assert self.write_log is not None
-        for addr, modr in self.write_log.pop().items():
-            self._table[addr] = modr.old
-            if modr.fill:
-                self._fill[addr] = 0
+        self.version += 1
+        self._write_log.clear()
+        for address, old, fill in self.history.pop_step():
+            self._table[address] = old
+            self._fill[address] = fill
+
+
+class WatchedRandomAccessMemory(RandomAccessMemory):
+    """Random access memory, which calls on_write on every write."""
+
+    on_write: Callable[[int, int, int], None]
+
+    def __setitem__(self, address: Cell, word: Cell) -> None:
+        """Call on_write before write."""
+        self.on_write(
+            address.unsigned, self._table[address.unsigned], word.unsigned
+        )
+        super().__setitem__(address, word)
+
+    def write_words(
+        self,
+        address: int,
+        words: array[int] | memoryview,
+        *,
+        from_cpu: bool = True,
+    ) -> None:
+        stop = address + len(words)
+        self._check_range(address, stop, "write")
+        for i, new in enumerate(words):
+            self.on_write(address + i, self._table[address + i], new)
+        super().write_words(address, words, from_cpu=from_cpu)
+
+
+class WatchedRecordingRandomAccessMemory(
+    WatchedRandomAccessMemory, RecordingRandomAccessMemory
+):
+    pass
+
+
+# Ram classes by recording of history and watching of writes
+_RAM_CLASSES: Final[dict[tuple[bool, bool], type[RandomAccessMemory]]] = {
+    (False, False): RandomAccessMemory,
+    (False, True): WatchedRandomAccessMemory,
+    (True, False): RecordingRandomAccessMemory,
+    (True, True): WatchedRecordingRandomAccessMemory,
+}
@@ -5,15 +5,16 @@ Word is long integer.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
 from enum import IntEnum, auto
 from typing import TYPE_CHECKING
 
 from modelmachine.cell import Cell
+from modelmachine.memory.history import WriteHistory
 from modelmachine.memory.ram import MAX_WORD_BITS
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
+    from typing import Callable, Final
 
 
 class RegisterName(IntEnum):
@@ -46,21 +47,15 @@ class RegisterName(IntEnum):
     RF = auto()
 
 
-@dataclass(frozen=True)
-class RegisterWriteLog:
-    old: Cell
-    new: Cell
-
-
 class RegisterMemory:
     """Registers."""
 
     _table: list[Cell | None]
-    write_log: list[dict[RegisterName, RegisterWriteLog]] | None
+    on_write: Callable[[RegisterName, Cell, Cell], None] | None
 
     def __init__(self) -> None:
         self._table = [None] * len(RegisterName)
-        self.write_log = None
+        self.on_write = None
 
     def add_register(self, name: RegisterName, *, bits: int) -> None:
         """Add register with specific size.
@@ -85,7 +80,7 @@ class RegisterMemory:
 
     def __getitem__(self, name: RegisterName) -> Cell:
         """Return word."""
-        res = self._table[name.value]
+        res = self._table[name]
         if res is None:
             msg = f"{name} not found in register file"
             raise KeyError(msg)
@@ -95,11 +90,6 @@ class RegisterMemory:
         """Raise an error, if word has wrong format."""
         current = self[name]
         assert current.bits == word.bits
-        if self.write_log is not None:
-            mod = self.write_log[-1].get(
-                name, RegisterWriteLog(current, current)
-            )
-            self.write_log[-1][name] = RegisterWriteLog(old=mod.old, new=word)
         self._table[name] = word
 
     def __contains__(self, name: RegisterName) -> bool:
@@ -119,7 +109,64 @@ class RegisterMemory:
                 res[reg] = val
         return res
 
+    def watch_writes(
+        self, on_write: Callable[[RegisterName, Cell, Cell], None] | None
+    ) -> None:
+        """Swap in calling on_write(name, old, new) on every write.
+
+        None restores plain writes.
+        """
+        self.on_write = on_write
+        self.__class__ = _REGISTER_CLASSES[
+            isinstance(self, RecordingRegisterMemory), on_write is not None
+        ]
+
+    def record_history(self) -> RecordingRegisterMemory:
+        """Swap in recording of writes for reverse steps, see history."""
+        self.__class__ = _REGISTER_CLASSES[True, self.on_write is not None]
+        assert isinstance(self, RecordingRegisterMemory)
+        self.history = WriteHistory()
+        return self
+
+
+class RecordingRegisterMemory(RegisterMemory):
+    """Registers, which record history of writes."""
+
+    history: WriteHistory
+
+    def __setitem__(self, name: RegisterName, word: Cell) -> None:
+        """Record old value before write."""
+        self.history.record(name, self[name].unsigned)
+        super().__setitem__(name, word)
+
     def debug_reverse_step(self) -> None:
-        assert self.write_log is not None
-        for reg, modm in self.write_log.pop().items():
-            self._table[reg] = modm.old
+        for name, old, _ in self.history.pop_step():
+            current = self._table[name]
+            assert current is not None
+            self._table[name] = Cell(old, bits=current.bits)
+
+
+class WatchedRegisterMemory(RegisterMemory):
+    """Registers, which call on_write on every write."""
+
+    on_write: Callable[[RegisterName, Cell, Cell], None]
+
+    def __setitem__(self, name: RegisterName, word: Cell) -> None:
+        """Call on_write before write."""
+        self.on_write(name, self[name], word)
+        super().__setitem__(name, word)
+
+
+class WatchedRecordingRegisterMemory(
+    WatchedRegisterMemory, RecordingRegisterMemory
+):
+    pass
+
+
+# Register classes by recording of history and watching of writes
+_REGISTER_CLASSES: Final[dict[tuple[bool, bool], type[RegisterMemory]]] = {
+    (False, False): RegisterMemory,
+    (False, True): WatchedRegisterMemory,
+    (True, False): RecordingRegisterMemory,
+    (True, True): WatchedRecordingRegisterMemory,
+}
@@ -17,7 +17,8 @@ class NotEnoughInputError(SystemExit):
     pass
 
 
-def printf(out: str, *, end: str = "\n", file: TextIO = sys.stdout) -> None:
+def printf(out: str, *, end: str = "\n", file: TextIO | None = None) -> None:
+    """Print to file, default is sys.stdout at the moment of the call."""
     print(out, end=end, file=file)
 
 
@@ -95,6 +95,15 @@ class EnumMixin(metaclass=EnumMixinType):
     def __int__(self) -> int:
         return self._value_
 
+    def __copy__(self) -> Self:
+        return self
+
+    def __deepcopy__(self, _memo: object) -> Self:
+        return self
+
+    def __reduce__(self) -> tuple[type[Self], tuple[int]]:
+        return type(self), (self._value_,)
+
 
 if HAVE_MYPY:
 
@@ -1,5 +1,7 @@
 """Test case for complex CPU."""
 
+from __future__ import annotations
+
 from io import StringIO
 
 import pytest
@@ -154,3 +156,57 @@ def test_smoke(code: str) -> None:
         fout.isatty = lambda: True  # type: ignore[method-assign]
         cpu.print_result(file=fout)
         assert "x = 178929" in fout.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("code", "input_port", "output_port", "result"),
+    [
+        (
+            """
+            .cpu mm-3
+            .output 0x2 sum
+            .code
+            01 0002 0100 0002 ; sum := sum + port
+            80 0000 0000 0000 ; jump 0
+            00 0000 0000 0000 ; sum
+            """,
+            0x100,
+            None,
+            "6\n",
+        ),
+        (
+            """
+            .cpu mm-0
+            .code
+            40 00 ; push 0 ; input port
+            40 00 ; push 0
+            5C 01 ; dup 1
+            5C 00 ; dup 0
+            03 01 ; smul 1
+            5C 00 ; dup 0 ; output port
+            5B 03 ; pop 3
+            80 FB ; jump -5
+            """,
+            0xFFFF,
+            0xFFFB,
+            "1\n4\n9\n16\n",
+        ),
+    ],
+)
+def test_stream(
+    code: str, input_port: int, output_port: int | None, result: str
+) -> None:
+    cpu = load_from_string(code)
+    with StringIO("1 -2\n3 4 ") as fin, StringIO() as fout:
+        cpu.map_io_ports(
+            input_port=input_port,
+            output_port=output_port,
+            fin=fin,
+            fout=fout,
+        )
+        cpu.input(fin)
+        cpu.control_unit.run()
+        assert cpu.control_unit.status is Status.HALTED
+        assert not cpu.control_unit.failed
+        cpu.print_result(file=fout)
+        assert fout.getvalue() == result
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from io import StringIO
+from typing import TYPE_CHECKING
+
+from modelmachine.cu.control_unit import ControlUnit
+from modelmachine.ide.load import load_from_string
+from modelmachine.memory.ram import (
+    RandomAccessMemory,
+    WatchedRandomAccessMemory,
+)
+from modelmachine.memory.register import (
+    RegisterMemory,
+    RegisterName,
+    WatchedRegisterMemory,
+)
+
+if TYPE_CHECKING:
+    from modelmachine.cell import Cell
+    from modelmachine.cu.opcode import CommonOpcode
+
+CODE = (
+    ".cpu mm-3\n.input a, b\n.output c\n.asm\n"
+    "add a, b, c\nsub c, one, c\nhalt\n"
+    "a: .word 0\nb: .word 0\nc: .word 0\none: .word 1\n"
+    ".enter 10 20\n"
+)
+
+
+def test_hooks() -> None:
+    cpu = load_from_string(CODE)
+    events: list[tuple[object, ...]] = []
+
+    @cpu.hooks.on_fetch
+    def fetch(pc: int) -> None:
+        events.append(("fetch", pc))
+
+    @cpu.hooks.on_execute
+    def execute(opcode: CommonOpcode) -> None:
+        events.append(("execute", str(opcode)))
+
+    @cpu.hooks.on_ram_write
+    def ram_write(address: int, old: int, new: int) -> None:
+        events.append(("ram", address, old, new))
+
+    @cpu.hooks.on_halt
+    def halt() -> None:
+        events.append(("halt",))
+
+    registers: list[tuple[RegisterName, int, int]] = []
+
+    @cpu.hooks.on_register_write
+    def register_write(name: RegisterName, old: Cell, new: Cell) -> None:
+        registers.append((name, old.unsigned, new.unsigned))
+
+    cpu.control_unit.run()
+    assert events == [
+        ("fetch", 0),
+        ("execute", "add"),
+        ("ram", 5, 0, 30),
+        ("fetch", 1),
+        ("execute", "sub"),
+        ("ram", 5, 30, 29),
+        ("fetch", 2),
+        ("execute", "halt"),
+        ("halt",),
+    ]
+    assert (RegisterName.PC, 0, 1) in registers
+
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "29\n"
+
+
+def test_no_hooks() -> None:
+    cpu = load_from_string(CODE)
+    cu = cpu.control_unit
+    assert "step" not in vars(cu)
+    assert cpu.ram.on_write is None
+
+    def hook(*_args: object) -> None:
+        pass
+
+    cpu.hooks.on_fetch(hook)
+    cpu.hooks.on_execute(hook)
+    cpu.hooks.on_ram_write(hook)
+    cpu.hooks.on_register_write(hook)
+    assert "step" in vars(cu)
+    assert "_execute" in vars(cu)
+    assert type(cpu.ram) is WatchedRandomAccessMemory
+    assert type(cpu.registers) is WatchedRegisterMemory
+
+    cpu.hooks.remove(hook)
+    assert "step" not in vars(cu)
+    assert getattr(cu.step, "__func__", None) is ControlUnit.step
+    assert "_execute" not in vars(cu)
+    assert type(cpu.ram) is RandomAccessMemory
+    assert type(cpu.registers) is RegisterMemory
+
+    cpu.hooks.on_halt(hook)
+    cpu.hooks.clear()
+    assert "step" not in vars(cu)
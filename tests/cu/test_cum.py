@@ -534,6 +534,42 @@ class TestControlUnitM:
         self.control_unit.step()
         assert self.registers[RegisterName.R0] == 0x40
 
+    def test_modified_address_wraps(self) -> None:
+        self.ram.put(
+            address=Cell(0x0, bits=AB),
+            value=Cell(0x0012FFF0, bits=2 * AB),  # load R1, [0xFFF0 + R2]
+        )
+        self.ram.put(
+            address=Cell(0x10, bits=AB),
+            value=Cell(0x00000005, bits=2 * AB),
+        )
+        self.registers[RegisterName.R2] = Cell(0x10020, bits=self.OPERAND_BITS)
+
+        self.control_unit.step()
+        assert self.registers[RegisterName.R] == 1
+        assert self.registers[RegisterName.M] == 2
+        assert self.registers[RegisterName.ADDR] == 0x10
+        assert self.registers[RegisterName.R1] == 5
+
+    def test_operand_window(self) -> None:
+        for address, value in (
+            (0x0, 0x00100010),  # load R1, [0x10]
+            (0x2, 0x10100012),  # store R1, [0x12]
+            (0x4, 0x00200012),  # load R2, [0x12]
+            (0x10, 0x00000007),
+            (0x12, 0x00000000),
+        ):
+            self.ram.put(
+                address=Cell(address, bits=AB),
+                value=Cell(value, bits=2 * AB),
+            )
+        self.ram.access_count = 0
+
+        for _ in range(3):
+            self.control_unit.step()
+        assert self.registers[RegisterName.R2] == 7
+        assert self.ram.access_count == 3 * 2 + 3 * 2
+
     def test_smoke(self) -> None:
         """Simple program."""
         self.ram.put(
@@ -504,3 +504,38 @@ class TestControlUnitS:
         )
         assert self.registers[RegisterName.PC] == 0x56
         assert self.control_unit.status is Status.HALTED
+
+    def test_run_spills_stack_before_pop_into_stack(self) -> None:
+        program = [
+            (int(Opcode.push) << AB) | 0x100,
+            (int(Opcode.push) << AB) | 0x103,
+            (int(Opcode.pop) << AB) | 0xFFFD,
+            (int(Opcode.push) << AB) | 0xFFFD,
+        ]
+        for i, instruction in enumerate(program):
+            self.ram.put(
+                address=Cell(3 * i, bits=AB),
+                value=Cell(instruction, bits=self.OPERAND_BITS),
+            )
+        self.ram.put(
+            address=Cell(12, bits=AB), value=Cell(int(Opcode.add), bits=BYTE)
+        )
+        self.ram.put(
+            address=Cell(13, bits=AB),
+            value=Cell(int(Opcode.halt), bits=BYTE),
+        )
+        for address, value in ((0x100, 5), (0x103, 7)):
+            self.ram.put(
+                address=Cell(address, bits=AB),
+                value=Cell(value, bits=self.OPERAND_BITS),
+            )
+
+        self.control_unit.run()
+        assert self.control_unit.status is Status.HALTED
+        assert self.registers[RegisterName.SP] == 0xFFFD
+        assert (
+            self.ram.fetch(Cell(0xFFFD, bits=AB), bits=self.OPERAND_BITS) == 14
+        )
+        assert (
+            self.ram.fetch(Cell(0xFFFA, bits=AB), bits=self.OPERAND_BITS) == 7
+        )
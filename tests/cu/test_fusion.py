@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from io import StringIO
+
+from modelmachine.cu.control_unit_s import ControlUnitS
+from modelmachine.ide.load import load_from_string
+
+Opcode = ControlUnitS.Opcode
+
+CODE = (
+    ".cpu mm-s\n.input n\n.output s\n.asm\n"
+    "loop: push n\npush zero\ncomp\nsjleq exit\n"
+    "push s\npush n\nadd\npop s\n"
+    "push n\npush one\nsub\npop n\njump loop\n"
+    "exit: halt\n"
+    "n: .word 0\ns: .word 0\nzero: .word 0\none: .word 1\n"
+    ".enter 10\n"
+)
+
+
+def test_fusion() -> None:
+    cpu = load_from_string(CODE)
+    cu = cpu.control_unit
+    assert cu.fusion_counts is None
+    cu.enable_fusion()
+    assert cu.fusion_counts is not None
+    assert "step" in vars(cu)
+
+    cu.run()
+    assert cu.fusion_counts[Opcode.comp, Opcode.sjleq] == 11
+    assert cu.fusion_counts[Opcode.push, Opcode.add] == 10
+    assert cu.fusion_counts[Opcode.push, Opcode.sub] == 10
+    assert cu.fusion_counts[Opcode.push, Opcode.smul] == 0
+
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "55\n"
+
+
+def test_fusion_hooks() -> None:
+    cpu = load_from_string(CODE)
+    cu = cpu.control_unit
+    cu.enable_fusion()
+    fetched: list[int] = []
+    cpu.hooks.on_fetch(fetched.append)
+    cu.run()
+    assert fetched[:3] == [0, 3, 6]
+    assert cu.fusion_counts is not None
+    assert not any(cu.fusion_counts.values())
+
+    cpu.hooks.clear()
+    assert cu.step == cu._fused_step
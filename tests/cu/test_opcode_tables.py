@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from modelmachine.cpu.cpu import CU_MAP
+from modelmachine.cu.opcode import OPCODE_BITS
+
+if TYPE_CHECKING:
+    from modelmachine.cu.control_unit import ControlUnit
+
+
+@pytest.mark.parametrize("cpu_name", list(CU_MAP))
+def test_opcode_tables(cpu_name: str) -> None:
+    cu: type[ControlUnit] = CU_MAP[cpu_name]
+    assert len(cu.OPCODES) == len(cu.INSTRUCTION_WORDS) == 1 << OPCODE_BITS
+    for value, opcode in enumerate(cu.OPCODES):
+        if value not in cu.Opcode:
+            assert opcode is None
+            assert cu.INSTRUCTION_WORDS[value] == 0
+            continue
+
+        assert opcode is cu.Opcode(value)
+        assert cu.INSTRUCTION_WORDS[
+            value
+        ] * cu.WORD_BITS == cu.instruction_bits(opcode)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING
+
+from modelmachine.cell import Cell
+from modelmachine.cu.prefetch import Prefetch
+from modelmachine.memory.ram import WRITE_LOG_SIZE, RandomAccessMemory
+
+if TYPE_CHECKING:
+    import pytest
+
+WB = 8
+AB = 8
+
+
+def test_prefetch() -> None:
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    ram.write_words(0, array(ram.typecode, [1, 2, 3, 4]), from_cpu=False)
+    prefetch = Prefetch(ram)
+
+    assert prefetch.read(0, 3) == 0x010203
+    assert prefetch.read(2, 2) == 0x0304
+    # dirty memory is left to ram
+    assert prefetch.read(3, 2) is None
+    assert ram.filled_until(0, 10) == 4
+
+    ram.put(address=Cell(3, bits=AB), value=Cell(5, bits=WB))
+    assert prefetch.read(2, 2) == 0x0305
+
+    ram.write_words(0xFE, array(ram.typecode, [6, 7]), from_cpu=False)
+    assert prefetch.read(0xFE, 2) == 0x0607
+    assert prefetch.read(0xFF, 2) is None
+
+
+def test_write_outside_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    ram.write_words(0, array(ram.typecode, [1, 2, 3, 4]), from_cpu=False)
+    prefetch = Prefetch(ram)
+    assert prefetch.read(0, 2) == 0x0102
+
+    refills: list[int] = []
+    refill = prefetch._refill
+
+    def counted_refill(address: int) -> None:
+        refills.append(address)
+        refill(address)
+
+    monkeypatch.setattr(prefetch, "_refill", counted_refill)
+    ram.put(address=Cell(0x80, bits=AB), value=Cell(5, bits=2 * WB))
+    assert prefetch.read(1, 2) == 0x0203
+    assert refills == []
+
+    ram.put(address=Cell(0x80, bits=AB), value=Cell(5, bits=2 * WB))
+    ram.put(address=Cell(2, bits=AB), value=Cell(9, bits=WB))
+    assert prefetch.read(1, 2) == 0x0209
+    assert refills == [1]
+
+    # writes, which are not known anymore, refill the buffer
+    for _ in range(WRITE_LOG_SIZE + 1):
+        ram.put(address=Cell(0x80, bits=AB), value=Cell(5, bits=WB))
+    assert prefetch.read(1, 2) == 0x0209
+    assert refills == [1, 1]
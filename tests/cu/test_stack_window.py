@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+from modelmachine.cell import Cell
+from modelmachine.cu.stack_window import StackWindow
+from modelmachine.memory.ram import Port, RamAccessError, RandomAccessMemory
+
+WB = 8
+AB = 8
+
+
+def _ram_value(ram: RandomAccessMemory, address: int) -> int:
+    return ram.fetch(
+        Cell(address, bits=AB), bits=2 * WB, from_cpu=False
+    ).unsigned
+
+
+def test_stack_window() -> None:
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    window = StackWindow(ram, 2 * WB)
+
+    window.write(0xFE, Cell(0x1234, bits=2 * WB))
+    assert _ram_value(ram, 0xFE) == 0x1234
+    ram.access_count = 0
+    assert window.read(0xFE) == 0x1234
+    assert ram.access_count == 2
+
+    # write behind the window drops cached values
+    ram.put(address=Cell(0xFE, bits=AB), value=Cell(7, bits=2 * WB))
+    assert window.read(0xFE) == 7
+
+
+def test_deferred_writes() -> None:
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    window = StackWindow(ram, 2 * WB)
+    assert window.defer_writes()
+
+    window.write(0xFE, Cell(0x1234, bits=2 * WB))
+    window.write(0xFC, Cell(0x5678, bits=2 * WB))
+    assert ram.access_count == 4
+    assert not ram.has_fill(0xFC, 0x100)
+    assert window.read(0xFE) == 0x1234
+    assert ram.access_count == 6
+
+    window.flush_below(0xFC)
+    assert not ram.has_fill(0xFC, 0x100)
+    window.flush_below(0xFD)
+    assert _ram_value(ram, 0xFC) == 0x5678
+    assert _ram_value(ram, 0xFE) == 0x1234
+    assert ram.access_count == 6
+
+    # values at another offset do not overlap pending ones
+    window.write(0xFE, Cell(1, bits=2 * WB))
+    window.write(0xFD, Cell(0xABCD, bits=2 * WB))
+    assert _ram_value(ram, 0xFE) == 1
+    window.flush()
+    assert _ram_value(ram, 0xFD) == 0xABCD
+    assert _ram_value(ram, 0xFE) == 0xCD01
+
+    # write after flush goes to ram
+    window.write(0xFC, Cell(2, bits=2 * WB))
+    assert _ram_value(ram, 0xFC) == 2
+
+
+def test_deferred_write_over_memory() -> None:
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    window = StackWindow(ram, 2 * WB)
+    assert window.defer_writes()
+    with pytest.raises(RamAccessError):
+        window.write(0xFF, Cell(1, bits=2 * WB))
+
+
+def test_observed_ram_is_written_through() -> None:
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    ram.map_port(0, Port(bits=WB, read=lambda: 0))
+    assert not StackWindow(ram, 2 * WB).defer_writes()
+
+    ram = RandomAccessMemory(word_bits=WB, address_bits=AB)
+    ram.record_history()
+    assert not StackWindow(ram, 2 * WB).defer_writes()
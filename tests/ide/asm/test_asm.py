@@ -1,7 +1,11 @@
+from io import StringIO
+
 import pytest
 
 from modelmachine.cell import Cell
+from modelmachine.cpu.cpu import IOReq
 from modelmachine.ide.common_parsing import ParsingError
+from modelmachine.ide.dump import dump
 from modelmachine.ide.load import load_from_string
 
 AB = 16
@@ -34,6 +38,47 @@ def test_asm_io() -> None:
     assert cpu.ram.fetch(Cell(0x101, bits=AB), bits=WB) == 0x021234
 
 
+def test_asm_io_block() -> None:
+    cpu = load_from_string(
+        ".cpu mm-1\n.asm 0x100\na: .word 0, 0, 0\nb: .word 0, 0\n"
+        ".input a[3] A\n.input 0x103:0x105\n.output b[2], 0x100\n"
+        ".enter 1 2 3 4 5"
+    )
+    assert cpu.input_req == [IOReq(0x100, "A", 3), IOReq(0x103, None, 2)]
+    for i in range(5):
+        assert cpu.ram.fetch(Cell(0x100 + i, bits=AB), bits=WB) == i + 1
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "4\n5\n1\n"
+    with StringIO() as fout:
+        dump(cpu, fout)
+        assert ".input 0x100[3] A\n.input 0x103[2]\n" in fout.getvalue()
+
+    cpu = load_from_string(
+        ".cpu mm-m\n.asm 0x100\na: .word 0, 0\n.input a:0x104\n.enter 1 2"
+    )
+    assert cpu.input_req == [IOReq(0x100, "a", 2)]
+    assert cpu.ram.fetch(Cell(0x102, bits=AB), bits=32) == 2
+
+    cpu = load_from_string(
+        ".cpu mm-m\n.asm 0x100\na: .word 0, 0\nb: .word 0\n"
+        ".input a:b\n.output 0x102:b\n.enter 1 2"
+    )
+    assert cpu.input_req == [IOReq(0x100, "a", 2)]
+    assert cpu.output_req == [IOReq(0x102, None, 1)]
+
+    with pytest.raises(ParsingError, match="should be divided"):
+        load_from_string(".cpu mm-m\n.asm\n.input 0x100:0x103\n")
+    with pytest.raises(ParsingError, match="Undefined label 'c'"):
+        load_from_string(".cpu mm-m\n.asm\na: .word 0\n.input a:c\n")
+    with pytest.raises(ParsingError, match="Local labels"):
+        load_from_string(".cpu mm-m\n.asm\na: .word 0\n.input a:.b\n")
+    with pytest.raises(ParsingError, match="at least one value"):
+        load_from_string(".cpu mm-1\n.asm\n.input 0x100[0]\n")
+    with pytest.raises(SystemExit, match="Unexpected address for input"):
+        load_from_string(".cpu mm-1\n.asm\n.input 0xfffe[3]\n.enter 1 2 3")
+
+
 def test_asm_missed_label_io() -> None:
     with pytest.raises(ParsingError, match="Undefined label 'b'"):
         load_from_string(".cpu mm-1\n.asm\na: .word 10\n.input a,b\n")
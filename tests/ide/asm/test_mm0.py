@@ -31,6 +31,8 @@ def test_asm_io() -> None:
 def test_asm_missed_label_io() -> None:
     with pytest.raises(ParsingError, match="Undefined label 'b'"):
         load_from_string(f".cpu {MODEL}\n.asm\na: .word 10\n.input a,b\n")
+    with pytest.raises(ParsingError, match="unsupported for stack io"):
+        load_from_string(f".cpu {MODEL}\n.asm\n.input 0x1[2]\n")
 
 
 @pytest.mark.parametrize(
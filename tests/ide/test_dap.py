@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import base64
+import json
+import time
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+import pytest
+
+from modelmachine.ide.dap import DebugAdapter, read_message, write_message
+from modelmachine.ide.load import load_from_string
+
+if TYPE_CHECKING:
+    from typing import Any
+
+CODE = (
+    ".cpu mm-3\n.input a, b\n.output c\n.asm\n"
+    "add a, b, c\nsub c, one, c\nhalt\n"
+    "a: .word 0\nb: .word 0\nc: .word 0\none: .word 1\n"
+    ".enter 10 20\n"
+)
+
+
+def messages(fout: BytesIO) -> list[dict[str, Any]]:
+    fin = BytesIO(fout.getvalue())
+    res = []
+    while (message := read_message(fin)) is not None:
+        res.append(message)
+    fout.seek(0)
+    fout.truncate()
+    return res
+
+
+@pytest.fixture
+def adapter(monkeypatch: pytest.MonkeyPatch) -> DebugAdapter:
+    monkeypatch.setattr("modelmachine.prompt.colors.user_config", dict)
+    cpu = load_from_string(CODE)
+    return DebugAdapter(cpu=cpu, fin=BytesIO(), fout=BytesIO())
+
+
+def request(
+    adapter: DebugAdapter, command: str, **arguments: Any
+) -> list[dict[str, Any]]:
+    adapter.handle(
+        {
+            "seq": 1,
+            "type": "request",
+            "command": command,
+            "arguments": arguments,
+        }
+    )
+    fout = adapter._fout
+    assert isinstance(fout, BytesIO)
+    return messages(fout)
+
+
+def run(adapter: DebugAdapter, command: str) -> list[dict[str, Any]]:
+    res = request(adapter, command, threadId=1)
+    while adapter.ide.is_running:
+        time.sleep(0.001)
+    fout = adapter._fout
+    assert isinstance(fout, BytesIO)
+    return res + messages(fout)
+
+
+def test_framing() -> None:
+    with BytesIO() as fout:
+        write_message(fout, {"a": 1})
+        assert fout.getvalue() == b'Content-Length: 8\r\n\r\n{"a": 1}'
+        fout.seek(0)
+        assert read_message(fout) == {"a": 1}
+        assert read_message(fout) is None
+
+
+def test_session(adapter: DebugAdapter) -> None:
+    init = request(adapter, "initialize", adapterID="modelmachine")
+    assert init[0]["body"]["supportsStepBack"]
+    assert init[1]["event"] == "initialized"
+
+    (response,) = request(
+        adapter,
+        "setInstructionBreakpoints",
+        breakpoints=[{"instructionReference": "0x1"}],
+    )
+    assert response["body"]["breakpoints"] == [
+        {"verified": True, "instructionReference": "0x1"}
+    ]
+
+    response, stopped = request(adapter, "configurationDone")
+    assert stopped["body"]["reason"] == "entry"
+
+    (response,) = request(adapter, "stackTrace", threadId=1)
+    frame = response["body"]["stackFrames"][0]
+    assert frame["instructionPointerReference"] == "0x0"
+    assert frame["name"] == "add a, b, c"
+
+    (response,) = request(
+        adapter, "readMemory", memoryReference="0x15", count=21
+    )
+    assert response["body"]["address"] == "0x15"
+    data = base64.b64decode(response["body"]["data"])
+    assert data == (10).to_bytes(7, "big") + (20).to_bytes(7, "big") + bytes(7)
+
+    # unaligned range of bytes starts inside the word
+    (response,) = request(
+        adapter, "readMemory", memoryReference="0x15", offset=3, count=7
+    )
+    assert response["body"]["address"] == "0x18"
+    data = base64.b64decode(response["body"]["data"])
+    assert data == bytes(3) + b"\x0a" + bytes(3)
+
+    response, stopped = request(adapter, "next", threadId=1)
+    assert response["success"]
+    assert stopped["body"]["reason"] == "step"
+    (response,) = request(adapter, "variables", variablesReference=1)
+    registers = {
+        var["name"]: var["value"] for var in response["body"]["variables"]
+    }
+    assert registers["PC"] == "0x0001"
+
+    response, stopped = request(adapter, "stepBack", threadId=1)
+    assert stopped["body"]["reason"] == "step"
+    (response,) = request(adapter, "variables", variablesReference=1)
+    registers = {
+        var["name"]: var["value"] for var in response["body"]["variables"]
+    }
+    assert registers["PC"] == "0x0000"
+
+    response, stopped = run(adapter, "continue")
+    assert response["success"]
+    assert stopped["body"]["reason"] == "breakpoint"
+
+    _, output, stopped = run(adapter, "continue")
+    assert output["body"]["output"] == "29\n"
+    assert stopped["body"]["reason"] == "halted"
+
+    (response,) = request(adapter, "next", threadId=1)
+    assert not response["success"]
+    (response,) = request(adapter, "unknown")
+    assert not response["success"]
+    (response,) = request(
+        adapter, "setInstructionBreakpoints", breakpoints=[1]
+    )
+    assert not response["success"]
+    assert response["message"].startswith("TypeError")
+
+    request(adapter, "disconnect")
+    assert adapter._done
+
+
+def test_serve(adapter: DebugAdapter) -> None:
+    fin = adapter._fin
+    assert isinstance(fin, BytesIO)
+    for seq, command in enumerate(("initialize", "threads", "disconnect")):
+        write_message(fin, {"seq": seq, "type": "request", "command": command})
+    fin.seek(0)
+    adapter.serve()
+    fout = adapter._fout
+    assert isinstance(fout, BytesIO)
+    res = messages(fout)
+    assert [m.get("command", m.get("event")) for m in res] == [
+        "initialize",
+        "initialized",
+        "threads",
+        "disconnect",
+    ]
+    assert res[2]["body"]["threads"] == [{"id": 1, "name": "mm-3"}]
+    assert [m["seq"] for m in res] == [1, 2, 3, 4]
+    assert json.dumps(res)
+
+
+def test_pause(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("modelmachine.prompt.colors.user_config", dict)
+    cpu = load_from_string(
+        ".cpu mm-3\n.asm\nloop: add a, one, a\njump loop\n"
+        "a: .word 0\none: .word 1\n"
+    )
+    adapter = DebugAdapter(cpu=cpu, fin=BytesIO(), fout=BytesIO())
+
+    (response,) = request(adapter, "continue", threadId=1)
+    assert response["success"]
+    assert adapter.ide.is_running
+    (response,) = request(adapter, "next", threadId=1)
+    assert response["message"] == "Machine is running, pause it first"
+
+    response, stopped = request(adapter, "pause", threadId=1)
+    assert response["success"]
+    assert stopped["body"]["reason"] == "pause"
+    assert not adapter.ide.is_running
+
+    request(adapter, "disconnect")
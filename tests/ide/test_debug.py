@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import time
+from pathlib import Path
+
 import pytest
 from pyparsing import ParseException
 
-from modelmachine.ide.debug import debug_cmd
+from modelmachine.cell import Cell
+from modelmachine.ide.debug import Ide, debug_cmd
+from modelmachine.ide.load import load_from_file
+from modelmachine.ide.source import source
+from modelmachine.memory.register import RegisterName
+
+samples = Path(__file__).parent.parent.parent.resolve() / "samples" / "asm"
 
 
 @pytest.mark.parametrize(
@@ -48,3 +57,133 @@ def test_debug_cmd(cmd: str, cmd_str: str, res: list[int]) -> None:
 def test_debug_error(cmd_str: str) -> None:
     with pytest.raises(ParseException):
         debug_cmd.parse_string(cmd_str, parse_all=True)
+
+
+@pytest.mark.parametrize(
+    "sample",
+    [
+        "mm-0_factorial",
+        "mm-3_sum_of_squares",
+        "mm-m_array_sum",
+        "mm-v_factorial",
+    ],
+)
+def test_render_cache(sample: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("modelmachine.prompt.colors.user_config", dict)
+    cpu = load_from_file(
+        str(samples / f"{sample}.mmach"), protect_memory=True, enter=None
+    )
+    ide = Ide(cpu=cpu, colors=True)
+
+    def check() -> None:
+        cached = ide.render_full_memory()
+        ide._page_cache.clear()
+        assert ide.render_full_memory() == cached
+
+    check()
+    for _ in range(20):
+        ide.exec_step(breakp=False)
+        check()
+    for _ in range(5):
+        ide.exec_reverse_step(breakp=False)
+        check()
+    ide.breakpoint(2)
+    check()
+    for _ in range(10):
+        ide.exec_step(breakp=False)
+    check()
+
+
+@pytest.mark.parametrize(
+    "sample", ["mm-0_factorial", "mm-s_factorial1", "mm-m_array_sum"]
+)
+def test_reverse_step(sample: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("modelmachine.prompt.colors.user_config", dict)
+    cpu = load_from_file(
+        str(samples / f"{sample}.mmach"), protect_memory=True, enter=None
+    )
+    ide = Ide(cpu=cpu, colors=False)
+
+    def state() -> tuple[object, ...]:
+        return (
+            cpu.registers.state,
+            cpu.ram.read_words(0, cpu.ram.memory_size),
+            cpu.ram._fill[:],
+            cpu.ram.access_count,
+        )
+
+    states = [state()]
+    running = True
+    while running:
+        running = ide.exec_step(breakp=False)
+        states.append(state())
+
+    while ide.exec_reverse_step(breakp=False):
+        states.pop()
+        assert state() == states[-1]
+    assert len(states) == 1
+
+
+def test_background(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("modelmachine.prompt.colors.user_config", dict)
+    output: list[str] = []
+    monkeypatch.setattr(
+        "modelmachine.ide.debug.printf",
+        lambda out, end="\n": output.append(out + end),
+    )
+    cpu = source(
+        ".cpu mm-3\n.asm\nloop: add a, one, a\njump loop\n"
+        "a: .word 0\none: .word 1\n",
+        protect_memory=True,
+    )
+    ide = Ide(cpu=cpu, colors=False)
+
+    assert ide.cmd("continue")
+    assert ide.is_running
+    while ide.cpu.ram.fetch(Cell(2, bits=16), bits=56) == 0:
+        time.sleep(0.001)
+    assert ide.cmd("status")
+    assert ide.cmd("memory 0 3")
+    assert ide.cmd("step")
+    assert "machine is running" in "".join(output)
+
+    assert ide.cmd("pause")
+    assert not ide.is_running
+    assert ide.cmd("pause")
+    assert "machine is paused" in "".join(output)
+
+    # Background run stops at breakpoint by itself
+    assert ide.cmd("breakpoint 1")
+    assert ide.cmd("continue")
+    while ide.is_running:
+        time.sleep(0.001)
+    assert ide.cpu.registers[RegisterName.PC] == 1
+    assert "pause at breakpoint" in "".join(output)
+
+    assert ide.cmd("continue")
+    assert ide.cmd("quit")
+    assert not ide.is_running
+
+
+def test_background_warnings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("modelmachine.prompt.colors.user_config", dict)
+    output: list[str] = []
+    monkeypatch.setattr(
+        "modelmachine.ide.debug.printf",
+        lambda out, end="\n": output.append(out + end),
+    )
+    cpu = source(
+        ".cpu mm-3\n.asm\nadd a, b, a\nhalt\na: .word 0\nb:\n",
+        protect_memory=False,
+    )
+    ide = Ide(cpu=cpu, colors=False)
+
+    with ide.collect_warnings():
+        assert ide.cmd("continue")
+        while ide.is_running:
+            time.sleep(0.001)
+
+    text = "".join(output)
+    assert "machine halted" in text
+    assert "Warning: Read memory by address: 0x0003" in text
+    assert text.index("machine halted") < text.index("Warning:")
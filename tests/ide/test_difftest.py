@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import pytest
+
+from modelmachine.cpu.cpu import CU_MAP, Cpu
+from modelmachine.ide import difftest
+from modelmachine.ide.difftest import (
+    DATA_ADDRESS,
+    ENGINES,
+    REFERENCE,
+    compare,
+    load_program,
+    random_program,
+)
+
+
+def test_random_program() -> None:
+    for cpu_name in CU_MAP:
+        program = random_program(cpu_name, 1)
+        assert program == random_program(cpu_name, 1)
+        assert program != random_program(cpu_name, 2)
+        cpu = load_program(program)
+        assert cpu.ram.has_fill(0, 1)
+        assert cpu.ram.has_fill(DATA_ADDRESS, DATA_ADDRESS + 1)
+
+
+@pytest.mark.parametrize(
+    "engine", [engine for engine in ENGINES if engine != REFERENCE]
+)
+@pytest.mark.parametrize("cpu_name", list(CU_MAP))
+def test_engine(cpu_name: str, engine: str) -> None:
+    assert difftest.difftest([cpu_name], engine, programs=10) == []
+
+
+def _broken(cpu: Cpu) -> None:
+    alu = cpu._alu
+    alu.add = alu.sub  # type: ignore[method-assign]
+
+
+def test_mismatch(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(ENGINES, "broken", _broken)
+    mismatches = difftest.difftest(["mm-3"], "broken", programs=10)
+    assert mismatches
+
+    mismatch = mismatches[0]
+    assert compare(mismatch.program, "broken") is not None
+    assert len(mismatch.program.code) < len(
+        random_program("mm-3", mismatch.seed).code
+    )
+    assert str(mismatch).startswith(f"mm-3 seed={mismatch.seed} step=")
+    assert ".cpu mm-3" in str(mismatch)
+
+
+def test_jobs(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(ENGINES, "broken", _broken)
+    assert difftest.difftest(["mm-1"], "hooks", programs=4, jobs=2) == []
+    assert difftest.difftest(["mm-3"], "broken", programs=10, jobs=2)
+    with pytest.raises(ValueError, match="Unknown engine"):
+        difftest.difftest(["mm-1"], "fast", programs=1)
+
+
+def test_reference_is_plain(monkeypatch: pytest.MonkeyPatch) -> None:
+    cu = CU_MAP["mm-3"]
+    opcodes = list(cu.OPCODES)
+    opcodes[int(cu.Opcode.add)] = opcodes[int(cu.Opcode.sub)]
+    monkeypatch.setattr(cu, "OPCODES", tuple(opcodes))
+    assert difftest.difftest(["mm-3"], "step", programs=10)
+    assert difftest.difftest(["mm-3"], "no-decode-tables", programs=10) == []
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import struct
+from io import BytesIO, StringIO
+from pathlib import Path
+
+import pytest
+
+from modelmachine.cell import Cell
+from modelmachine.cli import asm, run
+from modelmachine.cpu.cpu import IOReq
+from modelmachine.ide.image import (
+    MAGIC,
+    ImageError,
+    dump_image,
+    is_image,
+    load_image,
+    load_image_file,
+)
+from modelmachine.ide.load import load_from_file
+from modelmachine.ide.source import source
+
+samples = Path(__file__).parent.parent.parent.resolve() / "samples"
+sample_list = sorted(samples.glob("*.mmach")) + sorted(
+    (samples / "asm").glob("*.mmach")
+)
+
+
+def image(code: str) -> bytes:
+    cpu = source(code, protect_memory=True)
+    with BytesIO() as fout:
+        dump_image(cpu, fout)
+        return fout.getvalue()
+
+
+@pytest.mark.parametrize("sample", sample_list, ids=lambda p: p.name)
+def test_round_trip(sample: Path) -> None:
+    cpu1 = source(sample.read_text(encoding="utf-8"), protect_memory=True)
+    with BytesIO() as fout:
+        dump_image(cpu1, fout)
+        data = fout.getvalue()
+
+    cpu2 = load_image(memoryview(data), protect_memory=True)
+
+    assert cpu1.name == cpu2.name
+    assert cpu1.input_req == cpu2.input_req
+    assert cpu1.output_req == cpu2.output_req
+    assert cpu1.enter == cpu2.enter
+    assert cpu1.ram.comment == cpu2.ram.comment
+    assert cpu1.ram.filled_intervals == cpu2.ram.filled_intervals
+    for rng in cpu1.ram.filled_intervals:
+        assert cpu1.ram.read_words(rng.start, rng.stop) == (
+            cpu2.ram.read_words(rng.start, rng.stop)
+        )
+
+
+def test_io_block() -> None:
+    cpu = load_image(
+        memoryview(image(".cpu mm-1\n.input 0x100[3] a\n.code\n99 0000\n")),
+        protect_memory=True,
+    )
+    assert cpu.input_req == [IOReq(0x100, "a", 3)]
+
+
+def test_load_image_file(tmp_path: Path) -> None:
+    filename = tmp_path / "sample.mmbin"
+    filename.write_bytes(
+        image((samples / "mm-2_sample.mmach").read_text(encoding="utf-8"))
+    )
+
+    assert is_image(str(filename))
+    assert not is_image(str(samples / "mm-2_sample.mmach"))
+
+    cpu = load_image_file(str(filename), protect_memory=True)
+    assert cpu.name == "mm-2"
+    assert cpu.ram.fetch(Cell(0, bits=16), bits=40) == 0x0001020100
+
+
+def test_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    filename = tmp_path / "sample.mmbin"
+    asm(
+        source=str(samples / "asm" / "mm-s_sample.mmach"),
+        output=str(filename),
+        output_format="bin",
+    )
+    assert filename.read_bytes().startswith(MAGIC)
+
+    run(filename=str(filename), protect_memory=True)
+    assert capsys.readouterr().out == "178929\n"
+
+    enter = tmp_path / "enter.txt"
+    enter.write_text("10 2", encoding="utf-8")
+    cpu = load_from_file(str(filename), protect_memory=True, enter=str(enter))
+    cpu.control_unit.run()
+    assert not cpu.control_unit.failed
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "144\n"
+
+    with pytest.raises(ValueError, match="Unknown output format"):
+        asm(
+            source=str(samples / "asm" / "mm-s_sample.mmach"),
+            output=str(filename),
+            output_format="elf",
+        )
+
+
+def test_bad_image() -> None:
+    good = image(".cpu mm-1\n.code\n99 0000\n")
+
+    with pytest.raises(ImageError, match="Unexpected binary image format"):
+        load_image(memoryview(b"MMBIN"), protect_memory=True)
+
+    with pytest.raises(ImageError, match="Missed header"):
+        load_image(memoryview(MAGIC), protect_memory=True)
+
+    with pytest.raises(ImageError, match="Unexpected end"):
+        load_image(memoryview(good[:-4]), protect_memory=True)
+
+    unknown = good.replace(b"mm-1", b"mm-9")
+    with pytest.raises(ImageError, match="Unknown cpu"):
+        load_image(memoryview(unknown), protect_memory=True)
+
+    chunk = struct.pack("<4sI", b"XXXX", 0)
+    with pytest.raises(ImageError, match="Unknown chunk"):
+        load_image(memoryview(good + chunk), protect_memory=True)
+
+    segment = good[good.index(b"SEGM") :]
+    segment = segment[: segment.index(b"INPT")]
+    with pytest.raises(ImageError, match="Code sections overlaps"):
+        load_image(memoryview(good + segment), protect_memory=True)
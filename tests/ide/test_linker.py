@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from io import StringIO
+from typing import TYPE_CHECKING
+
+import pytest
+
+from modelmachine.ide import linker
+from modelmachine.ide.asm.errors import DuplicateLabelError
+from modelmachine.ide.linker import ImportModuleError, ObjectModule
+from modelmachine.ide.load import load_from_file
+from modelmachine.ide.session import Session
+from modelmachine.ide.source import assemble_module, source
+
+from .test_session import assert_same
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+LIBRARY = (
+    ".cpu mm-3\n"
+    ".asm 0x100\n"
+    "square: smul x, x, x\n"
+    "jump back ; defined by program\n"
+    "x: .word 0\n"
+)
+PROGRAM = (
+    ".cpu mm-3\n"
+    ".import lib.mmach ; library\n"
+    ".input x\n"
+    ".output x\n"
+    ".asm\n"
+    "jump square\n"
+    "back: halt\n"
+    ".enter 12\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(linker, "_modules", {})
+    (tmp_path / "lib.mmach").write_text(LIBRARY, encoding="utf-8")
+    return tmp_path / "cache" / "modelmachine" / "modules"
+
+
+def test_import(tmp_path: Path) -> None:
+    filename = tmp_path / "program.mmach"
+    filename.write_text(PROGRAM, encoding="utf-8")
+    cpu = load_from_file(str(filename), protect_memory=True, enter=None)
+    cpu.control_unit.run()
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "144\n"
+
+
+def test_same_as_single_file(tmp_path: Path) -> None:
+    cpu = source(PROGRAM, protect_memory=True, import_dir=tmp_path)
+    single = source(
+        PROGRAM.replace(".import lib.mmach ; library\n", "")
+        + LIBRARY.replace(".cpu mm-3\n", ""),
+        protect_memory=True,
+    )
+    assert cpu.ram.filled_intervals == single.ram.filled_intervals
+    for rng in cpu.ram.filled_intervals:
+        assert cpu.ram.read_words(rng.start, rng.stop) == (
+            single.ram.read_words(rng.start, rng.stop)
+        )
+    assert cpu.input_req == single.input_req
+    assert cpu.ram.comment.keys() == single.ram.comment.keys()
+
+
+def test_relocate(tmp_path: Path) -> None:
+    cpu = source(
+        PROGRAM.replace(".import", ".import 0x200"),
+        protect_memory=True,
+        import_dir=tmp_path,
+    )
+    single = source(
+        PROGRAM.replace(".import lib.mmach ; library\n", "")
+        + LIBRARY.replace(".cpu mm-3\n.asm 0x100", ".asm 0x200"),
+        protect_memory=True,
+    )
+    assert cpu.ram.filled_intervals == single.ram.filled_intervals
+    for rng in cpu.ram.filled_intervals:
+        assert cpu.ram.read_words(rng.start, rng.stop) == (
+            single.ram.read_words(rng.start, rng.stop)
+        )
+    assert cpu.input_req == single.input_req
+    assert cpu.ram.comment.keys() == single.ram.comment.keys()
+
+    module, _ = assemble_module(LIBRARY)
+    assert module.origin == 0x100
+    assert module.relocate(0x100) is module
+    assert module.relocate(0x200).relocate(0x100) == module
+
+
+def test_import_twice(tmp_path: Path) -> None:
+    (tmp_path / "lib2.mmach").write_text(
+        ".cpu mm-3\n.asm 0x100\ny: .word 0\n", encoding="utf-8"
+    )
+    program = PROGRAM.replace(".asm\n", ".import lib2.mmach\n.asm\n")
+    with pytest.raises(ImportModuleError, match="lib2.mmach': it overlaps"):
+        source(program, protect_memory=True, import_dir=tmp_path)
+
+    program = program.replace(".import lib2", ".import 0x200 lib2")
+    cpu = source(program, protect_memory=True, import_dir=tmp_path)
+    assert cpu.ram.has_fill(0x200, 0x201)
+
+    with pytest.raises(ImportModuleError, match="does not fit into memory"):
+        source(
+            PROGRAM.replace(".import", ".import 0xfffe"),
+            protect_memory=True,
+            import_dir=tmp_path,
+        )
+
+
+def test_session_reloads_module(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    session = Session()
+    session.source(PROGRAM, protect_memory=True)
+    (tmp_path / "lib.mmach").write_text(
+        LIBRARY.replace("smul", "add"), encoding="utf-8"
+    )
+    program = PROGRAM.replace("back: halt", "back:  halt")
+    assert_same(
+        session.source(program, protect_memory=True),
+        source(program, protect_memory=True, import_dir=tmp_path),
+    )
+    assert session.reused == 0
+
+    program = PROGRAM.replace("back: halt", "back: halt ")
+    session.source(program, protect_memory=True)
+    assert session.reused == 1
+
+
+def test_cache(
+    tmp_path: Path, cache: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cpu = source(PROGRAM, protect_memory=True, import_dir=tmp_path)
+    assert len(list(cache.glob("*.json"))) == 1
+
+    def fail(pstr: str) -> tuple[ObjectModule, str]:
+        raise AssertionError(pstr)
+
+    monkeypatch.setattr(linker, "_modules", {})
+    monkeypatch.setattr("modelmachine.ide.source.assemble_module", fail)
+    assert_same(source(PROGRAM, protect_memory=True, import_dir=tmp_path), cpu)
+    assert_same(source(PROGRAM, protect_memory=True, import_dir=tmp_path), cpu)
+
+    (tmp_path / "lib.mmach").write_text(
+        LIBRARY.replace("smul", "add"), encoding="utf-8"
+    )
+    with pytest.raises(AssertionError):
+        source(PROGRAM, protect_memory=True, import_dir=tmp_path)
+
+
+def test_serialize() -> None:
+    module, serialized = assemble_module(LIBRARY)
+    assert ObjectModule.loads(serialized) == module
+
+
+@pytest.mark.parametrize(
+    ("library", "program", "exception", "error"),
+    [
+        (
+            LIBRARY,
+            PROGRAM.replace("lib", "missed"),
+            ImportModuleError,
+            "Cannot",
+        ),
+        (
+            ".cpu mm-2\n.asm 0x100\nhalt\n",
+            PROGRAM,
+            ImportModuleError,
+            "for mm-2 into program for mm-3",
+        ),
+        (
+            LIBRARY + ".import other.mmach\n",
+            PROGRAM,
+            ImportModuleError,
+            "Nested .import",
+        ),
+        (
+            LIBRARY + ".output x\n",
+            PROGRAM,
+            ImportModuleError,
+            "Unexpected .output directive in module",
+        ),
+        (
+            LIBRARY,
+            PROGRAM.replace("back:", "x:"),
+            DuplicateLabelError,
+            "Duplicate label 'x'",
+        ),
+        (
+            LIBRARY,
+            PROGRAM.replace(".asm\n", ".asm 0x101\n"),
+            SystemExit,
+            "Code sections overlaps",
+        ),
+    ],
+)
+def test_errors(
+    tmp_path: Path,
+    library: str,
+    program: str,
+    exception: type[SystemExit],
+    error: str,
+) -> None:
+    (tmp_path / "lib.mmach").write_text(library, encoding="utf-8")
+    with pytest.raises(exception, match=error):
+        source(program, protect_memory=True, import_dir=tmp_path)
@@ -105,6 +105,11 @@ def test_enter_too_long() -> None:
         )
 
 
+def test_enter_without_input() -> None:
+    with pytest.raises(SystemExit, match="Too many elements in the input"):
+        load_from_string(".cpu mm-1\n.enter 10\n.code\n99 0000")
+
+
 def test_multi_input() -> None:
     cpu = load_from_string(
         ".cpu mm-3\n.input 0x100, 0x101, 0x102 Enter some data, please\n.code\n99 0000 0000 0000\n.enter 1 2 3"
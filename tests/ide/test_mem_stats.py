@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from io import StringIO
+
+from modelmachine.ide.load import load_from_string
+from modelmachine.ide.mem_stats import (
+    address_stats,
+    print_mem_stats,
+    write_mem_stats_csv,
+)
+
+CODE = (
+    ".cpu mm-3\n.input a, b\n.output c\n.asm\n"
+    "main: add a, b, c\nsub c, one, c\nhalt\n"
+    "a: .word 0\nb: .word 0\nc: .word 0\none: .word 1\n"
+    "array: .word 0, 0\n"
+    ".enter 10 20\n"
+)
+
+
+def test_labels() -> None:
+    cpu = load_from_string(CODE)
+    assert cpu.labels == {
+        0: "main",
+        3: "a",
+        4: "b",
+        5: "c",
+        6: "one",
+        7: "array",
+    }
+
+
+def test_mem_stats() -> None:
+    cpu = load_from_string(CODE)
+    cpu.ram.enable_access_stats()
+    cpu.control_unit.run()
+
+    stats = {st.address: st for st in address_stats(cpu)}
+    assert list(stats) == [0, 1, 2, 3, 4, 5, 6]
+    assert (stats[5].reads, stats[5].writes) == (1, 2)
+    assert stats[5].label == "c"
+    assert stats[1].label == "main+1"
+    assert stats[1].comment == "sub c, one, c"
+
+    with StringIO() as fout:
+        print_mem_stats(cpu, fout, hot=2)
+        assert fout.getvalue() == (
+            "Memory access stats:\n"
+            "  reads: 7 words, writes: 2 words, read/write ratio: 3.50\n"
+            "  working set: 7 words\n"
+            "  hot addresses:\n"
+            "    address   reads  writes  label  comment\n"
+            "     0x0005       1       2  c      c:      0\n"
+            "     0x0000       1       0  main   main: add a, b, c\n"
+        )
+
+    with StringIO() as fout:
+        write_mem_stats_csv(cpu, fout)
+        lines = fout.getvalue().splitlines()
+    assert lines[0] == "address,label,reads,writes,comment"
+    assert lines[6] == "0x5,c,1,2,c:      0"
+    assert len(lines) == 8
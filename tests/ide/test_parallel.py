@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from io import StringIO
+
+import pytest
+
+from modelmachine.ide.common_parsing import ParsingError
+from modelmachine.ide.parallel import assemble_section, parallel_source
+from modelmachine.ide.source import source
+
+from .test_session import assert_same
+
+LIBRARY = (
+    ".cpu mm-3\n.input a, b\n.output c\n"
+    ".asm\n"
+    "main: add a, b, c\n"
+    "jump twice\n"
+    ".asm 0x20\n"
+    "twice: add c, c, c\n"
+    ".dec: sub c, one, c\n"
+    "halt\n"
+    ".asm 0x30\n"
+    "a: .word 0\nb: .word 0\nc: .word 0\none: .word 1\n"
+    ".enter 10 20\n"
+)
+
+
+def test_assemble_section() -> None:
+    section = assemble_section("mm-3", 0x20, "twice: add c, c, c\nhalt\n")
+    assert section is not None
+    assert list(section.labels) == ["twice"]
+    assert [(ref.addr.unsigned, ref.label.name) for ref in section.refs] == [
+        (0x20, "c"),
+        (0x20, "c"),
+        (0x20, "c"),
+    ]
+    assert [(start, len(words)) for start, words in section.image] == [
+        (0x20, 2)
+    ]
+
+    assert assemble_section("mm-3", 0, "hult\n") is None
+
+
+def test_parallel_source() -> None:
+    cpu = parallel_source(LIBRARY, protect_memory=True, jobs=2, min_lines=0)
+    assert_same(cpu, source(LIBRARY, protect_memory=True))
+
+    with StringIO(cpu.enter) as fin:
+        cpu.input(fin)
+    cpu.control_unit.run()
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "59\n"
+
+
+@pytest.mark.parametrize(
+    ("code", "error"),
+    [
+        (LIBRARY.replace("twice: add", "main: add"), "Duplicate label"),
+        (LIBRARY.replace("jump twice", "jump thrice"), "Undefined label"),
+        (LIBRARY.replace(".asm 0x20", ".asm 0x1"), "Code sections overlaps"),
+        (LIBRARY.replace("halt\n", "halt\nhult\n"), "Expected end of text"),
+    ],
+)
+def test_errors(code: str, error: str) -> None:
+    with pytest.raises(SystemExit) as exc:
+        source(code, protect_memory=True)
+    with pytest.raises(SystemExit, match=error) as parallel_exc:
+        parallel_source(code, protect_memory=True, jobs=2, min_lines=0)
+    assert type(parallel_exc.value) is type(exc.value)
+    assert str(parallel_exc.value) == str(exc.value)
+
+
+def test_dependent_sections() -> None:
+    for code in (
+        LIBRARY.replace("twice\n.asm 0x20\n", "twice\nnext:\n.asm 0x20\n"),
+        LIBRARY.replace(".asm 0x30", ".asm 0x21"),
+    ):
+        assert_same(
+            parallel_source(code, protect_memory=True, jobs=2, min_lines=0),
+            source(code, protect_memory=True),
+        )
+
+    with pytest.raises(ParsingError, match="Missed required"):
+        parallel_source(".cpu mm-3\n", protect_memory=True, jobs=2)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from io import StringIO
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from modelmachine.ide.common_parsing import ParsingError
+from modelmachine.ide.load import load_from_string
+from modelmachine.ide.session import Session, split_sections
+from modelmachine.ide.source import source
+
+if TYPE_CHECKING:
+    from modelmachine.cpu.cpu import Cpu
+
+samples = Path(__file__).parent.parent.parent.resolve() / "samples" / "asm"
+sample_list = sorted(samples.glob("*.mmach"))
+
+
+def assert_same(cpu1: Cpu, cpu2: Cpu) -> None:
+    assert cpu1.name == cpu2.name
+    assert cpu1.input_req == cpu2.input_req
+    assert cpu1.output_req == cpu2.output_req
+    assert cpu1.enter == cpu2.enter
+    assert cpu1.ram.comment == cpu2.ram.comment
+    assert cpu1.ram.filled_intervals == cpu2.ram.filled_intervals
+    for rng in cpu1.ram.filled_intervals:
+        assert cpu1.ram.read_words(rng.start, rng.stop) == (
+            cpu2.ram.read_words(rng.start, rng.stop)
+        )
+
+
+def test_split_sections() -> None:
+    skeleton, sections = split_sections(
+        ".cpu mm-1\n.asm 0x10\nload a\n.code\n99 0000\n.ASM\n.x: halt\n"
+    )
+    assert skeleton == ".cpu mm-1\n.asm 0x10\n.code\n99 0000\n.ASM\n"
+    assert sections == [["load a"], [".x: halt", ""]]
+
+
+@pytest.mark.parametrize("sample", sample_list, ids=lambda p: p.name)
+def test_edit_lines(sample: Path) -> None:
+    session = Session()
+    code = sample.read_text(encoding="utf-8")
+    assert_same(
+        session.source(code, protect_memory=True),
+        source(code, protect_memory=True),
+    )
+
+    lines = code.split("\n")
+    _, sections = split_sections(code)
+    body = {line for section in sections for line in section}
+    edits = [
+        i
+        for i, line in enumerate(lines)
+        if line in body and line.strip() and ";" not in line
+    ]
+    for i in edits[::3]:
+        line = lines[i]
+        lines[i] = f"{line} ; edited"
+        edited = "\n".join(lines)
+        reused = session.reused
+        assert_same(
+            session.source(edited, protect_memory=True),
+            source(edited, protect_memory=True),
+        )
+        assert session.reused == reused + 1
+
+
+def test_layout_change() -> None:
+    session = Session()
+    code = (
+        ".cpu mm-1\n.input a\n.output b\n.asm\n"
+        "load a\nstore b\nhalt\na: .word 0\nb: .word 0\n.enter 5\n"
+    )
+    cpu = load_from_string(code, session=session)
+    cpu.control_unit.run()
+    with StringIO() as fout:
+        cpu.print_result(fout)
+        assert fout.getvalue() == "5\n"
+
+    for edited, reused in (
+        (code.replace("store b\n", "store b\nstore b\n"), False),
+        (code.replace("a: .word 0", "a: .word 0, 1"), False),
+        (code.replace("load a", "add a"), True),
+        (code.replace("b: .word 0", "b: c: .word 0"), False),
+        (code.replace(".asm\n", ".asm 0x10\n"), False),
+        (".cpu mm-2\n.asm\nmove a, b\nhalt\na: .word 0\nb: .word 0\n", False),
+    ):
+        session.source(code, protect_memory=True)
+        count = session.reused
+        assert_same(
+            session.source(edited, protect_memory=True),
+            source(edited, protect_memory=True),
+        )
+        assert session.reused == count + reused
+
+
+def test_errors() -> None:
+    session = Session()
+    code = ".cpu mm-1\n.asm\nload a\nhalt\na: .word 0\n"
+    session.source(code, protect_memory=True)
+
+    for edited, error in (
+        (code.replace("load a", "load b"), "Undefined label 'b'"),
+        (code.replace("halt", "a: halt"), "Duplicate label 'a'"),
+        (code.replace("halt", "hult"), "Expected end of text"),
+    ):
+        with pytest.raises(ParsingError) as exc:
+            source(edited, protect_memory=True)
+        with pytest.raises(ParsingError, match=error) as session_exc:
+            session.source(edited, protect_memory=True)
+        assert str(session_exc.value) == str(exc.value)
+
+    assert_same(
+        session.source(code, protect_memory=True),
+        source(code, protect_memory=True),
+    )
@@ -1,4 +1,5 @@
 import warnings
+from array import array
 
 import pytest
 
@@ -6,6 +7,8 @@ from modelmachine.cell import Cell, Endianess
 from modelmachine.memory.ram import (
     RamAccessError,
     RandomAccessMemory,
+    RecordingRandomAccessMemory,
+    WatchedRandomAccessMemory,
 )
 
 WB = 16
@@ -151,3 +154,95 @@ class TestRandomAccessMemory:
             range(1, 5),
             range(8, 10),
         ]
+
+    def test_words(self) -> None:
+        """Bulk access to raw words."""
+        self.ram.write_words(2, array(self.ram.typecode, [1, 2, 3]))
+        self.ram.write_words(6, array(self.ram.typecode, [4, 5]))
+        assert self.ram.filled_intervals == [range(2, 5), range(6, 8)]
+        assert self.ram.access_count == 5
+        assert self.ram.has_fill(5, 7)
+        assert not self.ram.has_fill(8, 10)
+
+        self.ram.write_words(5, array(self.ram.typecode, [6]), from_cpu=False)
+        assert self.ram.filled_intervals == [range(2, 8)]
+        assert self.ram.access_count == 5
+        assert list(self.ram.read_words(1, 9)) == [0, 1, 2, 3, 6, 4, 5, 0]
+
+        with pytest.raises(RamAccessError):
+            self.ram.write_words(
+                (1 << AB) - 1, array(self.ram.typecode, [1, 2])
+            )
+        with pytest.raises(RamAccessError):
+            self.ram.read_words((1 << AB) - 1, (1 << AB) + 1)
+
+    def test_access_stats(self) -> None:
+        """Per address counters of cpu reads and writes."""
+        assert self.ram.read_counts is None
+        self.ram.put(address=Cell(2, bits=AB), value=Cell(1, bits=2 * WB))
+        assert self.ram.write_counts is None
+
+        self.ram.enable_access_stats()
+        assert self.ram.read_counts is not None
+        assert self.ram.write_counts is not None
+        self.ram.put(address=Cell(2, bits=AB), value=Cell(1, bits=2 * WB))
+        self.ram.fetch(Cell(3, bits=AB), bits=WB)
+        self.ram.fetch(Cell(3, bits=AB), bits=WB, from_cpu=False)
+        self.ram.write_words(3, array(self.ram.typecode, [1, 2]))
+        assert list(self.ram.read_counts[1:6]) == [0, 0, 1, 0, 0]
+        assert list(self.ram.write_counts[1:6]) == [0, 1, 2, 1, 0]
+
+        self.ram.reset_access_count()
+        assert self.ram.access_count == 0
+        assert not any(self.ram.read_counts)
+        assert not any(self.ram.write_counts)
+
+    def test_record_history(self) -> None:
+        """Reverse step restores words and fill of the last step."""
+        self._set(1, 1)
+        ram = self.ram.record_history()
+        assert ram is self.ram
+        assert len(ram.history) == 0
+
+        ram.history.new_step()
+        self._set(1, 2)
+        self._set(1, 3)
+        ram.write_words(2, array(ram.typecode, [4, 5]))
+        assert ram.history.last_step() == {1, 2, 3}
+        assert list(ram.read_words(1, 4)) == [3, 4, 5]
+
+        ram.history.new_step()
+        self._set(3, 6)
+        assert ram.history.last_step() == {3}
+
+        version = ram.version
+        ram.debug_reverse_step()
+        assert ram.version > version
+        assert self._get(3) == 5
+        ram.debug_reverse_step()
+        assert len(ram.history) == 0
+        assert self._get(1) == 1
+        assert not ram.has_fill(2, 4)
+
+    def test_watch_writes(self) -> None:
+        """Watched writes call on_write, None restores plain writes."""
+        writes: list[tuple[int, int, int]] = []
+        self._set(1, 1)
+        self.ram.watch_writes(lambda *args: writes.append(args))
+        assert type(self.ram) is WatchedRandomAccessMemory
+        self._set(1, 2)
+        self.ram.write_words(2, array(self.ram.typecode, [3]))
+        assert writes == [(1, 1, 2), (2, 0, 3)]
+
+        # Recording keeps watching and watching keeps recording
+        ram = self.ram.record_history()
+        ram.history.new_step()
+        self._set(1, 4)
+        assert writes[-1] == (1, 2, 4)
+        assert ram.history.last_step() == {1}
+
+        ram.watch_writes(None)
+        assert type(ram) is RecordingRandomAccessMemory
+        self._set(1, 5)
+        assert len(writes) == 3
+        assert ram.history.last_step() == {1}
@@ -6,8 +6,10 @@ from modelmachine.cell import (
     Cell,
 )
 from modelmachine.memory.register import (
+    RecordingRegisterMemory,
     RegisterMemory,
     RegisterName,
+    WatchedRegisterMemory,
 )
 
 WB = 16
@@ -75,3 +77,38 @@ class TestRegisterMemory:
             RegisterName.R1: Cell(1, bits=WB),
             RegisterName.R2: Cell(0, bits=WB),
         }
+
+    def test_record_history(self) -> None:
+        """Reverse step restores registers of the last step."""
+        registers = self.registers.record_history()
+        assert registers is self.registers
+        registers.history.new_step()
+        registers[RegisterName.R1] = Cell(1, bits=WB)
+        registers[RegisterName.R1] = Cell(2, bits=WB)
+        registers[RegisterName.S] = Cell(3, bits=WB)
+        assert registers.history.last_step() == {
+            RegisterName.R1,
+            RegisterName.S,
+        }
+
+        registers.debug_reverse_step()
+        assert registers[RegisterName.R1] == 0
+        assert registers[RegisterName.S] == 0
+        assert len(registers.history) == 0
+
+    def test_watch_writes(self) -> None:
+        """Watched writes call on_write, None restores plain writes."""
+        writes: list[tuple[RegisterName, Cell, Cell]] = []
+        zero, one = Cell(0, bits=WB), Cell(1, bits=WB)
+        self.registers.watch_writes(lambda *args: writes.append(args))
+        registers = self.registers.record_history()
+        assert isinstance(registers, WatchedRegisterMemory)
+        registers.history.new_step()
+        registers[RegisterName.R1] = one
+        assert writes == [(RegisterName.R1, zero, one)]
+        assert registers.history.last_step() == {RegisterName.R1}
+
+        registers.watch_writes(None)
+        assert type(registers) is RecordingRegisterMemory
+        registers[RegisterName.R1] = Cell(2, bits=WB)
+        assert len(writes) == 1
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import pickle  # noqa: S403
+from copy import copy, deepcopy
+
 import pytest
 
 from modelmachine.shared.enum_mixin import EnumMixin
@@ -121,6 +124,13 @@ def test_repr() -> None:
     assert repr(EnumC.c) == "EnumC.c"
 
 
+def test_copy() -> None:
+    assert copy(EnumB.b) is EnumB.b
+    assert deepcopy({EnumC.c: [EnumC.a]}) == {EnumC.c: [EnumC.a]}
+    assert deepcopy([EnumC.a])[0] is EnumC.a
+    assert pickle.loads(pickle.dumps(EnumC.b)) is EnumC.b  # noqa: S301
+
+
 def test_not_expected() -> None:
     for t, v in (
         (EnumA, 20),
@@ -1,6 +1,9 @@
 """Test case for arithmetic logic unit."""
 
+from __future__ import annotations
+
 from itertools import product
+from typing import TYPE_CHECKING
 
 import pytest
 
@@ -12,10 +15,17 @@ from modelmachine.alu import (
     AluZeroDivisionError,
     ArithmeticLogicUnit,
     Flags,
+    plain_ops,
+    width_ops,
 )
 from modelmachine.cell import Cell
 from modelmachine.memory.register import RegisterMemory, RegisterName
 
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from modelmachine.alu import WidthOps
+
 WB = 5
 AB = 32
 
@@ -44,66 +54,6 @@ class TestArithmeticLogicUnit:
             address_bits=AB,
         )
 
-    def test_set_flags_negative(self) -> None:
-        """Test set flags register algorithm with negative numbers."""
-        for i in range(4 * MIN_INT, 0):
-            self.registers[RegisterName.S] = Cell(i, bits=WB)
-            self.alu._set_flags(signed=i, unsigned=i)
-            if i == 4 * MIN_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF | Flags.ZF
-                )
-            if 4 * MIN_INT < i < 3 * MIN_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF
-                )
-            if i == 3 * MIN_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF | Flags.SF
-                )
-            if 3 * MIN_INT < i < 2 * MIN_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF | Flags.SF
-                )
-            if i == 2 * MIN_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF | Flags.ZF
-                )
-            if 2 * MIN_INT < i < MIN_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF
-                )
-            if MIN_INT <= i < 0:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.SF | Flags.CF
-                )
-
-    def test_set_flags_positive(self) -> None:
-        """Test set flags register algorithm with positive numbers."""
-        for i in range(4 * MAX_INT):
-            self.registers[RegisterName.S] = Cell(i, bits=WB)
-            self.alu._set_flags(signed=i, unsigned=i)
-            if i == 0:
-                assert self.registers[RegisterName.FLAGS] == Flags.ZF
-            if 0 < i < MAX_INT:
-                assert self.registers[RegisterName.FLAGS] == 0
-            if MAX_INT <= i < MAX_INT * 2:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.SF
-                )
-            if i == 2 * MAX_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF | Flags.ZF
-                )
-            if 2 * MAX_INT < i < 3 * MAX_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF
-                )
-            if 3 * MAX_INT <= i < 4 * MAX_INT:
-                assert self.registers[RegisterName.FLAGS] == (
-                    Flags.OF | Flags.CF | Flags.SF
-                )
-
     def test_add(self) -> None:
         """Add must set flags and calc right result."""
         for a, b in product(range(MIN_INT, MAX_INT), range(MIN_INT, MAX_INT)):
@@ -373,3 +323,67 @@ class TestArithmeticLogicUnit:
         assert self.registers[RegisterName.FLAGS] == 0
         self.alu.halt()
         assert self.registers[RegisterName.FLAGS] == Flags.HALT
+
+
+@pytest.mark.parametrize("ops", [width_ops, plain_ops])
+def test_flags_negative(ops: Callable[[int], WidthOps]) -> None:
+    """Test flags algorithm with negative numbers."""
+    for i in range(4 * MIN_INT, 0):
+        flags = Flags(ops(WB).flags(i % (1 << WB), i, i))
+        if i == 4 * MIN_INT:
+            assert flags == (Flags.OF | Flags.CF | Flags.ZF)
+        if 4 * MIN_INT < i < 3 * MIN_INT:
+            assert flags == (Flags.OF | Flags.CF)
+        if i == 3 * MIN_INT:
+            assert flags == (Flags.OF | Flags.CF | Flags.SF)
+        if 3 * MIN_INT < i < 2 * MIN_INT:
+            assert flags == (Flags.OF | Flags.CF | Flags.SF)
+        if i == 2 * MIN_INT:
+            assert flags == (Flags.OF | Flags.CF | Flags.ZF)
+        if 2 * MIN_INT < i < MIN_INT:
+            assert flags == (Flags.OF | Flags.CF)
+        if MIN_INT <= i < 0:
+            assert flags == (Flags.SF | Flags.CF)
+
+
+@pytest.mark.parametrize("ops", [width_ops, plain_ops])
+def test_flags_positive(ops: Callable[[int], WidthOps]) -> None:
+    """Test flags algorithm with positive numbers."""
+    for i in range(4 * MAX_INT):
+        flags = Flags(ops(WB).flags(i % (1 << WB), i, i))
+        if i == 0:
+            assert flags == Flags.ZF
+        if 0 < i < MAX_INT:
+            assert flags == Flags.CLEAR
+        if MAX_INT <= i < MAX_INT * 2:
+            assert flags == (Flags.OF | Flags.SF)
+        if i == 2 * MAX_INT:
+            assert flags == (Flags.OF | Flags.CF | Flags.ZF)
+        if 2 * MAX_INT < i < 3 * MAX_INT:
+            assert flags == (Flags.OF | Flags.CF)
+        if 3 * MAX_INT <= i < 4 * MAX_INT:
+            assert flags == (Flags.OF | Flags.CF | Flags.SF)
+
+
+def test_width_ops() -> None:
+    assert width_ops(16) is width_ops(16)
+    assert width_ops(16) is not width_ops(24)
+    ops = width_ops(8)
+    assert ops.add(0xFF, 1) == (0, (Flags.ZF | Flags.CF).value)
+    assert ops.sub(0x80, 1) == (0x7F, Flags.OF.value)
+    assert ops.smul(0xFF, 0xFF) == (1, 0)
+    assert ops.umul(0xFF, 0xFF) == (1, Flags.CF.value)
+    assert ops.sdivmod(0xF9, 2) == (0xFD, 0xFF, Flags.SF.value)
+    assert ops.udivmod(0xF9, 2) == (0x7C, 1, 0)
+
+
+@pytest.mark.parametrize("bits", [WB, 6])
+def test_plain_ops(bits: int) -> None:
+    """Width specialized operations match operations on cells."""
+    fast, plain = width_ops(bits), plain_ops(bits)
+    for a, b in product(range(1 << bits), repeat=2):
+        for name in ("add", "sub", "umul", "smul"):
+            assert getattr(fast, name)(a, b) == getattr(plain, name)(a, b)
+        if b != 0:
+            assert fast.sdivmod(a, b) == plain.sdivmod(a, b)
+            assert fast.udivmod(a, b) == plain.udivmod(a, b)
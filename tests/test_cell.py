@@ -2,7 +2,13 @@
 
 import pytest
 
-from modelmachine.cell import Cell, Endianess
+from modelmachine.cell import (
+    Cell,
+    Endianess,
+    div_to_zero,
+    divmod_to_zero,
+    mod_to_zero,
+)
 
 
 def check_8bit(cell: Cell) -> None:
@@ -220,3 +226,18 @@ class TestCell:
         x = Cell.from_hex("0a")
         assert x.bits == 8
         assert x == 10
+
+
+def test_divmod_to_zero() -> None:
+    for a in range(-20, 21):
+        for b in range(-7, 8):
+            if b == 0:
+                with pytest.raises(ZeroDivisionError):
+                    divmod_to_zero(a, b)
+                continue
+            div, mod = divmod_to_zero(a, b)
+            assert div == int(a / b)
+            assert (div, mod) == (div_to_zero(a, b), mod_to_zero(a, b))
+            assert a == b * div + mod
+            assert abs(mod) < abs(b)
+            assert mod == 0 or (mod < 0) == (a < 0)
@@ -1,11 +1,13 @@
 """Test case for input/output device."""
 
 import io
+from array import array
 
 import pytest
 
 from modelmachine.cell import Cell, Endianess
-from modelmachine.io import InputOutputUnit
+from modelmachine.cu.halt_error import EndOfInputError
+from modelmachine.io import InputOutputUnit, Patcher
 from modelmachine.memory.ram import RandomAccessMemory
 from modelmachine.memory.register import RegisterMemory, RegisterName
 
@@ -92,6 +94,31 @@ class TestIODevice:
             0x0123_45A9_8765_4DEF, bits=4 * WB
         )
 
+    def test_patch(self) -> None:
+        self.io_unit.put_code(
+            address=Cell(10, bits=AB),
+            value=Cell(0x0123_4567_89AB_CDEF, bits=4 * WB),
+        )
+        fields = [
+            (
+                Patcher.create(
+                    offset_bits=offset_bits,
+                    bits=bits,
+                    word_bits=WB,
+                    endianess=self.ram.endianess,
+                ),
+                value,
+            )
+            for offset_bits, bits, value in ((4, 8, 0xFFA), (16, 16, 0x5AB7))
+        ]
+        self.io_unit.patch(10, fields)
+        assert self.ram.fetch(Cell(10, bits=AB), bits=4 * WB) == Cell(
+            0x0FA3_5AB7_89AB_CDEF, bits=4 * WB
+        )
+
+        with pytest.raises(NotImplementedError, match="Overriding empty cell"):
+            self.io_unit.patch(13, fields)
+
     def test_check_word(self) -> None:
         self.io_unit.check_word((1 << 16) - 1)
         with pytest.raises(ValueError, match="Input value is too long"):
@@ -138,6 +165,12 @@ class TestIODevice:
 
         assert self.io_unit.store_source(start=20, bits=WB) == "1a10"
         assert self.io_unit.store_source(start=21, bits=2 * WB) == "1b20 1c30"
+        assert self.io_unit.hex_words(19, 23) == [
+            "0000",
+            "1a10",
+            "1b20",
+            "1c30",
+        ]
 
     def test_store_source_assert(self) -> None:
         self.ram.put(address=Cell(0, bits=AB), value=Cell(0xABCD, bits=WB))
@@ -183,6 +216,71 @@ class TestIODevice:
         with pytest.raises(SystemExit, match="Unexpected address"):
             self.io_unit.output(address=-1)
 
+    def test_ports(self) -> None:
+        """Cpu access to mapped ports streams data."""
+        addr = Cell(0x11, bits=AB)
+        with io.StringIO("1 -2") as fin, io.StringIO() as fout:
+            self.io_unit.map_input_port(address=0x11, file=fin)
+            self.io_unit.map_output_port(address=0x11, file=fout)
+
+            assert self.ram.fetch(addr, bits=WB) == 1
+            assert self.ram.fetch(addr, bits=WB) == -2
+            with pytest.raises(EndOfInputError):
+                self.ram.fetch(addr, bits=WB)
+            assert self.ram.access_count == 3
+
+            self.ram.put(address=addr, value=Cell(5, bits=WB))
+            self.ram.put(address=addr, value=Cell(7, bits=WB), from_cpu=False)
+            assert fout.getvalue() == "5\n"
+            assert self.ram.fetch(addr, bits=WB, from_cpu=False) == 7
+
+        with pytest.raises(SystemExit, match="Unexpected address"):
+            self.io_unit.map_input_port(address=0xFF, file=io.StringIO())
+
+    @pytest.mark.parametrize("endianess", [Endianess.BIG, Endianess.LITTLE])
+    @pytest.mark.parametrize("io_bits", [WB, 2 * WB])
+    def test_input_many(self, endianess: Endianess, io_bits: int) -> None:
+        """Bulk input is the same as input one by one."""
+        data = "-123 0x10\n\n 7 -1 5 6\n"
+        addresses = [10, 12, 14, 2, 4, 10]
+        units = []
+        for _ in range(2):
+            ram = RandomAccessMemory(
+                address_bits=AB, word_bits=WB, endianess=endianess
+            )
+            units.append(
+                InputOutputUnit(
+                    ram=ram,
+                    io_bits=io_bits,
+                    is_stack_io=False,
+                    registers=self.registers,
+                )
+            )
+
+        with io.StringIO(data + "8") as fin:
+            units[0].input_many(addresses, fin)
+            with pytest.raises(SystemExit, match="Too many elements"):
+                units[0].check_input_empty(fin)
+        with io.StringIO(data) as fin:
+            for address in addresses:
+                units[1].input(address=address, file=fin)
+
+        rams = [unit._ram for unit in units]
+        assert rams[0].filled_intervals == rams[1].filled_intervals
+        assert rams[0].read_words(0, 1 << AB) == rams[1].read_words(0, 1 << AB)
+
+        for data, addresses, error in (
+            ("1 2", [1, 2, 3], "Not enough elements"),
+            ("1 2 3", [1, 0xFF, 3], "Unexpected address for input"),
+            ("1 0x10000 3", [1, 2, 3], "Cannot parse integer '0x10000'"),
+            ("1 x 3", [1, 2, 3], "Cannot parse integer 'x'"),
+        ):
+            self.setup_method()
+            with io.StringIO(data) as fin, pytest.raises(
+                SystemExit, match=error
+            ):
+                self.io_unit.input_many(addresses, fin)
+
 
 class TestStackIODevice:
     """Test case for Stack IODevice."""
@@ -220,6 +318,20 @@ class TestStackIODevice:
         ):
             self.io_unit.input(address=1, file=fin)
 
+    def test_input_many(self) -> None:
+        """Bulk input writes stack block at once."""
+        with io.StringIO("-123 234\n5") as fin:
+            self.io_unit.input_many([2, 0, 1], fin)
+        assert self.ram.read_words((1 << AB) - 3, 1 << AB) == array(
+            self.ram.typecode, [5, 234, 0x10000 - 123]
+        )
+        assert self.registers[RegisterName.SP] == (1 << AB) - 3
+
+        with io.StringIO("1") as fin, pytest.raises(
+            SystemExit, match="Unexpected address for input"
+        ):
+            self.io_unit.input_many([0xFF], fin)
+
     def test_output(self) -> None:
         """Test load data method."""
         address, value = (1 << AB) - 1, 0x1234